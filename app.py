@@ -1,15 +1,18 @@
-import eventlet
-eventlet.monkey_patch()
+from utils.startup_profiler import profile_step, finish as finish_startup_profile
 
-import utils.model_selector
+with profile_step("import eventlet + monkey_patch"):
+    import eventlet
+    eventlet.monkey_patch()
 
 import logging
-from flask import Flask, jsonify
-from flask_cors import CORS
-from flask_socketio import SocketIO
 import os
 import socket
 
+with profile_step("import flask stack"):
+    from flask import Flask, jsonify
+    from flask_cors import CORS
+    from flask_socketio import SocketIO
+
 # lightweight logging
 logging.getLogger('werkzeug').setLevel(logging.ERROR)
 logging.getLogger('socketio').setLevel(logging.ERROR)
@@ -19,22 +22,26 @@ app = Flask(__name__)
 # UPDATED: More robust CORS for deployment
 CORS(app, resources={r"/api/*": {"origins": "*"}})
 
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode="eventlet")
+with profile_step("init socketio"):
+    socketio = SocketIO(app, cors_allowed_origins="*", async_mode="eventlet")
+    from socket_manager import init_socketio
+    init_socketio(socketio)
 
 # Mail initialization
-try:
-    from extensions import mail
-    app.config.update(
-        MAIL_SERVER="smtp.gmail.com",
-        MAIL_PORT=587,
-        MAIL_USE_TLS=True,
-        MAIL_USERNAME=os.environ.get("MAIL_USERNAME"), 
-        MAIL_PASSWORD=os.environ.get("MAIL_PASSWORD"),
-        MAIL_DEFAULT_SENDER=("Adaptive AI NIDS", os.environ.get("MAIL_USERNAME"))
-    )
-    mail.init_app(app)
-except Exception:
-    pass
+with profile_step("init mail"):
+    try:
+        from extensions import mail
+        app.config.update(
+            MAIL_SERVER="smtp.gmail.com",
+            MAIL_PORT=587,
+            MAIL_USE_TLS=True,
+            MAIL_USERNAME=os.environ.get("MAIL_USERNAME"), 
+            MAIL_PASSWORD=os.environ.get("MAIL_PASSWORD"),
+            MAIL_DEFAULT_SENDER=("Adaptive AI NIDS", os.environ.get("MAIL_USERNAME"))
+        )
+        mail.init_app(app)
+    except Exception:
+        pass
 
 sniffer = None
 
@@ -77,24 +84,59 @@ def register_blueprints(app):
 
     for module_name, varname, prefix in routes:
         try:
-            mod = import_module(module_name)
+            with profile_step(f"import {module_name}"):
+                mod = import_module(module_name)
             bp = getattr(mod, varname)
             app.register_blueprint(bp, url_prefix=prefix)
             print(f"✅ Registered route: {module_name} -> {prefix}")
         except Exception as e:
             print(f"⚠️ Skipping {module_name}: {e}")
 
-register_blueprints(app)
+with profile_step("register blueprints"):
+    register_blueprints(app)
 
-with app.app_context():
-    try:
-        from utils.model_selector import load_model
-        print("📥 Pre-loading AI models...")
-        # Start with 'bcc' as it's the default
-        load_model("bcc")
-        print("✅ Default models ready.")
-    except Exception as e:
-        print(f"❌ Startup Model Error: {e}")
+
+def _preload_models():
+    """
+    Verify the model registry and warm the default bundle off the startup path.
+    Runs as a green thread; the hashing and joblib.load inside go through
+    offline_jobs.run_blocking (OS thread pool), so the hub keeps serving.
+    """
+    with app.app_context():
+        try:
+            from utils import model_registry
+            # Remote download is opt-in only; serving never hits the network
+            if os.environ.get("NIDS_MODEL_PREFETCH") == "1":
+                print("🌐 Prefetching models from the Hub (NIDS_MODEL_PREFETCH=1)...")
+                model_registry.prefetch()
+            print(f"🔎 Model registry: {model_registry.verify_all()}")
+        except Exception as e:
+            print(f"❌ Model Registry Error: {e}")
+
+        try:
+            from utils.model_selector import load_model
+            print("📥 Pre-loading AI models...")
+            # Start with 'bcc' as it's the default
+            load_model("bcc")
+            print("✅ Default models ready.")
+        except Exception as e:
+            print(f"❌ Startup Model Error: {e}")
+
+
+# Models load in the background so the server accepts requests immediately;
+# NIDS_PRELOAD_MODELS=0 defers loading to the first prediction instead.
+# Spawned offline_parallel workers import this file as __mp_main__ and
+# load only the model they are handed, so they skip the preload.
+if __name__ != "__mp_main__" and os.environ.get("NIDS_PRELOAD_MODELS", "1") != "0":
+    socketio.start_background_task(_preload_models)
+
+finish_startup_profile()
+
+
+@app.route("/api/system/startup")
+def startup_profile():
+    from utils.startup_profiler import get_report
+    return jsonify(get_report())
 
 @app.route("/")
 def home():
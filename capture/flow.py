@@ -0,0 +1,218 @@
+# backend/capture/flow.py
+# Bidirectional flow aggregation shared by live capture (capture.live_capture)
+# and streaming offline pcap analysis (utils.pcap_to_csv)
+# Per-flow length/IAT statistics are running aggregates, so a flow's
+# memory stays constant however many packets it carries.
+import math
+
+from scapy.all import IP, TCP, UDP
+
+# -------------------------
+# Running statistics
+# -------------------------
+class RunningStats:
+    """count / sum / sum of squares / min / max of a stream of values."""
+    __slots__ = ("count", "total", "total_sq", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, x):
+        self.count += 1
+        self.total += x
+        self.total_sq += x * x
+        self.min = x if self.min is None or x < self.min else self.min
+        self.max = x if self.max is None or x > self.max else self.max
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def std(self):
+        if not self.count:
+            return 0.0
+        mean = self.total / self.count
+        return math.sqrt(max(self.total_sq / self.count - mean * mean, 0.0))
+
+# -------------------------
+# Flow data container
+# -------------------------
+class Flow:
+    def __init__(self, first_pkt, ts):
+        # 5-tuple key derived externally
+        self.first_seen = ts
+        self.last_seen = ts
+        self.packets_total = 0
+        self.packets_fwd = 0
+        self.packets_bwd = 0
+        self.bytes_fwd = 0
+        self.bytes_bwd = 0
+        self.fwd_lens = RunningStats()        # payload lengths per direction
+        self.bwd_lens = RunningStats()
+        self.inter_arrivals = RunningStats()  # global IATs across flow
+        self.last_pkt_ts = ts
+        self.fwd_psh = 0
+        self.fwd_urg = 0
+        self.header_bytes = 0
+        self.syn = 0
+        self.ack = 0
+        self.rst = 0
+        self.fin = 0
+        self.protocol = 6 if first_pkt.haslayer(TCP) else (17 if first_pkt.haslayer(UDP) else 0)
+        # store client/server ip+port orientation based on first packet's src/dst
+        self.client_ip = first_pkt[IP].src
+        self.server_ip = first_pkt[IP].dst
+        self.client_port = first_pkt.sport if hasattr(first_pkt, 'sport') else 0
+        self.server_port = first_pkt.dport if hasattr(first_pkt, 'dport') else 0
+
+    def update(self, pkt, ts):
+        self.packets_total += 1
+        # Determine direction relative to initial client/server
+        try:
+            src = pkt[IP].src
+            sport = pkt.sport if hasattr(pkt, 'sport') else 0
+            payload = bytes(pkt.payload) if pkt.payload else b""
+            plen = len(payload)
+            self.header_bytes += _header_len(pkt)
+        except Exception:
+            src = None; sport = 0; plen = 0
+
+        if pkt.haslayer(TCP):
+            tcp_flags = pkt[TCP].flags
+            self.syn += 1 if tcp_flags & 0x02 else 0
+            self.ack += 1 if tcp_flags & 0x10 else 0
+            self.rst += 1 if tcp_flags & 0x04 else 0
+            self.fin += 1 if tcp_flags & 0x01 else 0
+
+        # if src equals initial client, it's forward
+        if src == self.client_ip and sport == self.client_port:
+            dir_fwd = True
+        else:
+            dir_fwd = False
+
+        if dir_fwd:
+            self.packets_fwd += 1
+            self.bytes_fwd += plen
+            self.fwd_lens.add(plen)
+            # flags
+            if pkt.haslayer(TCP):
+                flags = pkt[TCP].flags
+                if flags & 0x08:  # PSH
+                    self.fwd_psh += 1
+                if flags & 0x20:  # URG
+                    self.fwd_urg += 1
+        else:
+            self.packets_bwd += 1
+            self.bytes_bwd += plen
+            self.bwd_lens.add(plen)
+
+        # inter-arrival
+        iat = ts - (self.last_pkt_ts or ts)
+        if iat > 0:
+            self.inter_arrivals.add(iat)
+        self.last_pkt_ts = ts
+        self.last_seen = ts
+
+    def is_idle(self, now, idle_timeout):
+        return (now - self.last_seen) >= idle_timeout
+
+    def build_cicids_features(self, dst_port_override=None):
+        """
+        Build feature vector matching:
+        ['Protocol', 'Dst Port', 'Flow Duration', 'Tot Fwd Pkts', 'Tot Bwd Pkts',
+         'TotLen Fwd Pkts', 'TotLen Bwd Pkts', 'Fwd Pkt Len Mean', 'Bwd Pkt Len Mean',
+         'Flow IAT Mean', 'Fwd PSH Flags', 'Fwd URG Flags', 'Fwd IAT Mean']
+        -> returns list of floats/ints
+        """
+        duration = max(self.last_seen - self.first_seen, 0.000001)
+        tot_fwd = self.packets_fwd
+        tot_bwd = self.packets_bwd
+        totlen_fwd = float(self.bytes_fwd)
+        totlen_bwd = float(self.bytes_bwd)
+        fwd_mean = float(self.fwd_lens.mean)
+        bwd_mean = float(self.bwd_lens.mean)
+        flow_iat_mean = float(self.inter_arrivals.mean)
+        fwd_iat_mean = self._fwd_iat_mean()
+        proto = int(self.protocol)
+        # FIXED: respect explicit override even if zero
+        dst_port = self.server_port if dst_port_override is None else int(dst_port_override or 0)
+
+        return [
+            proto,
+            dst_port,
+            duration,
+            tot_fwd,
+            tot_bwd,
+            totlen_fwd,
+            totlen_bwd,
+            fwd_mean,
+            bwd_mean,
+            flow_iat_mean,
+            self.fwd_psh,
+            self.fwd_urg,
+            fwd_iat_mean
+        ]
+
+    def build_bcc_features(self):
+        """
+        Flow-level vector in BCC_FEATURES order:
+        protocol, src_port, dst_port, duration, packets_count, fwd_packets_count,
+        bwd_packets_count, total_payload_bytes, total_header_bytes, bytes_rate,
+        packets_rate, syn/ack/rst/fin flag counts
+        """
+        duration = max(self.last_seen - self.first_seen, 0.000001)
+        payload = self.bytes_fwd + self.bytes_bwd
+        return [
+            int(self.protocol) or 1,
+            self.client_port,
+            self.server_port,
+            duration,
+            self.packets_total,
+            self.packets_fwd,
+            self.packets_bwd,
+            payload,
+            self.header_bytes,
+            payload / duration,
+            self.packets_total / duration,
+            self.syn,
+            self.ack,
+            self.rst,
+            self.fin
+        ]
+
+    def _fwd_iat_mean(self):
+        # approximate forward-only IATs by splitting inter_arrivals roughly (coarse)
+        # If we had per-direction timestamps we would measure precisely;
+        # here we approximate as global mean when forward packets exist.
+        if self.inter_arrivals.count and self.packets_fwd > 0:
+            return float(self.inter_arrivals.mean)
+        return 0.0
+
+# -------------------------
+# helpers: header length / flow key
+# -------------------------
+def _header_len(pkt):
+    """IP + transport header bytes (IP length minus application payload)."""
+    ip = pkt[IP]
+    l4 = ip[TCP] if ip.haslayer(TCP) else (ip[UDP] if ip.haslayer(UDP) else None)
+    app = len(l4.payload) if l4 is not None else len(ip.payload)
+    return max(len(ip) - app, 0)
+
+# -------------------------
+# helpers: flow key
+# -------------------------
+def make_flow_key(pkt):
+    try:
+        ip = pkt[IP]
+        proto = 6 if pkt.haslayer(TCP) else (17 if pkt.haslayer(UDP) else 0)
+        sport = pkt.sport if hasattr(pkt, 'sport') else 0
+        dport = pkt.dport if hasattr(pkt, 'dport') else 0
+        # canonicalize tuple order to consider direction
+        return (ip.src, ip.dst, sport, dport, proto)
+    except Exception:
+        return None
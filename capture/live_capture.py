@@ -8,6 +8,7 @@ from datetime import datetime
 from collections import defaultdict, deque
 import numpy as np
 from scapy.all import sniff, IP, TCP, UDP  # keep scapy usage
+from capture.flow import Flow, make_flow_key  # shared with offline pcap analysis
 import joblib
 
 from utils.logger import push_event
@@ -45,134 +46,6 @@ _processor_thr = None
 _capture_thr = None
 _expiry_thr = None
 
-# -------------------------
-# Flow data container
-# -------------------------
-class Flow:
-    def __init__(self, first_pkt, ts):
-        # 5-tuple key derived externally
-        self.first_seen = ts
-        self.last_seen = ts
-        self.packets_total = 0
-        self.packets_fwd = 0
-        self.packets_bwd = 0
-        self.bytes_fwd = 0
-        self.bytes_bwd = 0
-        self.fwd_lens = []      # for mean
-        self.bwd_lens = []
-        self.inter_arrivals = []    # global IATs across flow
-        self.last_pkt_ts = ts
-        self.fwd_psh = 0
-        self.fwd_urg = 0
-        self.protocol = 6 if first_pkt.haslayer(TCP) else (17 if first_pkt.haslayer(UDP) else 0)
-        # store client/server ip+port orientation based on first packet's src/dst
-        self.client_ip = first_pkt[IP].src
-        self.server_ip = first_pkt[IP].dst
-        self.client_port = first_pkt.sport if hasattr(first_pkt, 'sport') else 0
-        self.server_port = first_pkt.dport if hasattr(first_pkt, 'dport') else 0
-
-    def update(self, pkt, ts):
-        self.packets_total += 1
-        # Determine direction relative to initial client/server
-        try:
-            src = pkt[IP].src
-            sport = pkt.sport if hasattr(pkt, 'sport') else 0
-            payload = bytes(pkt.payload) if pkt.payload else b""
-            plen = len(payload)
-        except Exception:
-            src = None; sport = 0; plen = 0
-
-        # if src equals initial client, it's forward
-        if src == self.client_ip and sport == self.client_port:
-            dir_fwd = True
-        else:
-            dir_fwd = False
-
-        if dir_fwd:
-            self.packets_fwd += 1
-            self.bytes_fwd += plen
-            self.fwd_lens.append(plen)
-            # flags
-            if pkt.haslayer(TCP):
-                flags = pkt[TCP].flags
-                if flags & 0x08:  # PSH
-                    self.fwd_psh += 1
-                if flags & 0x20:  # URG
-                    self.fwd_urg += 1
-        else:
-            self.packets_bwd += 1
-            self.bytes_bwd += plen
-            self.bwd_lens.append(plen)
-
-        # inter-arrival
-        iat = ts - (self.last_pkt_ts or ts)
-        if iat > 0:
-            self.inter_arrivals.append(iat)
-        self.last_pkt_ts = ts
-        self.last_seen = ts
-
-    def is_idle(self, now, idle_timeout):
-        return (now - self.last_seen) >= idle_timeout
-
-    def build_cicids_features(self, dst_port_override=None):
-        """
-        Build feature vector matching:
-        ['Protocol', 'Dst Port', 'Flow Duration', 'Tot Fwd Pkts', 'Tot Bwd Pkts',
-         'TotLen Fwd Pkts', 'TotLen Bwd Pkts', 'Fwd Pkt Len Mean', 'Bwd Pkt Len Mean',
-         'Flow IAT Mean', 'Fwd PSH Flags', 'Fwd URG Flags', 'Fwd IAT Mean']
-        -> returns list of floats/ints
-        """
-        duration = max(self.last_seen - self.first_seen, 0.000001)
-        tot_fwd = self.packets_fwd
-        tot_bwd = self.packets_bwd
-        totlen_fwd = float(self.bytes_fwd)
-        totlen_bwd = float(self.bytes_bwd)
-        fwd_mean = float(np.mean(self.fwd_lens)) if self.fwd_lens else 0.0
-        bwd_mean = float(np.mean(self.bwd_lens)) if self.bwd_lens else 0.0
-        flow_iat_mean = float(np.mean(self.inter_arrivals)) if self.inter_arrivals else 0.0
-        fwd_iat_mean = self._fwd_iat_mean()
-        proto = int(self.protocol)
-        # FIXED: respect explicit override even if zero
-        dst_port = self.server_port if dst_port_override is None else int(dst_port_override or 0)
-
-        return [
-            proto,
-            dst_port,
-            duration,
-            tot_fwd,
-            tot_bwd,
-            totlen_fwd,
-            totlen_bwd,
-            fwd_mean,
-            bwd_mean,
-            flow_iat_mean,
-            self.fwd_psh,
-            self.fwd_urg,
-            fwd_iat_mean
-        ]
-
-    def _fwd_iat_mean(self):
-        # approximate forward-only IATs by splitting inter_arrivals roughly (coarse)
-        # If we had per-direction timestamps we would measure precisely;
-        # here we approximate as global mean when forward packets exist.
-        if self.inter_arrivals and self.packets_fwd > 0:
-            return float(np.mean(self.inter_arrivals))
-        return 0.0
-
-# -------------------------
-# helpers: flow key
-# -------------------------
-def make_flow_key(pkt):
-    try:
-        ip = pkt[IP]
-        proto = 6 if pkt.haslayer(TCP) else (17 if pkt.haslayer(UDP) else 0)
-        sport = pkt.sport if hasattr(pkt, 'sport') else 0
-        dport = pkt.dport if hasattr(pkt, 'dport') else 0
-        # canonicalize tuple order to consider direction
-        return (ip.src, ip.dst, sport, dport, proto)
-    except Exception:
-        return None
-
 # -------------------------
 # queueing / sniff simple wrappers
 # -------------------------
@@ -213,9 +86,6 @@ def _processor_worker():
     # lazy load initial model bundle
     active = get_active_model()
     model_bundle = load_model(active)
-    processor_model = model_bundle.get("model")
-    processor_scaler = model_bundle.get("scaler") or (model_bundle.get("artifacts") and model_bundle["artifacts"].get("scaler"))
-    processor_encoder = model_bundle.get("encoder") or (model_bundle.get("artifacts") and model_bundle["artifacts"].get("label_encoder"))
 
     batch = []
     while _running.is_set():
@@ -224,9 +94,6 @@ def _processor_worker():
         if new_active != active:
             active = new_active
             model_bundle = load_model(active)
-            processor_model = model_bundle.get("model")
-            processor_scaler = model_bundle.get("scaler") or (model_bundle.get("artifacts") and model_bundle["artifacts"].get("scaler"))
-            processor_encoder = model_bundle.get("encoder") or (model_bundle.get("artifacts") and model_bundle["artifacts"].get("label_encoder"))
             print(f"[live_capture] switched active model to {active}")
 
         try:
@@ -245,7 +112,7 @@ def _processor_worker():
         if active == "bcc":
             batch.append((pkt, ts))
             if len(batch) >= PROCESS_BATCH_SIZE or _packet_queue.empty():
-                _process_bcc_batch(batch, processor_model, processor_scaler, processor_encoder)
+                _process_bcc_batch(batch, model_bundle)
                 batch.clear()
             continue
 
@@ -286,10 +153,25 @@ def _processor_worker():
         _process_and_emit_flows(keys)
 
 
+# -------------------------
+# Shared scoring through the prepared model bundle
+# -------------------------
+def _predict_bundle(bundle, X, tag):
+    """Return (labels, confidences-or-None); labels are "None" if the model is unavailable."""
+    if bundle.ready:
+        try:
+            # live capture keeps scoring through a broken scaler (as it always
+            # has); the fallback is counted on the bundle and logged once
+            return bundle.predict_labels_with_confidence(X, strict=False)
+        except Exception as e:
+            print(f"[live_capture] {tag} model predict failed:", e)
+    return ["None"] * len(X), None
+
+
 # -------------------------
 # Process BCC batch (existing behavior)
 # -------------------------
-def _process_bcc_batch(batch, model, scaler, encoder):
+def _process_bcc_batch(batch, bundle):
     events = []
     features_list = []
     for pkt, ts in batch:
@@ -298,33 +180,11 @@ def _process_bcc_batch(batch, model, scaler, encoder):
         features_list.append(features)
 
     X = np.asarray(features_list, dtype=float)
-    if scaler is not None:
-        try:
-            Xs = scaler.transform(X)
-        except Exception:
-            Xs = X
-    else:
-        Xs = X
-
-    if model is not None:
-        try:
-            preds = model.predict(Xs)
-            probs = model.predict_proba(Xs) if hasattr(model, "predict_proba") else None
-        except Exception as e:
-            preds = [None] * len(Xs)
-            probs = None
-            print("[live_capture] BCC model predict failed:", e)
-    else:
-        preds = [None] * len(Xs)
-        probs = None
+    labels, confs = _predict_bundle(bundle, X, "BCC")
 
     for i, (pkt, ts) in enumerate(batch):
-        pred = preds[i]
-        conf = float(np.max(probs[i])) if (probs is not None and len(probs) > i) else None
-        try:
-            decoded = encoder.inverse_transform([int(pred)])[0] if encoder else str(pred)
-        except Exception:
-            decoded = str(pred)
+        decoded = labels[i]
+        conf = float(confs[i]) if confs is not None else None
 
         evt = {
             "time": datetime.now().strftime("%H:%M:%S"),
@@ -459,60 +319,16 @@ def _process_and_emit_flows(keys):
 
     X = np.array([t[2] for t in to_predict], dtype=float)
     # lazy load latest model bundle (in case switching)
-    active = get_active_model()
-    bundle = load_model(active)
-    model = bundle.get("model")
-    scaler = None
-    artifacts = bundle.get("artifacts")
-
-    # try to get scaler from bundle/artifacts
-    if bundle.get("scaler") is not None:
-        scaler = bundle.get("scaler")
-    elif artifacts and artifacts.get("scaler") is not None:
-        scaler = artifacts.get("scaler")
-
-    if scaler is not None:
-        try:
-            # If scaler expects dataframe shape, it should still accept ndarray
-            Xs = scaler.transform(X)
-        except Exception as e:
-            print("[live_capture] cicids scaler transform failed:", e)
-            Xs = X
-    else:
-        Xs = X
-
-    preds = []
-    probs = None
-    if model is not None:
-        try:
-            preds = model.predict(Xs)
-            if hasattr(model, "predict_proba"):
-                try:
-                    probs = model.predict_proba(Xs)
-                except Exception:
-                    probs = None
-        except Exception as e:
-            print("[live_capture] cicids model predict failed:", e)
-            preds = [None] * len(Xs)
-            probs = None
-    else:
-        preds = [None] * len(Xs)
+    bundle = load_model(get_active_model())
+    labels, confs = _predict_bundle(bundle, X, "cicids")
 
     # build events and emit/push
     events = []
     for i, (k, f, feat) in enumerate(to_predict):
-        pred = preds[i]
-        conf = float(np.max(probs[i])) if (probs is not None and len(probs) > i) else None
-
-        # -------------------------
-        # SIMPLIFIED LABEL DECODING
-        # -------------------------
-        # Your RF pipeline outputs string labels directly (e.g. 'DoS attacks-Hulk', 'BENIGN').
-        # So keep it simple and safe:
-        try:
-            label = str(pred)
-        except Exception:
-            label = repr(pred)
+        # RF pipeline outputs string labels directly (e.g. 'DoS attacks-Hulk', 'BENIGN');
+        # the prepared bundle decodes encoded labels once at load time
+        label = labels[i]
+        conf = float(confs[i]) if confs is not None else None
 
         evt = {
             "time": datetime.now().strftime("%H:%M:%S"),
@@ -530,7 +346,7 @@ def _process_and_emit_flows(keys):
                 "bytes_fwd": f.bytes_fwd,
                 "bytes_bwd": f.bytes_bwd,
                 "duration": f.last_seen - f.first_seen,
-                "fwd_mean_len": float(np.mean(f.fwd_lens)) if f.fwd_lens else 0.0
+                "fwd_mean_len": float(f.fwd_lens.mean)
     }
 }
 
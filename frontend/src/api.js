@@ -86,6 +86,11 @@ export async function getStats(model) {
     return safeFetch(`${BASE_URL}/api/live/stats?model=${model}`);
 }
 
+// Server-side live counters: totals + top N per dimension ({ dims: { src_ip: [{ key, count }], ... } })
+export async function getTrafficCounters(model, top = 10) {
+    return safeFetch(`${BASE_URL}/api/traffic/counters?model=${model}&top=${top}`);
+}
+
 // -------------------------------------------------------------
 // 🧾 LOGS (MODEL-AWARE)
 // -------------------------------------------------------------
@@ -124,7 +129,22 @@ export async function sendMessageToAI(message) {
     });
 }
 
-export async function offlinePredictAPI(file, model) {
+// Offline detection runs as a background job: enqueue, then poll until it finishes.
+// Progress is also pushed over Socket.IO as "offline_job" events.
+export async function getOfflineJob(jobId) {
+    const res = await fetch(`${BASE_URL}/api/offline/jobs/${jobId}`);
+    return res.json();
+}
+
+// Paginated rows of a finished job: { offset, limit, cls: "DoS,Normal", columns: "index,prediction" }
+export async function getOfflineJobResults(jobId, { offset = 0, limit = 100, cls, columns } = {}) {
+    const params = new URLSearchParams({ offset, limit });
+    if (cls) params.set("class", cls);
+    if (columns) params.set("columns", columns);
+    return safeFetch(`${BASE_URL}/api/offline/jobs/${jobId}/results?${params}`);
+}
+
+export async function offlinePredictAPI(file, model, onProgress) {
     const formData = new FormData();
     formData.append("file", file);
     formData.append("model", model);
@@ -133,7 +153,18 @@ export async function offlinePredictAPI(file, model) {
         method: "POST",
         body: formData,
     });
-    return res.json();
+    let job = await res.json();
+    if (!job.success || !job.job_id) return job;
+
+    while (job.status === "queued" || job.status === "running") {
+        await new Promise((r) => setTimeout(r, 1000));
+        job = await getOfflineJob(job.job_id);
+        if (onProgress) onProgress(job);
+    }
+    if (job.status !== "done") {
+        return { success: false, job_id: job.job_id, message: job.error || job.message || "Offline job failed" };
+    }
+    return { success: true, job_id: job.job_id, ...job.result };
 }
 
 // ... in api.js
@@ -212,9 +243,9 @@ export async function deleteOne(model, index) {
   );
 }
 
-export const downloadOfflineReport = () => {
+export const downloadOfflineReport = (jobId) => {
     // FIX: Using BASE_URL for live deployment
-    window.open(`${BASE_URL}/api/offline/report`, "_blank");
+    window.open(`${BASE_URL}/api/offline/report?job_id=${encodeURIComponent(jobId)}`, "_blank");
 }
 
 export { BASE_URL };
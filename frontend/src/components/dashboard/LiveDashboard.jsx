@@ -8,6 +8,7 @@ import { socket } from "../../socket.js";
 import {
   getRecent,
   getStats,
+  getTrafficCounters,
   download_logs,
   switchModel,
   getActiveModel,
@@ -23,6 +24,7 @@ import Sparkline from "./Sparkline";
 export default function LiveDashboard() {
   const [rows, setRows] = useState([]);
   const [stats, setStats] = useState({});
+  const [counters, setCounters] = useState(null);
   const [connected, setConnected] = useState(false);
   const [lastUpdate, setLastUpdate] = useState(null);
   const [threatCount, setThreatCount] = useState(0);
@@ -59,6 +61,7 @@ export default function LiveDashboard() {
 
       setRows([]);
       setStats({});
+      setCounters(null);
       setThreatCount(0);
       eventBufferRef.current = [];
       setTableKey((k) => k + 1);
@@ -84,16 +87,32 @@ export default function LiveDashboard() {
   useEffect(() => {
     if (!modelReady) return;
     (async () => {
-      const [r1, r2] = await Promise.all([
-        getRecent(model),
-        getStats(model)
-      ]);
-
+      // class totals come from the counters refresh below
+      const r1 = await getRecent(model);
       setRows(Array.isArray(r1?.events) ? r1.events : []);
-      setStats(r2 || {});
     })();
   }, [model, modelReady]);
 
+  // ============================================================
+  // SERVER COUNTERS: class totals + top IPs/countries (O(1) on the backend)
+  // ============================================================
+  useEffect(() => {
+    if (!modelReady) return;
+    let cancelled = false;
+    const refresh = async () => {
+      const [c, s] = await Promise.all([getTrafficCounters(model), getStats(model)]);
+      if (cancelled) return;
+      if (c && !c.error) setCounters(c);
+      if (s && !s.error) setStats(s);
+    };
+    refresh();
+    const interval = setInterval(refresh, 3000);
+    return () => {
+      cancelled = true;
+      clearInterval(interval);
+    };
+  }, [model, modelReady]);
+
   // ============================================================
   // SOCKET LIVE EVENTS
   // ============================================================
@@ -240,8 +259,8 @@ Recent Threat Types: ${dangerous.slice(0, 5).map(e => e.prediction).join(", ")}`
         <ThreatFeed key={`${tableKey}-feed`} events={rows} />
         <ThreatTimeline key={`${tableKey}-timeline`} events={rows} />
         <Sparkline key={`${tableKey}-spark`} events={rows} />
-        <TopIPs key={`${tableKey}-ips`} events={rows} />
-        <TopCountries key={`${tableKey}-countries`} events={rows} />
+        <TopIPs key={`${tableKey}-ips`} items={counters?.dims?.src_ip} events={rows} />
+        <TopCountries key={`${tableKey}-countries`} items={counters?.dims?.src_country} events={rows} />
       </div>
 
       <p className="text-xs text-slate-400 text-right">
@@ -1,14 +1,19 @@
-export default function TopIPs({ events }) {
-  const map = {};
-
-  events.forEach((e) => {
-    const ip = e.src_ip || "Unknown";
-    map[ip] = (map[ip] || 0) + 1;
-  });
-
-  const sorted = Object.entries(map)
-    .sort((a, b) => b[1] - a[1])
-    .slice(0, 6);
+// `items` are the server counters ([{ key, count }] from /api/traffic/counters);
+// until they arrive the panel ranks the recent `events` it was handed.
+export default function TopIPs({ items, events = [] }) {
+  let sorted;
+  if (Array.isArray(items)) {
+    sorted = items.slice(0, 6).map((it) => [it.key, it.count]);
+  } else {
+    const map = {};
+    events.forEach((e) => {
+      const ip = e.src_ip || "Unknown";
+      map[ip] = (map[ip] || 0) + 1;
+    });
+    sorted = Object.entries(map)
+      .sort((a, b) => b[1] - a[1])
+      .slice(0, 6);
+  }
 
   return (
     <div className="cyber-card p-4">
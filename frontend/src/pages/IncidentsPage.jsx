@@ -343,7 +343,7 @@ export default function OfflineDetection() {
                   <p className="text-[9px] text-emerald-500 font-bold mt-1 uppercase tracking-tighter">Total Observations: {resultData.total_processed || resultData.results.length}</p>
                 </div>
                 <div className="flex gap-2">
-                   <button onClick={downloadOfflineReport} title="Export PDF Report" className="p-2.5 bg-rose-500/10 text-rose-500 border border-rose-500/20 rounded-xl hover:bg-rose-500 hover:text-white transition-all transform hover:-translate-y-1">
+                   <button onClick={() => downloadOfflineReport(resultData.job_id)} title="Export PDF Report" className="p-2.5 bg-rose-500/10 text-rose-500 border border-rose-500/20 rounded-xl hover:bg-rose-500 hover:text-white transition-all transform hover:-translate-y-1">
                      <FileText size={18}/>
                    </button>
                    <button onClick={() => {
@@ -1,9 +1,17 @@
 from flask import Blueprint, request, jsonify
-from groq import Groq
 import os
 
 chat_bp = Blueprint("chat_bp", __name__)
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+_client = None
+
+
+def _get_client():
+    # Groq SDK import + client construction is deferred to the first chat
+    global _client
+    if _client is None:
+        from groq import Groq
+        _client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+    return _client
 
 @chat_bp.route("/chat", methods=["POST"])
 def chat():
@@ -11,7 +19,7 @@ def chat():
         data = request.get_json()
         msg = data.get("message", "")
 
-        result = client.chat.completions.create(
+        result = _get_client().chat.completions.create(
             model="llama-3.1-8b-instant",
             messages=[{"role": "user", "content": msg}]
         )
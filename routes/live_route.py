@@ -3,31 +3,36 @@
 # ==============================================================
 
 from flask import Blueprint, jsonify, request
-from capture.live_manager import sniffer
 import numpy as np
 import math
 
 
 live_bp = Blueprint("live_bp", __name__)
 
+
+def _sniffer():
+    # capture.live_manager pulls in scapy; import it on the first live request
+    from capture.live_manager import sniffer
+    return sniffer
+
 @live_bp.route("/start")
 def start_live():
     iface = request.args.get("iface")
-    sniffer.start(iface=iface)
-    return jsonify({"status": "started", "running": sniffer.is_running()})
+    _sniffer().start(iface=iface)
+    return jsonify({"status": "started", "running": _sniffer().is_running()})
 
 @live_bp.route("/stop")
 def stop_live():
-    sniffer.stop()
-    return jsonify({"status": "stopped", "running": sniffer.is_running()})
+    _sniffer().stop()
+    return jsonify({"status": "stopped", "running": _sniffer().is_running()})
 
 @live_bp.route("/status")
 def status():
-    return jsonify({"running": sniffer.is_running()})
+    return jsonify({"running": _sniffer().is_running()})
 
 @live_bp.route("/recent")
 def recent():
-    events = sniffer.recent()
+    events = _sniffer().recent()
 
     safe_events = []
     for e in events:
@@ -50,4 +55,4 @@ def recent():
 
 @live_bp.route("/stats")
 def stats():
-    return jsonify(sniffer.stats())
+    return jsonify(_sniffer().stats())
@@ -1,47 +1,81 @@
-from flask import Blueprint, send_file, jsonify, request
-import os
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from utils.logger import (
-    BCC_LOG_FILE,
-    CICIDS_LOG_FILE,
-    LOG_FILE,
     get_recent_events,
+    query_events,
+    export_csv,
+    list_segments,
     get_model_stats,
     clear_last_events,
     delete_by_prediction,
     delete_by_index,
-    get_active_model
+    get_active_model,
+    get_counts,
+    writer_stats
 )
 
 logs_bp = Blueprint("logs", __name__)
 
 
 # -------------------------------
-# DOWNLOAD CSV LOG FILE (global)
+# DOWNLOAD CSV LOG (streamed from the event store)
 # -------------------------------
 @logs_bp.route("/download", methods=["GET"])
 def download_logs():
-    model = request.args.get("model")
+    """
+    ?model=bcc|cicids&start=&end= (epoch seconds or ISO time). Only the
+    archived segments overlapping the range are read.
+    """
+    model = request.args.get("model") or get_active_model()
+    try:
+        chunks = export_csv(model, request.args.get("start"), request.args.get("end"))
+    except ValueError as e:
+        return jsonify({"error": f"Invalid time range: {e}"}), 400
 
-    # MODEL-SPECIFIC CSVs
-    if model == "bcc":
-        path = BCC_LOG_FILE
-    elif model == "cicids":
-        path = CICIDS_LOG_FILE
-    else:
-        # fallback — global CSV
-        path = LOG_FILE
-
-    if not os.path.exists(path):
-        return jsonify({"error": "Log file not found"}), 404
-
-    return send_file(
-        path,
-        as_attachment=True,
-        download_name=f"{model}_logs.csv" if model else "traffic_logs.csv",
+    return Response(
+        stream_with_context(chunks),
         mimetype="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={model}_logs.csv"},
     )
 
 
+# -------------------------------
+# LOG SEGMENT INDEX
+# -------------------------------
+@logs_bp.route("/segments", methods=["GET"])
+def log_segments():
+    model = request.args.get("model")
+    segs = list_segments(model)
+    return jsonify({"count": len(segs), "segments": segs})
+
+
+# -------------------------------
+# QUERY HISTORICAL EVENTS
+# -------------------------------
+@logs_bp.route("/query", methods=["GET"])
+def query_logs():
+    """
+    ?model=&start=&end=&ip=&src_ip=&dst_ip=&class=A,B&offset=&limit=
+    over the full event history (newest first unless order=asc).
+    """
+    args = request.args
+    classes = [c.strip() for c in args.get("class", "").split(",") if c.strip()] or None
+    try:
+        rows, total = query_events(
+            model=args.get("model", get_active_model()),
+            start=args.get("start"), end=args.get("end"),
+            ip=args.get("ip"), src_ip=args.get("src_ip"), dst_ip=args.get("dst_ip"),
+            prediction=classes,
+            offset=int(args.get("offset", 0)), limit=int(args.get("limit", 100)),
+            newest_first=args.get("order", "desc") != "asc")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print("❌ Log query error:", e)
+        return jsonify({"error": "Failed to query logs"}), 500
+
+    return jsonify({"total": total, "count": len(rows), "events": rows})
+
+
 
 # -------------------------------
 # DOWNLOAD MODEL-SPECIFIC JSON
@@ -129,7 +163,9 @@ def log_status():
         return jsonify({
             "model": model,
             "total_events": total,
-            "by_class": counts
+            "by_class": counts,
+            "by_risk": get_counts(model, "risk_level"),
+            "writer": writer_stats()
         })
     except Exception as e:
         print("❌ Log status error:", e)
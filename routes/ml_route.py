@@ -7,18 +7,20 @@ from flask import Blueprint, request, jsonify
 import threading
 import time
 import os
-import joblib
 import random
 from datetime import datetime
 from flask_cors import cross_origin
 import numpy as np
+from utils.model_selector import apply_sklearn_patch
 
 ml_bp = Blueprint("ml_bp", __name__)
 
 ML_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "ml_models"))
 
 # In-memory global stores
-MODELS = {}
+MODELS = {}            # name -> {"obj", "name", "path", "signature", ["load_error"]}
+_DERIVED_CACHE = {}    # (name, signature, kind) -> cached derived data
+_MODELS_LOCK = threading.RLock()
 RETRAIN_STATUS = {"running": False, "progress": 0, "message": "", "last_result": None}
 METRICS_CACHE = {}
 
@@ -34,25 +36,71 @@ FEATURE_NAMES = [
 # 🧠 Model Management
 # ==========================================================
 
+def _file_signature(path):
+    st = os.stat(path)
+    return (st.st_size, st.st_mtime_ns)
+
+
 def try_load_models():
-    """Load models from disk (if available)."""
-    global MODELS
-    MODELS = {}
+    """
+    Sync MODELS with the .pkl files in ML_DIR.
+
+    Each file is deserialized once and only reloaded when its (size, mtime)
+    signature changes; removed files are dropped. Failed loads are remembered
+    per signature too, so a broken file is not retried on every request.
+    """
     try:
-        files = os.listdir(ML_DIR)
+        entries = [e for e in os.scandir(ML_DIR) if e.is_file() and e.name.endswith(".pkl")]
     except Exception:
-        files = []
+        entries = []
 
-    for fname in files:
-        if fname.endswith(".pkl"):
-            name = os.path.splitext(fname)[0]
+    with _MODELS_LOCK:
+        seen = set()
+        for de in entries:
+            name = os.path.splitext(de.name)[0]
+            seen.add(name)
             try:
-                m = joblib.load(os.path.join(ML_DIR, fname))
-                MODELS[name] = {"obj": m, "name": name, "path": os.path.join(ML_DIR, fname)}
-            except Exception as e:
-                MODELS[name] = {"obj": None, "name": name, "path": os.path.join(ML_DIR, fname), "load_error": str(e)}
+                sig = _file_signature(de.path)
+            except OSError:
+                continue
 
-try_load_models()
+            current = MODELS.get(name)
+            if current and current.get("signature") == sig:
+                continue
+
+            try:
+                import joblib
+                apply_sklearn_patch()
+                m = joblib.load(de.path)
+                MODELS[name] = {"obj": m, "name": name, "path": de.path, "signature": sig}
+            except Exception as e:
+                MODELS[name] = {"obj": None, "name": name, "path": de.path, "signature": sig, "load_error": str(e)}
+
+        for name in list(MODELS):
+            if name not in seen:
+                del MODELS[name]
+
+        # forget derived data for versions that are no longer loaded
+        live = {(n, e.get("signature")) for n, e in MODELS.items()}
+        for key in list(_DERIVED_CACHE):
+            if key[:2] not in live:
+                del _DERIVED_CACHE[key]
+    return MODELS
+
+
+def _cached_derived(name, entry, kind, compute):
+    """Memoize expensive per-model data (summary, importances) per file version."""
+    key = (name, entry.get("signature"), kind)
+    with _MODELS_LOCK:
+        if key in _DERIVED_CACHE:
+            return _DERIVED_CACHE[key]
+    value = compute()
+    with _MODELS_LOCK:
+        _DERIVED_CACHE[key] = value
+    return value
+
+# NOTE: no load at import time; every endpoint calls try_load_models() itself,
+# which is a cheap stat() sweep once the files are cached
 
 def model_summary(name, entry):
     obj = entry.get("obj")
@@ -84,7 +132,10 @@ def model_summary(name, entry):
 def list_models():
     """Return all available models."""
     try_load_models()
-    out = [model_summary(name, entry) for name, entry in MODELS.items()]
+    out = [
+        dict(_cached_derived(name, entry, "summary", lambda: model_summary(name, entry)))
+        for name, entry in list(MODELS.items())
+    ]
 
     if not out:
         out = [{
@@ -168,7 +219,7 @@ def predict_test():
         if model_name and model_name in MODELS:
             chosen = MODELS[model_name]
         else:
-            for k, e in MODELS.items():
+            for k, e in list(MODELS.items()):
                 if e.get("obj") is not None:
                     chosen = e
                     break
@@ -249,6 +300,25 @@ def retrain_status():
 # 🧩 FEATURE IMPORTANCE
 # ==========================================================
 
+def _compute_feature_importance(mdl):
+    """Real importances from a fitted model, or None if it exposes none."""
+    fi = []
+    if hasattr(mdl, "feature_importances_"):
+        arr = np.array(getattr(mdl, "feature_importances_")).flatten()
+        arr = arr[:len(FEATURE_NAMES)]
+        for i, v in enumerate(arr):
+            fi.append({"feature": FEATURE_NAMES[i], "importance": float(v)})
+    elif hasattr(mdl, "coef_"):
+        arr = np.abs(np.array(getattr(mdl, "coef_")).flatten())
+        arr = arr[:len(FEATURE_NAMES)]
+        total = float(np.sum(arr)) or 1.0
+        for i, v in enumerate(arr):
+            fi.append({"feature": FEATURE_NAMES[i], "importance": float(v / total * 100.0)})
+    else:
+        return None
+    return fi
+
+
 @ml_bp.route("/feature-importance/<model_id>", methods=["GET"])
 @cross_origin()
 def feature_importance(model_id):
@@ -258,19 +328,12 @@ def feature_importance(model_id):
         entry = MODELS.get(model_id)
         mdl = entry.get("obj") if entry else None
 
-        fi = []
-        if mdl is not None and hasattr(mdl, "feature_importances_"):
-            arr = np.array(getattr(mdl, "feature_importances_")).flatten()
-            arr = arr[:len(FEATURE_NAMES)]
-            for i, v in enumerate(arr):
-                fi.append({"feature": FEATURE_NAMES[i], "importance": float(v)})
-        elif mdl is not None and hasattr(mdl, "coef_"):
-            arr = np.abs(np.array(getattr(mdl, "coef_")).flatten())
-            arr = arr[:len(FEATURE_NAMES)]
-            total = float(np.sum(arr)) or 1.0
-            for i, v in enumerate(arr):
-                fi.append({"feature": FEATURE_NAMES[i], "importance": float(v / total * 100.0)})
-        else:
+        fi = None
+        if mdl is not None:
+            fi = _cached_derived(model_id, entry, "feature_importance",
+                                 lambda: _compute_feature_importance(mdl))
+
+        if fi is None:
             simulated = {
                 "protocol": 8.2,
                 "src_port": 7.1,
@@ -294,4 +357,3 @@ def feature_importance(model_id):
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
-
@@ -27,12 +27,11 @@ def select():
 @ml_switch.route("/health", methods=["GET"])
 def health():
     import numpy as np
-    import pandas as pd
 
     active = get_active_model()
     bundle = load_model(active)
 
-    model = bundle.get("model")
+    model = bundle.model
     artifacts = bundle.get("artifacts")
 
     # Default responses
@@ -52,12 +51,8 @@ def health():
         try:
             # generate a zero vector
             X = np.zeros((1, feature_count))
-            scaler = artifacts.get("scaler")
-            if scaler:
-                X = scaler.transform(X)
-
-            pred = model.predict(X)[0]
-            test_prediction = str(pred)
+            labels, _ = bundle.predict_labels_with_confidence(X)
+            test_prediction = str(labels[0])
 
         except Exception as e:
             test_prediction = f"Error: {str(e)}"
@@ -69,23 +64,8 @@ def health():
         try:
             # Create minimal fake BCC packet feature vector: 15 values
             X = np.zeros((1, 15))
-
-            scaler = bundle.get("scaler")
-            encoder = bundle.get("encoder")
-
-            if scaler:
-                Xs = scaler.transform(X)
-            else:
-                Xs = X
-
-            pred_raw = model.predict(Xs)[0]
-
-            if encoder:
-                pred = encoder.inverse_transform([int(pred_raw)])[0]
-            else:
-                pred = str(pred_raw)
-
-            test_prediction = f"OK: {pred}"
+            labels, _ = bundle.predict_labels_with_confidence(X)
+            test_prediction = f"OK: {labels[0]}"
 
         except Exception as e:
             test_prediction = f"Error: {str(e)}"
@@ -99,7 +79,9 @@ def health():
         "artifact_keys": artifact_keys,
         "feature_count": feature_count,
         "features": features,
-        "test_prediction": test_prediction
+        "test_prediction": test_prediction,
+        "load_error": bundle.load_error,
+        "scaler_fallbacks": bundle.scaler_fallbacks,
     }
 
 
@@ -1,16 +1,10 @@
 import os
-import pandas as pd
-import joblib
-from flask import Blueprint, request, jsonify, send_file, make_response, after_this_request
-from werkzeug.utils import secure_filename
+from flask import Blueprint, request, jsonify, send_file, make_response
 from datetime import datetime
-from fpdf import FPDF
-from io import BytesIO
 import time
-import requests
 
 # --- IMPORT UTILS ---
-from utils.pcap_to_csv import convert_pcap_to_csv
+# pandas / fpdf are imported inside the handlers that use them
 from utils.model_selector import load_model
 
 offline_bp = Blueprint("offline_bp", __name__)
@@ -22,36 +16,14 @@ SAMPLE_DIR = "sample"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(SAMPLE_DIR, exist_ok=True)
 
-ALLOWED_EXT = {"csv", "pcap"}
+ALLOWED_EXT = {"csv", "pcap", "pcapng"}
+PCAP_EXT = {"pcap", "pcapng"}
+
+# Uploads at least this large are scored in chunked streaming mode
+STREAM_THRESHOLD_BYTES = int(os.environ.get("NIDS_OFFLINE_STREAM_BYTES", 64 * 1024 * 1024))
 
 # --- FEATURE DEFINITIONS (As per your Model Logs) ---
-# --- UPDATED FEATURE DEFINITIONS ---
-BCC_FEATURES = [
-    "protocol",
-    "src_port",
-    "dst_port",
-    "duration",
-    "packets_count",
-    "fwd_packets_count",
-    "bwd_packets_count",
-    "total_payload_bytes",
-    "total_header_bytes",
-    "bytes_rate",
-    "packets_rate",
-    "syn_flag_counts",
-    "ack_flag_counts",
-    "rst_flag_counts",
-    "fin_flag_counts",
-]
-
-CICIDS_FEATURES = [
-    "Protocol", "Dst Port", "Flow Duration", "Tot Fwd Pkts", "Tot Bwd Pkts",
-    "TotLen Fwd Pkts", "TotLen Bwd Pkts", "Fwd Pkt Len Mean", "Bwd Pkt Len Mean",
-    "Flow IAT Mean", "Fwd PSH Flags", "Fwd URG Flags", "Fwd IAT Mean"
-]
-
-def allowed(filename):
-    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXT
+# Feature lists, header mapping and flag logic live in utils.offline_pipeline
 
 # --- ROUTE: DOWNLOAD SAMPLE ---
 @offline_bp.route("/sample/<model_type>", methods=["GET"])
@@ -65,226 +37,320 @@ def download_sample(model_type):
 # --- ROUTE: URL LIVE PROBE ---
 @offline_bp.route("/analyze-url", methods=["POST"])
 def analyze_url():
-    target_url = request.json.get("url")
-    if not target_url:
+    """
+    {"url": ...} probes one URL; {"urls": [...]} probes a batch concurrently.
+    Bodies are read up to ?max_bytes= (default PROBE_MAX_BYTES) and all
+    synthetic rows are scored in one BCC model call.
+    """
+    from utils import url_probe
+
+    data = request.get_json(silent=True) or {}
+    urls = data.get("urls")
+    batch = isinstance(urls, list)
+    if not batch:
+        urls = [data.get("url")] if data.get("url") else []
+    urls = [u for u in urls if isinstance(u, str) and u.strip()]
+    if not urls:
         return jsonify(success=False, message="No URL provided"), 400
+    if len(urls) > url_probe.MAX_BATCH_URLS:
+        return jsonify(success=False, message=f"At most {url_probe.MAX_BATCH_URLS} URLs per batch"), 400
+    try:
+        max_bytes = int(data.get("max_bytes") or request.args.get("max_bytes") or url_probe.PROBE_MAX_BYTES)
+    except (TypeError, ValueError):
+        return jsonify(success=False, message="max_bytes must be an integer"), 400
+    max_bytes = max(1, min(max_bytes, url_probe.PROBE_MAX_BYTES))
 
-    # Ensure URL is properly formatted
-    if not target_url.startswith("http"):
-        target_url = "https://" + target_url
+    started = time.time()
+    probes = url_probe.probe_many(urls, max_bytes)
 
-    # 1. Start "Synthetic Capture" (Timing the request)
-    start_ts = time.time()
-    
     try:
-        # Use a real user-agent to avoid being blocked by the site
-        headers_ua = {'User-Agent': 'Mozilla/5.0 (NIDS-Intelligence-Probe/1.0)'}
-        response = requests.get(target_url, timeout=10, headers=headers_ua, stream=True)
-        end_ts = time.time()
-        
-        # 2. Extract Metadata for Synthetic Features
-        duration = end_ts - start_ts
-        # We read the content length or measure the response body
-        payload_bytes = len(response.content) 
-        header_bytes = len(str(response.headers))
-        
-        # 3. Map to your Model's Features (BCC Format)
-        # We simulate packet counts based on typical TCP handshakes (approx 8-10 packets per small request)
-        synthetic_row = {
-            "protocol": 6, # TCP/HTTPS
-            "src_port": 443,
-            "dst_port": 443,
-            "duration": duration,
-            "packets_count": 10,
-            "fwd_packets_count": 5,
-            "bwd_packets_count": 5,
-            "total_payload_bytes": payload_bytes,
-            "total_header_bytes": header_bytes,
-            "bytes_rate": payload_bytes / duration if duration > 0 else 0,
-            "packets_rate": 10 / duration if duration > 0 else 0,
-            "syn_flag_counts": 1, 
-            "ack_flag_counts": 1,
-            "rst_flag_counts": 0,
-            "fin_flag_counts": 1
-        }
-        
-        # 4. Convert to DataFrame for Prediction
-        df_url = pd.DataFrame([synthetic_row])
-        
-        # --- REUSE YOUR PREDICTION LOGIC ---
-        # Note: You can call a helper function here or reuse the logic from offline_predict
-        # Make sure to apply the same scaler and model you loaded in the other route
-        model_data = load_model("bcc") 
-        scaler = model_data.get('scaler')
-        encoder = model_data.get('encoder')
-        model = model_data['model']
-
-        # Scale and Predict
-        numeric_input = df_url[BCC_FEATURES].apply(pd.to_numeric).fillna(0)
-        scaled_data = scaler.transform(numeric_input.values)
-        preds = model.predict(scaled_data)
-        label = encoder.inverse_transform(preds)[0]
+        # Scale and Predict (same BCC bundle as offline uploads)
+        model_data = load_model("bcc")
+        if not model_data or not model_data.ready:
+            raise RuntimeError("Model failed to load. Check the local model registry.")
+        url_probe.score_probes(probes, model_data)
+    except Exception as e:
+        return jsonify(success=False, message=f"URL Probe Failed: {str(e)}"), 500
 
+    if not batch:
+        probe = probes[0]
+        if "error" in probe:
+            return jsonify(success=False, message=f"URL Probe Failed: {probe['error']}"), 500
         return jsonify({
             "success": True,
-            "prediction": str(label),
-            "details": synthetic_row,
-            "url": target_url
+            "prediction": probe["prediction"],
+            "details": probe["details"],
+            "url": probe["url"],
+            "bytes_read": probe["bytes_read"],
+            "truncated": probe["truncated"],
+            "transfer_rate": probe["transfer_rate"]
         })
 
+    counts = {}
+    for probe in probes:
+        if "prediction" in probe:
+            counts[probe["prediction"]] = counts.get(probe["prediction"], 0) + 1
+    return jsonify({
+        "success": True,
+        "results": probes,
+        "classCounts": counts,
+        "failed": sum(1 for p in probes if "error" in p),
+        "seconds": round(time.time() - started, 3)
+    })
+
+# --- OFFLINE JOB BODY ---
+class OfflineInputError(ValueError):
+    """Upload content the pipeline can't score (empty CSV, no flows...)."""
+
+
+def _score_small_csv(source, model_type, model_data, result_base):
+    import pandas as pd
+    from utils import offline_pipeline as pipeline
+    from utils.offline_results import ResultWriter
+
+    # 1. Load Data
+    try:
+        df = pd.read_csv(pipeline._rewind(source))
     except Exception as e:
-        return jsonify(success=False, message=f"URL Probe Failed: {str(e)}"), 500
+        raise OfflineInputError(f"Error reading CSV: {str(e)}")
+    if df.empty:
+        raise OfflineInputError("CSV has no data!")
 
-# --- ROUTE: PREDICT ---
-@offline_bp.route("/predict", methods=["POST"])
-def offline_predict():
-    if "file" not in request.files:
-        return jsonify(success=False, message="No file uploaded"), 400
+    # 2. Flexible Feature Mapping, Flag Extraction & Protocol Mapping
+    df = pipeline.normalize_frame(df, model_type)
+
+    # 3. Prediction Logic (missing features are padded with 0)
+    stats = {}
+    labels = pipeline.score_frame(model_data, df, model_type, stats)
+
+    # 4. Result Formatting for React Frontend
+    df["prediction"] = labels
+    class_counts = df["prediction"].value_counts().to_dict()
+
+    # Inline preview only; every row is served by /jobs/<id>/results
+    preview = labels[:pipeline.RESULTS_PREVIEW]
+    results = [{"index": i, "class": str(lbl)} for i, lbl in enumerate(preview)]
+
+    # Save results (all columns) for the results API and PDF report
+    writer = ResultWriter(result_base)
+    writer.write(df)
+    writer.close()
+
+    return {
+        "classCounts": {str(k): int(v) for k, v in class_counts.items()},
+        "results": results,
+        "results_truncated": len(df) > len(results),
+        "total_processed": len(df),
+        **pipeline.dedup_summary(stats)
+    }
 
-    file = request.files["file"]
-    model_type = request.form.get("model", "bcc")
 
-    if not allowed(file.filename):
-        return jsonify(success=False, message="Unsupported file type"), 400
+def _run_offline_job(source, ext, size, model_type, stream, job_path, progress):
+    """
+    Score one upload into the job's results file and return the summary.
+    `source` is the spilled file path, or a BytesIO for uploads kept in memory.
+    """
+    from utils import offline_pipeline as pipeline
+    from utils import offline_parallel
+    from utils.offline_jobs import run_blocking
+    from utils.offline_results import RESULTS_NAME
 
-    filename = secure_filename(file.filename)
-    saved_path = os.path.join(UPLOAD_DIR, filename)
-    file.save(saved_path)
+    result_path = os.path.join(job_path, RESULTS_NAME)
+    try:
+        # Both models over one parse of the file (always chunked, in-process)
+        if model_type == "both":
+            bundles = {m: load_model(m) for m in pipeline.MODELS}
+            if not all(b and b.ready for b in bundles.values()):
+                raise RuntimeError("Model failed to load. Check the local model registry.")
+            kind = "pcap" if ext in PCAP_EXT else "csv"
+            summary = pipeline.stream_score_both(source, bundles, result_path, kind,
+                                                 progress=progress, run=run_blocking)
+            if not summary["total_processed"]:
+                raise OfflineInputError("No IP flows found in capture!" if kind == "pcap" else "CSV has no data!")
+            return dict(summary, streamed=True)
+
+        # Model Loading
+        model_data = load_model(model_type)
+        if not model_data or not model_data.ready:
+            raise RuntimeError("Model failed to load. Check the local model registry.")
+
+        # Process-pool scoring only waits on futures, so it stays on the green thread;
+        # in-process scoring is CPU-bound and goes through run_blocking()
+        parallel = offline_parallel.should_parallelize(source)
 
-    # Cleanup logic to keep the server clean
-    @after_this_request
-    def cleanup(response):
+        # Captures are aggregated into flows packet by packet and scored as flows expire
+        if ext in PCAP_EXT:
+            if parallel:
+                summary = offline_parallel.parallel_score_pcap(source, model_type, result_path, progress=progress)
+            else:
+                summary = run_blocking(pipeline.stream_score_pcap, source, model_type, model_data,
+                                       result_path, pipeline.PCAP_BATCH_FLOWS, progress)
+            if not summary["total_processed"]:
+                raise OfflineInputError("No IP flows found in capture!")
+            return dict(summary, streamed=True)
+
+        # Large uploads (or stream=1) are scored chunk by chunk in bounded memory
+        if stream or size >= STREAM_THRESHOLD_BYTES:
+            if parallel:
+                summary = offline_parallel.parallel_score_csv(source, model_type, result_path, progress=progress)
+            else:
+                summary = run_blocking(pipeline.stream_score_csv, source, model_type, model_data,
+                                       result_path, pipeline.CHUNK_ROWS, progress)
+            if not summary["total_processed"]:
+                raise OfflineInputError("CSV has no data!")
+            return dict(summary, streamed=True)
+
+        return run_blocking(_score_small_csv, source, model_type, model_data, result_path)
+    finally:
+        # Cleanup logic to keep the server clean (results stay until the job expires)
         try:
-            if os.path.exists(saved_path):
-                os.remove(saved_path)
+            if isinstance(source, str) and os.path.exists(source):
+                os.remove(source)
         except Exception as e:
             print(f"Cleanup Error: {e}")
-        return response
 
-    # 1. Load Data
-    try:
-        # If PCAP, you'd call your converter here. For now, assuming CSV load.
-        df = pd.read_csv(saved_path)
-        if df.empty:
-            return jsonify(success=False, message="CSV has no data!"), 400
-    except Exception as e:
-        return jsonify(success=False, message=f"Error reading CSV: {str(e)}"), 400
-
-    # 2. Flexible Feature Mapping & Flag Extraction
-    # Renames common CSV headers to the specific technical names the model expects
-    # 2. Flexible Feature Mapping (Translate to EXACT fit-time names)
-    # 2. Flexible Feature Mapping
-    mapping = {
-        'Protocol': 'protocol', 'proto': 'protocol',
-        'Source Port': 'src_port',
-        'Destination Port': 'dst_port',
-        'Flow Duration': 'duration', 'flow_duration': 'duration',
-        'Total Fwd Packets': 'fwd_packets_count', 'total_fwd_pkts': 'fwd_packets_count',
-        'Total Bwd Packets': 'bwd_packets_count', 'total_bwd_pkts': 'bwd_packets_count',
-        'Total Length of Fwd Packets': 'total_payload_bytes', 'payload_len': 'total_payload_bytes',
-        'fwd_header_len': 'total_header_bytes', 'header_len': 'total_header_bytes',
-        'Flow Bytes/s': 'bytes_rate', 'rate': 'bytes_rate',
-        'Flow Pkts/s': 'packets_rate',
-        'syn': 'syn_flag_counts', 'ack': 'ack_flag_counts', 
-        'rst': 'rst_flag_counts', 'fin': 'fin_flag_counts'
-    }
-    df = df.rename(columns=mapping)
-
-    # Calculate packets_count if missing
-    if 'packets_count' not in df.columns and 'fwd_packets_count' in df.columns:
-        df['packets_count'] = df['fwd_packets_count'] + df.get('bwd_packets_count', 0)
-
-    # --- FLAG EXTRACTION LOGIC ---
-    flag_map = {
-        'syn_flag_counts': 'syn', 
-        'ack_flag_counts': 'ack', 
-        'rst_flag_counts': 'rst', 
-        'fin_flag_counts': 'fin'
-    }
 
-    for model_name, csv_name in flag_map.items():
-        if model_name not in df.columns:
-            if 'flags' in df.columns:
-                # Handle String flags safely
-                if df['flags'].dtype == object:
-                    df[model_name] = df['flags'].str.lower().str.contains(csv_name).astype(int)
-                else:
-                    # Fallback for numeric or missing flag data
-                    df[model_name] = 0
-            else:
-                df[model_name] = 0
+# --- ROUTE: PREDICT (ENQUEUE JOB) ---
+@offline_bp.route("/predict", methods=["POST"])
+def offline_predict():
+    """
+    Enqueue an offline job. The body (multipart "file" field, or a raw body
+    with ?filename=) is parsed straight off the request stream; small files
+    stay in memory, larger ones spill once into the job directory.
+    """
+    from utils import offline_jobs, offline_cache, offline_upload
 
-    # 3. Model Loading & Feature Alignment
     try:
-        model_data = load_model(model_type)
-        if not model_data or model_data.get('model') is None:
-            return jsonify(success=False, message="Model failed to load. Check Hub connection."), 500
-
-        model = model_data['model']
-        expected = BCC_FEATURES if model_type == "bcc" else CICIDS_FEATURES
-        
-        # 🚀 SAFETY PADDING: Fill missing features with 0 to prevent "CRITICAL_ERROR"
-        for col in expected:
-            if col not in df.columns:
-                df[col] = 0 
-                
+        job_id = offline_jobs.new_job()
+    except offline_jobs.JobQueueFull as e:
+        return jsonify(success=False, message=str(e)), 429
+
+    try:
+        spool, form = offline_upload.receive(request, offline_jobs.job_dir(job_id), ALLOWED_EXT)
+        source, digest = spool.finish()
+    except offline_upload.UploadRejected as e:
+        offline_jobs.discard(job_id)
+        return jsonify(success=False, message=str(e)), e.status
     except Exception as e:
-        return jsonify(success=False, message=f"Model Initialization Error: {str(e)}"), 500
-    
+        offline_jobs.discard(job_id)
+        return jsonify(success=False, message=f"Upload failed: {str(e)}"), 500
+
+    model_type = form.get("model", "bcc")
+    if model_type not in ("bcc", "cicids", "both"):
+        offline_jobs.discard(job_id)
+        return jsonify(success=False, message=f"Unknown model '{model_type}'"), 400
+    offline_jobs.set_meta(job_id, model=model_type, filename=spool.filename, size=spool.size)
+
+    # Identical upload + same model version -> reuse the finished job
+    stream = (form.get("stream") or request.args.get("stream") or "").lower() in ("1", "true", "yes")
+    if spool.ext in PCAP_EXT:
+        mode = "pcap"
+    else:
+        mode = "stream" if stream or spool.size >= STREAM_THRESHOLD_BYTES else "full"
+    key = offline_cache.cache_key(digest, model_type, mode)
+    cached = offline_cache.lookup(key)
+    if cached:
+        offline_jobs.discard(job_id)
+        return jsonify(success=True, cached=True, **cached)
+
+    job = offline_jobs.submit(
+        job_id,
+        lambda job_path, progress: _run_offline_job(source, spool.ext, spool.size, model_type,
+                                                    stream, job_path, progress),
+        on_done=lambda done_id, result: offline_cache.store(key, done_id))
+    return jsonify(success=True, cached=False, **job), 202
+
+
+# --- ROUTE: JOB STATUS / RESULT ---
+@offline_bp.route("/jobs/<job_id>", methods=["GET"])
+def offline_job_status(job_id):
+    from utils import offline_jobs
+
+    job = offline_jobs.get_job(job_id)
+    if job is None:
+        return jsonify(success=False, message="Unknown or expired job"), 404
+    return jsonify(success=job["status"] != offline_jobs.FAILED, **job)
+
+
+# --- ROUTE: PAGINATED JOB RESULTS ---
+@offline_bp.route("/jobs/<job_id>/results", methods=["GET"])
+def offline_job_results(job_id):
+    """
+    ?offset=&limit=&class=A,B&columns=col1,col2 over the job's stored results.
+    Dual-model jobs filter classes of ?model=bcc|cicids (default bcc).
+    """
+    from utils import offline_jobs, offline_results
+
+    result_file = offline_jobs.result_path(job_id)
+    if not result_file:
+        return jsonify(success=False, message="Job not finished, failed or expired"), 404
+
+    def _csv_arg(name):
+        raw = request.args.get(name, "")
+        return [v for v in (x.strip() for x in raw.split(",")) if v] or None
 
-    # 4. Prediction Logic
     try:
-        # 1. Map protocols first!
-        proto_map = {'TCP': 6, 'UDP': 17, 'ICMP': 1, 'tcp': 6, 'udp': 17, 'icmp': 1}
-        df['protocol'] = df['protocol'].apply(lambda x: proto_map.get(x, x) if isinstance(x, str) else x)
-
-        # 2. Reorder columns
-        input_data = df[expected] 
-    
-        if model_type == "bcc":
-            scaler = model_data.get('scaler')
-            encoder = model_data.get('encoder')
-        
-            # Ensure all columns are numeric before scaling
-            numeric_input = input_data.apply(pd.to_numeric, errors='coerce').fillna(0)
-        
-            # 3. Scale features
-            scaled_data = scaler.transform(numeric_input.values) # Now it's all floats!
-            preds = model.predict(scaled_data)
-        
-            labels = encoder.inverse_transform(preds)
-
-        # 5. Result Formatting for React Frontend
-        df["prediction"] = labels
-        class_counts = df["prediction"].value_counts().to_dict()
-        
-        # Convert all labels to strings for JSON serializability
-        results = [{"index": i, "class": str(lbl)} for i, lbl in enumerate(labels)]
-        
-        # Save results for the PDF report generator
-        df.to_csv(os.path.join(UPLOAD_DIR, "last_results.csv"), index=False)
+        offset = int(request.args.get("offset", 0))
+        limit = int(request.args.get("limit", 100))
+    except ValueError:
+        return jsonify(success=False, message="offset/limit must be integers"), 400
 
-        return jsonify({
-            "success": True, 
-            "classCounts": class_counts, 
-            "results": results,
-            "total_processed": len(df)
-        })
+    class_column = "prediction"
+    if "prediction" not in offline_results.result_columns(result_file):
+        class_column = f"prediction_{request.args.get('model', 'bcc')}"
+
+    try:
+        rows, total = offline_results.read_page(result_file, offset, limit, classes=_csv_arg("class"),
+                                                columns=_csv_arg("columns"), class_column=class_column)
+    except ValueError as e:
+        return jsonify(success=False, message=str(e)), 400
+
+    return jsonify({
+        "success": True,
+        "job_id": job_id,
+        "offset": offset,
+        "limit": limit,
+        "total": total,
+        "columns": offline_results.result_columns(result_file),
+        "rows": rows
+    })
+
+
+# --- ROUTE: RESULT CACHE ---
+@offline_bp.route("/cache", methods=["GET"])
+def offline_cache_stats():
+    from utils import offline_cache, offline_pipeline
+    return jsonify(success=True, **offline_cache.stats(), schema_plans=offline_pipeline.plan_cache_stats())
+
+
+@offline_bp.route("/cache/clear", methods=["POST"])
+def offline_cache_clear():
+    from utils import offline_cache
+    model_type = (request.get_json(silent=True) or {}).get("model")
+    return jsonify(success=True, invalidated=offline_cache.invalidate(model_type))
 
-    except Exception as e:
-        import traceback
-        print(traceback.format_exc())
-        return jsonify(success=False, message=f"Prediction Engine Failure: {str(e)}"), 500
 
 # --- ROUTE: PDF REPORT (MEMORY SAFE) ---
 @offline_bp.route("/report", methods=["GET"])
 def offline_report():
-    result_file = os.path.join(UPLOAD_DIR, "last_results.csv")
-    if not os.path.exists(result_file):
-        return jsonify(success=False, message="Run prediction first"), 400
+    from utils import offline_jobs
 
-    df = pd.read_csv(result_file)
-    class_counts = df["prediction"].value_counts().to_dict()
+    job_id = request.args.get("job_id")
+    if not job_id:
+        return jsonify(success=False, message="job_id is required"), 400
+    result_file = offline_jobs.result_path(job_id)
+    if not result_file:
+        return jsonify(success=False, message="Job not finished, failed or expired"), 404
+
+    from fpdf import FPDF
+    from utils.offline_results import class_counts as read_class_counts
+
+    job = offline_jobs.get_job(job_id) or {}
+    result = job.get("result") or {}
+    if "models" in result:
+        sections = [(f"Classification Summary ({m.upper()}):", r["classCounts"]) for m, r in result["models"].items()]
+    else:
+        sections = [("Classification Summary:", result.get("classCounts") or read_class_counts(result_file))]
 
     # Generate PDF in memory
     pdf = FPDF()
@@ -297,12 +363,21 @@ def offline_report():
     pdf.cell(0, 10, f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", ln=True)
     pdf.ln(5)
 
-    pdf.set_font("Arial", "B", 12)
-    pdf.cell(0, 10, "Classification Summary:", ln=True)
-    pdf.set_font("Arial", size=12)
-    
-    for cls, count in class_counts.items():
-        pdf.cell(0, 8, f"- {cls}: {count} occurrences", ln=True)
+    for title, class_counts in sections:
+        pdf.set_font("Arial", "B", 12)
+        pdf.cell(0, 10, title, ln=True)
+        pdf.set_font("Arial", size=12)
+
+        for cls, count in class_counts.items():
+            pdf.cell(0, 8, f"- {cls}: {count} occurrences", ln=True)
+
+    if "agreement" in result:
+        pdf.set_font("Arial", "B", 12)
+        pdf.cell(0, 10, "Model Agreement (BCC -> CICIDS):", ln=True)
+        pdf.set_font("Arial", size=12)
+        for bcc_cls, row in result["agreement"].items():
+            for cic_cls, count in row.items():
+                pdf.cell(0, 8, f"- {bcc_cls} / {cic_cls}: {count}", ln=True)
 
     # Convert to bytes for response (no local file saving)
     response = make_response(pdf.output(dest='S').encode('latin-1'))
@@ -2,7 +2,6 @@
 from flask import Blueprint, request, jsonify
 import time
 import numpy as np
-import pandas as pd
 from utils.model_selector import load_model, get_active_model
 from utils.logger import classify_risk
 
@@ -23,11 +22,7 @@ def predict():
     mdl = load_model(active)
 
     if active == "bcc":
-        model = mdl.get("model")
-        scaler = mdl.get("scaler")
-        encoder = mdl.get("encoder")
-
-        if model is None or scaler is None or encoder is None:
+        if mdl.model is None or mdl.scaler is None or mdl.encoder is None:
             return jsonify({"error": "BCC model/scaler/encoder not loaded on server."}), 500
 
         data = request.get_json(force=True, silent=True)
@@ -49,20 +44,12 @@ def predict():
             return jsonify({"error": f"Failed to coerce input to numeric vector: {e}"}), 400
 
         try:
-            Xs = scaler.transform(X)
-        except Exception:
-            # fallback: try prediction without scaler
-            Xs = X
-
-        try:
-            pred_idx = model.predict(Xs)[0]
-            conf = None
-            if hasattr(model, "predict_proba"):
-                conf = float(np.max(model.predict_proba(Xs))) * 100.0
-            label = encoder.inverse_transform([int(pred_idx)])[0]
+            labels, conf = mdl.predict_labels_with_confidence(X)
+            label = str(labels[0])
+            conf = float(conf[0]) * 100.0 if conf is not None else None
             risk = classify_risk(label)
             return jsonify({
-                "prediction": str(label),
+                "prediction": label,
                 "confidence": round(conf, 2) if conf is not None else None,
                 "risk_level": risk
             })
@@ -70,16 +57,12 @@ def predict():
             return jsonify({"error": f"Model predict failed: {str(e)}"}), 500
 
     elif active == "cicids":
-        obj = mdl.get("artifacts", None)
-        model = mdl.get("model", None)
-        if model is None or obj is None:
+        if mdl.model is None or not mdl.artifacts:
             return jsonify({"error": "CICIDS model or artifacts not available on server."}), 500
 
         # artifacts expected to have 'features' and 'scaler'
-        features = obj.get("features") or obj.get("features_used") or obj.get("feature_list")
-        scaler = obj.get("scaler") or obj.get("scaler_object")
-
-        if not features or scaler is None:
+        features = mdl.features
+        if not features or mdl.scaler is None:
             return jsonify({"error": "CICIDS artifacts missing features or scaler."}), 500
 
         data = request.get_json(force=True, silent=True)
@@ -100,22 +83,10 @@ def predict():
             if len(row) != len(features):
                 return jsonify({"error": f"Expecting {len(features)} features for cicids: {features}"}), 400
 
-        X_df = pd.DataFrame([row], columns=features)
         try:
-            Xs = scaler.transform(X_df)
-        except Exception:
-            Xs = X_df.values
-
-        try:
-            pred = model.predict(Xs)[0]
-            conf = None
-            if hasattr(model, "predict_proba"):
-                conf = float(np.max(model.predict_proba(Xs))) * 100.0
-            # label may already be string; try safe conversion
-            try:
-                label = str(pred)
-            except Exception:
-                label = repr(pred)
+            labels, conf = mdl.predict_labels_with_confidence(np.array([row], dtype=float))
+            label = str(labels[0])
+            conf = float(conf[0]) * 100.0 if conf is not None else None
 
             risk = classify_risk(label)
             return jsonify({
@@ -130,3 +101,169 @@ def predict():
         return jsonify({"error": "Unknown active model"}), 500
 
 
+# ==========================================================
+# BATCH PREDICTION (JSON array / NDJSON / CSV / Arrow)
+# ==========================================================
+BATCH_CHUNK_SIZE = 2048
+
+_NDJSON_TYPES = ("application/x-ndjson", "application/jsonl", "application/ndjson")
+_CSV_TYPES = ("text/csv", "application/csv")
+_ARROW_STREAM = "application/vnd.apache.arrow.stream"
+_ARROW_FILE = "application/vnd.apache.arrow.file"
+_ARROW_TYPES = (_ARROW_STREAM, _ARROW_FILE)
+
+
+def _score_chunk(mdl, X):
+    """Score one chunk through the prepared bundle; confidence in percent."""
+    labels, conf = mdl.predict_labels_with_confidence(X)
+    if conf is not None:
+        conf = np.round(conf * 100.0, 2)
+    return labels, conf
+
+
+def _rows_to_matrix(rows, features):
+    """list of dict/list rows -> float matrix in model column order."""
+    n = len(features)
+    X = np.zeros((len(rows), n), dtype=float)
+    for i, row in enumerate(rows):
+        if isinstance(row, dict):
+            X[i] = [float(row.get(f, 0) or 0) for f in features]
+        else:
+            vals = list(row)
+            if len(vals) != n:
+                raise ValueError(f"row {i} has {len(vals)} values, expected {n}")
+            X[i] = [float(v) for v in vals]
+    return X
+
+
+def _iter_json_chunks(rows, features):
+    for start in range(0, len(rows), BATCH_CHUNK_SIZE):
+        yield _rows_to_matrix(rows[start:start + BATCH_CHUNK_SIZE], features)
+
+
+def _iter_ndjson_chunks(stream, features):
+    import json
+    buf = []
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        buf.append(json.loads(line))
+        if len(buf) >= BATCH_CHUNK_SIZE:
+            yield _rows_to_matrix(buf, features)
+            buf = []
+    if buf:
+        yield _rows_to_matrix(buf, features)
+
+
+def _iter_csv_chunks(stream, features):
+    import pandas as pd
+    reader = pd.read_csv(stream, chunksize=BATCH_CHUNK_SIZE)
+    checked = False
+    for chunk in reader:
+        if not checked:
+            missing = [f for f in features if f not in chunk.columns]
+            if missing:
+                raise ValueError(f"CSV is missing columns: {missing}")
+            checked = True
+        yield chunk[features].apply(pd.to_numeric, errors="coerce").fillna(0).to_numpy(dtype=float)
+
+
+def _iter_arrow_chunks(source, features, file_format=False):
+    """Arrow IPC stream (read as it arrives) or file format (`source` is the whole body)."""
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    if file_format:
+        # the file format keeps its footer at the end: needs the buffered body
+        reader = ipc.open_file(pa.BufferReader(source))
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    else:
+        reader = ipc.open_stream(source)
+        batches = reader
+    missing = [f for f in features if f not in reader.schema.names]
+    if missing:
+        raise ValueError(f"Arrow input is missing columns: {missing}")
+    for batch in batches:
+        table = pa.Table.from_batches([batch]).select(features)
+        for start in range(0, table.num_rows, BATCH_CHUNK_SIZE):
+            part = table.slice(start, BATCH_CHUNK_SIZE)
+            yield np.column_stack([part.column(f).to_numpy(zero_copy_only=False) for f in features]).astype(float)
+
+
+@predict_bp.route("/batch", methods=["POST"])
+def predict_batch():
+    """
+    Score many rows in one request and stream results back as NDJSON.
+
+    Query: ?model=bcc|cicids (defaults to the active model)
+    Body (by Content-Type):
+      application/json                      -> [[...], ...] or [{feature: value}, ...]
+      application/x-ndjson                  -> one row (list or dict) per line, streamed
+      text/csv                              -> header row with feature names, streamed
+      application/vnd.apache.arrow.stream   -> Arrow IPC stream with feature columns
+      application/vnd.apache.arrow.file     -> Arrow IPC file (body is buffered)
+    Output: one {"index", "prediction", "confidence"} line per row, then a
+    final {"summary": {...}} line.
+    """
+    import json
+    from flask import Response, stream_with_context
+
+    model_key = request.args.get("model") or get_active_model()
+    if model_key not in ("bcc", "cicids"):
+        return jsonify({"error": "model must be 'bcc' or 'cicids'"}), 400
+
+    mdl = load_model(model_key)
+    if not mdl.ready or not mdl.features:
+        return jsonify({"error": f"{model_key} model or feature list not loaded on server."}), 500
+    features = mdl.features
+
+    ctype = (request.mimetype or "").lower()
+    if ctype in _NDJSON_TYPES:
+        chunks = _iter_ndjson_chunks(request.stream, features)
+    elif ctype in _CSV_TYPES:
+        chunks = _iter_csv_chunks(request.stream, features)
+    elif ctype in _ARROW_TYPES:
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return jsonify({"error": "Arrow input requires pyarrow on the server"}), 415
+        if ctype == _ARROW_FILE:
+            chunks = _iter_arrow_chunks(request.get_data(), features, file_format=True)
+        else:
+            chunks = _iter_arrow_chunks(request.stream, features)
+    else:
+        data = request.get_json(force=True, silent=True)
+        if isinstance(data, dict):
+            data = data.get("rows")
+        if not isinstance(data, list):
+            return jsonify({"error": "Expect a JSON array of rows (or {rows: [...]})"}), 400
+        chunks = _iter_json_chunks(data, features)
+
+    def generate():
+        total = 0
+        counts = {}
+        started = time.time()
+        try:
+            for X in chunks:
+                labels, conf = _score_chunk(mdl, X)
+                lines = []
+                for i, label in enumerate(labels):
+                    label = str(label)
+                    counts[label] = counts.get(label, 0) + 1
+                    lines.append(json.dumps({
+                        "index": total + i,
+                        "prediction": label,
+                        "confidence": float(conf[i]) if conf is not None else None,
+                    }))
+                total += len(labels)
+                yield "\n".join(lines) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": f"Batch predict failed after {total} rows: {e}"}) + "\n"
+        yield json.dumps({"summary": {
+            "model": model_key,
+            "total": total,
+            "class_counts": counts,
+            "seconds": round(time.time() - started, 3),
+        }}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
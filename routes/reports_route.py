@@ -1,55 +1,86 @@
 # backend/routes/reports_route.py
 from flask import Blueprint, jsonify, request, send_file
-from fpdf import FPDF
 from io import BytesIO
 from datetime import datetime, timedelta
-from flask_mail import Message
 from extensions import mail
-import random
+from utils.event_rollups import MAX_POINTS, ResolutionError
+import time
 
 reports_bp = Blueprint("reports_bp", __name__)
 
-# Fake (but structured) historical attack data
-CLASSES = ["DDoS", "VPN", "TOR", "I2P", "SQL Injection", "Malware"]
+# Attack history comes from the per-class rollups kept at ingest (utils.event_rollups)
+REPORT_DAYS = 14
 
-def generate_fake_data(days=7):
-    today = datetime.now()
-    data = []
-    for i in range(days):
-        date = (today - timedelta(days=i)).strftime("%Y-%m-%d")
-        day_data = {cls: random.randint(20, 200) for cls in CLASSES}
-        day_data["date"] = date
-        data.append(day_data)
-    return list(reversed(data))
 
-ATTACK_DATA = generate_fake_data(14)
+def _window():
+    """(model, start, end) from ?model= and ?days= / ?start=&end= (epoch or ISO)."""
+    from utils.logger import get_active_model
+    from utils.event_store import parse_time
+    model = request.args.get("model") or get_active_model()
+    end = parse_time(request.args.get("end")) or time.time()
+    start = parse_time(request.args.get("start"))
+    if start is None:
+        days = max(1, min(request.args.get("days", REPORT_DAYS, type=int), MAX_POINTS))
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        start = (today - timedelta(days=days - 1)).timestamp()
+    return model, start, end
+
+
+def _attacks(counts):
+    from utils.event_counters import BENIGN
+    return {cls: n for cls, n in counts.items() if cls.upper() not in BENIGN}
+
+
+def _distribution(model, start, end):
+    from utils.logger import get_totals
+    return dict(sorted(_attacks(get_totals(model, start, end)).items(), key=lambda kv: kv[1], reverse=True))
+
+
+def _trend(model, start, end, resolution=None):
+    from utils.logger import get_series
+    res, points = get_series(model, start, end, resolution)
+    return res, [{"date": p["date"], "value": sum(_attacks(p["counts"]).values()), "by_class": _attacks(p["counts"])}
+                 for p in points]
+
+
+@reports_bp.errorhandler(ResolutionError)
+def _bad_range(e):
+    return jsonify({"error": str(e)}), 400
 
 # --------------------------------------------------------
 @reports_bp.route("/", methods=["GET"])
 def reports_overview():
-    total_attacks = sum(sum(v for k, v in day.items() if k != "date") for day in ATTACK_DATA)
-    recent = ATTACK_DATA[-1]
+    model, start, end = _window()
+    _, trend = _trend(model, start, end, "day")
+    recent = trend[-1] if trend else {"date": datetime.now().strftime("%Y-%m-%d"), "value": 0}
     return jsonify({
-        "total_attacks": total_attacks,
+        "model": model,
+        "total_attacks": sum(d["value"] for d in trend),
         "last_day": recent["date"],
-        "last_day_total": sum(v for k, v in recent.items() if k != "date"),
+        "last_day_total": recent["value"],
     })
 
 # --------------------------------------------------------
 @reports_bp.route("/trend", methods=["GET"])
 def attack_trend():
-    trend = [{"date": d["date"], "value": sum(v for k, v in d.items() if k != "date")} for d in ATTACK_DATA]
+    """Attacks per bucket; ?resolution=second|minute|hour|day (default: fits the range)."""
+    model, start, end = _window()
+    resolution = request.args.get("resolution")
+    if resolution is None and "start" not in request.args:
+        resolution = "day"
+    _, trend = _trend(model, start, end, resolution)
     return jsonify(trend)
 
 # --------------------------------------------------------
 @reports_bp.route("/distribution", methods=["GET"])
 def attack_distribution():
-    total = {cls: sum(day.get(cls, 0) for day in ATTACK_DATA) for cls in CLASSES}
-    return jsonify(total)
+    model, start, end = _window()
+    return jsonify(_distribution(model, start, end))
 
 # --------------------------------------------------------
 @reports_bp.route("/generate", methods=["GET"])
 def generate_report_pdf():
+    from fpdf import FPDF
     pdf = FPDF()
     pdf.add_page()
     pdf.set_font("Helvetica", "B", 16)
@@ -63,15 +94,27 @@ def generate_report_pdf():
     pdf.set_font("Helvetica", "B", 13)
     pdf.cell(0, 10, "Summary:", ln=True)
     pdf.set_font("Helvetica", "", 11)
-    total = {cls: sum(day.get(cls, 0) for day in ATTACK_DATA) for cls in CLASSES}
+    model, start, end = _window()
+    total = _distribution(model, start, end)
+    pdf.cell(0, 8, f"Model: {model.upper()}", ln=True)
+    if not total:
+        pdf.cell(0, 8, " - No attacks recorded in this period", ln=True)
     for cls, val in total.items():
-        pdf.cell(0, 8, f" • {cls}: {val} attacks", ln=True)
+        pdf.cell(0, 8, f" - {cls}: {val} attacks", ln=True)
+
+    pdf.ln(4)
+    pdf.set_font("Helvetica", "B", 13)
+    pdf.cell(0, 10, "Daily trend:", ln=True)
+    pdf.set_font("Helvetica", "", 11)
+    _, trend = _trend(model, start, end, "day")
+    for day in trend:
+        pdf.cell(0, 7, f" {day['date']}: {day['value']}", ln=True)
 
     pdf.ln(8)
     pdf.set_font("Helvetica", "I", 10)
     pdf.multi_cell(0, 8,
         "This report summarizes attack activity captured by the Adaptive AI NIDS system. "
-        "It includes class-wise distribution and historical trend for the past two weeks.")
+        f"It includes class-wise distribution and daily trend for the past {len(trend)} days.")
 
     # Output to memory
     buffer = BytesIO()
@@ -82,6 +125,8 @@ def generate_report_pdf():
 
 @reports_bp.route("/email", methods=["POST"])
 def send_report_email():
+    from fpdf import FPDF
+    from flask_mail import Message
     try:
         data = request.get_json()
         recipient = data.get("email")
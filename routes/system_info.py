@@ -6,7 +6,6 @@ from datetime import datetime
 import random
 import time
 import io
-from fpdf import FPDF
 
 # --- Helper Function to bypass Errno 11001 ---
 def get_safe_ip():
@@ -131,6 +130,7 @@ def generate_system_report():
         hostname = socket.gethostname()
         
         # --- Create PDF report ---
+        from fpdf import FPDF
         pdf = FPDF()
         pdf.add_page()
         pdf.set_auto_page_break(auto=True, margin=15)
@@ -1,6 +1,6 @@
 # traffic_routes.py
-from flask import Blueprint, jsonify
-from utils.logger import get_recent_events, summarize_counts
+from flask import Blueprint, jsonify, request
+from utils.logger import get_recent_events, get_active_model, get_counts, get_counters, get_timeline
 from flow_builder import build_flows
 
 traffic_bp = Blueprint("traffic_bp", __name__)
@@ -8,42 +8,88 @@ traffic_bp = Blueprint("traffic_bp", __name__)
 @traffic_bp.route("traffic/flows")
 def flows():
     """Return aggregated flows from recent network events."""
-    events = get_recent_events(2000)
+    events = get_recent_events(get_active_model())
     flows = build_flows(events)
     return jsonify({"flows": flows})
 
 
 @traffic_bp.route("traffic/protocols")
 def protocols():
-    """Return protocol distribution."""
-    events = get_recent_events(2000)
-    counts = {"TCP": 0, "UDP": 0, "Other": 0}
-
-    for e in events:
-        proto = e.get("proto", "").upper()
-        if proto == "TCP":
-            counts["TCP"] += 1
-        elif proto == "UDP":
-            counts["UDP"] += 1
-        else:
-            counts["Other"] += 1
-
-    return jsonify(counts)
+    """Return protocol distribution (live counters of the active model)."""
+    model = request.args.get("model", get_active_model())
+    by_proto = get_counts(model, "proto")
+    tcp, udp = by_proto.get("TCP", 0), by_proto.get("UDP", 0)
+    return jsonify({"TCP": tcp, "UDP": udp, "Other": sum(by_proto.values()) - tcp - udp})
 
 
 @traffic_bp.route("traffic/bandwidth")
 def bandwidth():
     """
-    Returns packet count per second for the last ~30 records.
-    Used for bandwidth line chart.
+    Returns events (value), bytes and alerts per second for the last
+    `seconds` (default 30). Used for bandwidth line chart.
     """
-    events = get_recent_events(200)
-    timeline = {}
+    model = request.args.get("model", get_active_model())
+    seconds = request.args.get("seconds", 30, type=int)
+    return jsonify(get_timeline(model, seconds))
+
+
+@traffic_bp.route("traffic/counters")
+def counters():
+    """Live counters: totals and top-N by prediction, proto, dst port, src IP, country, risk."""
+    model = request.args.get("model", get_active_model())
+    top = request.args.get("top", 10, type=int)
+    return jsonify(get_counters(model, max(1, min(top, 100))))
+
+
+@traffic_bp.route("traffic/top")
+def top_talkers():
+    """
+    Heavy hitters over a sliding window: ?dim=src_ip|dport|src_24|src_16
+    &metric=packets|bytes|alerts&window=60|300|3600&k=10
+    """
+    from utils import heavy_hitters
+    try:
+        return jsonify(heavy_hitters.top(
+            dim=request.args.get("dim", "src_ip"),
+            metric=request.args.get("metric", "packets"),
+            window=request.args.get("window", 300, type=int),
+            k=request.args.get("k", 10, type=int)))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@traffic_bp.route("traffic/top/estimate")
+def top_estimate():
+    """Count-Min estimate for one key: ?key=<ip|port|prefix>&dim=&metric=&window="""
+    from utils import heavy_hitters
+    key = request.args.get("key")
+    if not key:
+        return jsonify({"error": "key is required", "config": heavy_hitters.config()}), 400
+    try:
+        return jsonify(heavy_hitters.estimate(
+            key,
+            dim=request.args.get("dim", "src_ip"),
+            metric=request.args.get("metric", "packets"),
+            window=request.args.get("window", 300, type=int)))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
 
-    for e in events:
-        t = e.get("time")
-        timeline[t] = timeline.get(t, 0) + 1
+@traffic_bp.route("traffic/scans")
+def scans():
+    """Recent scan/sweep detections and the sources with the widest fan-out."""
+    from utils import scan_detector
+    n = max(1, min(request.args.get("n", 20, type=int), 200))
+    return jsonify({
+        "detections": scan_detector.recent_detections(n),
+        "top_ports": scan_detector.top_sources(n, by="ports"),
+        "top_hosts": scan_detector.top_sources(n, by="hosts"),
+        "config": scan_detector.config(),
+    })
 
-    graph = [{"time": k, "value": v} for k, v in timeline.items()]
 
-    return jsonify(graph)
+@traffic_bp.route("traffic/scans/<src_ip>")
+def scan_source(src_ip):
+    """Distinct dst hosts / ports one source touched within the scan window."""
+    from utils import scan_detector
+    return jsonify(scan_detector.distinct(src_ip))
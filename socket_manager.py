@@ -2,6 +2,7 @@
 # - Non-blocking emit queue with background worker
 # - Rate-limited batching for frequent events
 # - Backwards-compatible init_socketio & emit_new_event API
+# - emit_job_update for offline job progress
 
 import threading
 import time
@@ -72,6 +73,16 @@ def emit_new_event(evt):
         return
 
 
+def emit_job_update(job):
+    """Push an offline job status/progress snapshot (event: offline_job). Non-blocking."""
+    if not _socketio:
+        return
+    try:
+        _socketio.start_background_task(_socketio.emit, "offline_job", job, namespace="/")
+    except Exception as e:
+        print("⚠️ job emit error:", e)
+
+
 def shutdown_socket_manager(timeout=2):
     """Stop background worker gracefully."""
     _stop_worker.set()
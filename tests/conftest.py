@@ -0,0 +1,23 @@
+# tests/conftest.py
+# Make the repo root importable (utils.*, routes.*) when running plain `pytest`.
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """Point the event store (and the modules keeping files next to it) at tmp_path."""
+    from utils import event_store, event_segments
+
+    monkeypatch.setattr(event_store, "DB_PATH", str(tmp_path / "events.db"))
+    monkeypatch.setattr(event_store, "_initialized", False)
+    seg_dir = tmp_path / "segments"
+    monkeypatch.setattr(event_segments, "SEGMENT_DIR", str(seg_dir))
+    monkeypatch.setattr(event_segments, "INDEX_FILE", str(seg_dir / "index.json"))
+    monkeypatch.setattr(event_segments, "_index", None)
+    monkeypatch.setattr(event_segments, "_last_check", 0.0)
+    return event_store
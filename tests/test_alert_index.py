@@ -0,0 +1,53 @@
+# tests/test_alert_index.py
+# -------------------------------------------------------------
+# The since-cursor never goes backwards or repeats alerts across
+# reloads, deletes and index trimming
+# -------------------------------------------------------------
+import pytest
+
+from utils import alert_index
+
+NOW = 1_700_000_000.0
+
+
+def _events(first, last, model="bcc"):
+    return [{"id": i, "ts": NOW + i, "model": model, "src_ip": "10.0.0.1", "dst_ip": "10.0.0.2",
+             "prediction": "TOR" if i % 3 == 0 else "BENIGN"} for i in range(first, last + 1)]
+
+
+@pytest.fixture
+def index(store, monkeypatch):
+    monkeypatch.setattr(alert_index, "_index", {})
+    store.insert_many(_events(1, 30))
+    alert_index.reload("bcc")
+    return alert_index
+
+
+def test_since_after_reload(index):
+    page = index.since("bcc", 15)
+    assert [a["id"] for a in page["alerts"]] == [18, 21, 24, 27, 30]
+    assert page["cursor"] == 30 and not page["more"] and not page["gap"]
+
+    index.reload("bcc")
+    assert index.since("bcc", page["cursor"])["alerts"] == []
+    assert index.since("bcc", page["cursor"])["cursor"] == 30
+
+
+def test_since_after_deleting_newest_rows(index, store):
+    store.delete_events("bcc", last=5)          # ids 26..30
+    index.reload("bcc")
+    assert index.since("bcc")["cursor"] == 24
+    # a client that already saw 30 keeps its cursor and gets only newer alerts
+    page = index.since("bcc", 30)
+    assert page["alerts"] == [] and page["cursor"] == 30
+    index.add("bcc", _events(33, 33)[0])
+    assert [a["id"] for a in index.since("bcc", 30)["alerts"]] == [33]
+
+
+def test_gap_after_trim(index, monkeypatch):
+    monkeypatch.setattr(alert_index, "MAX_ALERTS", 4)
+    index.reload("bcc")
+    page = index.since("bcc", 3)
+    assert page["gap"]
+    assert [a["id"] for a in page["alerts"]] == [21, 24, 27, 30]
+    assert not index.since("bcc", 21)["gap"]
@@ -0,0 +1,63 @@
+# tests/test_event_rollups.py
+# -------------------------------------------------------------
+# series() serves a range at a resolution that covers it, and rejects
+# an explicit resolution that is too fine (MAX_POINTS / retention)
+# -------------------------------------------------------------
+import time
+
+import pytest
+from flask import Flask
+
+from utils import event_rollups, logger
+
+
+@pytest.fixture
+def rollups(tmp_path, monkeypatch):
+    monkeypatch.setattr(event_rollups, "ROLLUP_DIR", str(tmp_path / "rollups"))
+    monkeypatch.setattr(event_rollups, "_buckets", {res: {} for res in event_rollups.RESOLUTIONS})
+    monkeypatch.setattr(event_rollups, "_dirty", set())
+    monkeypatch.setattr(event_rollups, "_loaded", True)
+    return event_rollups
+
+
+def test_series_counts_and_gaps(rollups):
+    now = time.time()
+    start = rollups.bucket_start(now - 3 * 3600, "minute")
+    rollups.record("bcc", "DDoS", start + 5)
+    rollups.record("bcc", "DDoS", start + 125)
+    res, points = rollups.series("bcc", start, start + 3 * 3600, "minute")
+    assert res == "minute" and len(points) == 180
+    assert [p["total"] for p in points[:3]] == [1, 0, 1]
+
+
+def test_explicit_resolution_too_fine_for_range(rollups):
+    now = time.time()
+    with pytest.raises(rollups.ResolutionError):
+        rollups.series("bcc", now - 14 * 86400, now, "second")
+    with pytest.raises(rollups.ResolutionError):
+        # inside MAX_POINTS, but seconds are only kept for an hour
+        rollups.series("bcc", now - 2 * 3600, now - 2 * 3600 + 600, "second")
+    with pytest.raises(rollups.ResolutionError):
+        rollups.series("bcc", now - 60, now, "fortnight")
+
+
+def test_auto_resolution_coarsens(rollups):
+    now = time.time()
+    res, points = rollups.series("bcc", now - 14 * 86400, now)
+    assert res == "hour" and len(points) <= rollups.MAX_POINTS
+
+
+def test_trend_route_rejects_too_fine_resolution(rollups, monkeypatch):
+    from routes.reports_route import reports_bp
+    monkeypatch.setattr(logger, "_loaded", True)
+    app = Flask(__name__)
+    app.register_blueprint(reports_bp, url_prefix="/api/reports")
+    client = app.test_client()
+
+    start = int(time.time() - 14 * 86400)
+    resp = client.get(f"/api/reports/trend?model=bcc&start={start}&resolution=second")
+    assert resp.status_code == 400
+    assert "buckets" in resp.get_json()["error"]
+    resp = client.get(f"/api/reports/trend?model=bcc&start={start}&resolution=hour")
+    assert resp.status_code == 200
+    assert len(resp.get_json()) in (14 * 24, 14 * 24 + 1)
@@ -0,0 +1,85 @@
+# tests/test_event_segments.py
+# -------------------------------------------------------------
+# Segment rotation, archive failure/retry, eviction and range export
+# -------------------------------------------------------------
+import csv
+import gzip
+import io
+import os
+
+from utils import event_segments
+
+NOW = 1_700_000_000.0
+
+
+def _events(first, last, model="bcc", ts=NOW):
+    return [{"id": i, "ts": ts + i, "model": model, "src_ip": "10.0.0.1", "dst_ip": "10.0.0.2",
+             "prediction": "TOR" if i % 3 == 0 else "BENIGN"} for i in range(first, last + 1)]
+
+
+def test_failed_archive_stays_hot_and_is_retried(store, monkeypatch):
+    monkeypatch.setattr(event_segments, "SEGMENT_MAX_ROWS", 10)
+    monkeypatch.setattr(event_segments, "HOT_SECONDS", 60)
+    store.insert_many(_events(1, 12))
+
+    def broken(path, seg):
+        raise OSError("disk full")
+
+    real = event_segments._write_gzip
+    monkeypatch.setattr(event_segments, "_write_gzip", broken)
+    event_segments.maybe_rotate(now=NOW + 3600, force=True)
+    [seg] = event_segments.segments("bcc")
+    assert seg["file"] is None and not seg["evicted"]
+    assert store.id_range_stats("bcc", 0)[0] == 12       # nothing dropped without an archive
+
+    monkeypatch.setattr(event_segments, "_write_gzip", real)
+    event_segments.maybe_rotate(now=NOW + 3600, force=True)
+    [seg] = event_segments.segments("bcc")
+    assert seg["file"] and seg["evicted"]
+    assert store.id_range_stats("bcc", 0)[0] == 0
+
+
+def _archived_rows(seg):
+    with gzip.open(os.path.join(event_segments.SEGMENT_DIR, seg["file"]), "rt", newline="") as f:
+        return list(csv.reader(f))[1:]
+
+
+def test_rotation_by_rows_then_by_age(store, monkeypatch):
+    monkeypatch.setattr(event_segments, "SEGMENT_MAX_ROWS", 10)
+    store.insert_many(_events(1, 5))
+    event_segments.maybe_rotate(now=NOW + 10, force=True)
+    assert event_segments.segments() == []
+
+    store.insert_many(_events(6, 12))
+    event_segments.maybe_rotate(now=NOW + 20, force=True)
+    store.insert_many(_events(13, 15))
+    event_segments.maybe_rotate(now=NOW + 30, force=True)
+    [first] = event_segments.segments("bcc")
+    assert (first["first_id"], first["last_id"], first["rows"]) == (1, 12, 12)
+    assert len(_archived_rows(first)) == 12
+
+    # the open segment started at NOW + 20: closes once SEGMENT_SECONDS old
+    event_segments.maybe_rotate(now=NOW + 20 + event_segments.SEGMENT_SECONDS, force=True)
+    first, second = event_segments.segments("bcc")
+    assert (second["first_id"], second["last_id"]) == (13, 15)
+    assert len(_archived_rows(second)) == 3
+
+
+def test_export_spans_evicted_segments_and_the_store(store, monkeypatch):
+    monkeypatch.setattr(event_segments, "SEGMENT_MAX_ROWS", 10)
+    monkeypatch.setattr(event_segments, "HOT_SECONDS", 60)
+    store.insert_many(_events(1, 12))
+    event_segments.maybe_rotate(now=NOW + 3600, force=True)
+    store.insert_many(_events(13, 20))
+    assert event_segments.segments("bcc")[0]["evicted"]
+
+    def rows(**kw):
+        text = "".join(event_segments.iter_export("bcc", **kw))
+        return list(csv.reader(io.StringIO(text)))
+
+    full = rows()
+    assert full[0] == store.CSV_HEADER
+    assert len(full) == 1 + 20
+    assert [r[0] for r in full[1:]] == sorted(r[0] for r in full[1:])
+    # a range straddling the evicted segment and the hot rows
+    assert len(rows(start=NOW + 5, end=NOW + 15)) == 1 + 10
@@ -0,0 +1,46 @@
+# tests/test_event_store.py
+# -------------------------------------------------------------
+# Event store ids: the high-water id survives deletes of the newest
+# rows, so a restarted logger never hands out an id twice
+# -------------------------------------------------------------
+from utils import event_store
+
+
+def _events(first, last, model="bcc", ts=1_700_000_000.0):
+    return [{"id": i, "ts": ts + i, "model": model, "src_ip": "10.0.0.1", "dst_ip": "10.0.0.2",
+             "prediction": "TOR" if i % 3 == 0 else "BENIGN"} for i in range(first, last + 1)]
+
+
+def test_max_id_survives_deleting_the_newest_rows(store):
+    store.insert_many(_events(1, 10))
+    assert store.max_id() == 10
+    store.delete_through("bcc", 10)          # segment eviction of the whole range
+    assert store.max_id() == 10
+    store.delete_events("bcc", last=5)
+    assert store.max_id() == 10
+
+
+def test_max_id_survives_reopen(store, monkeypatch):
+    store.insert_many(_events(1, 20))
+    store.delete_events("bcc", last=8)
+    monkeypatch.setattr(event_store, "_initialized", False)
+    assert store.max_id() == 20
+    # new rows continue above the high-water mark
+    store.insert_many(_events(21, 22))
+    assert store.max_id() == 22
+
+
+def test_logger_restart_after_eviction_continues_ids(store, monkeypatch, tmp_path):
+    from utils import logger
+
+    store.insert_many(_events(1, 50))
+    store.delete_through("bcc", 50)
+    monkeypatch.setattr(logger, "STATS_SNAPSHOT", str(tmp_path / "stats_snapshot.json"))
+    monkeypatch.setattr(logger, "_next_id", 0)
+    monkeypatch.setattr(logger, "_persisted_id", 0)
+    monkeypatch.setattr(logger, "_model_events", {"bcc": [], "cicids": []})
+    monkeypatch.setattr(logger, "_model_stats", {"bcc": {}, "cicids": {}})
+    monkeypatch.setattr(logger, "_persisted_stats", {"bcc": {}, "cicids": {}})
+    monkeypatch.setattr(logger.event_rollups, "load", lambda: None)
+    logger._load_all_recent()
+    assert logger._next_id == 50
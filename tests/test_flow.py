@@ -0,0 +1,41 @@
+# tests/test_flow.py
+# -------------------------------------------------------------
+# Flow keeps running length/IAT aggregates instead of per-packet lists
+# -------------------------------------------------------------
+import numpy as np
+from scapy.all import IP, TCP, Raw
+
+from capture.flow import Flow, RunningStats
+
+
+def _pkt(fwd, size):
+    ip = IP(src="10.0.0.1", dst="10.0.0.2") if fwd else IP(src="10.0.0.2", dst="10.0.0.1")
+    tcp = TCP(sport=40000, dport=80) if fwd else TCP(sport=80, dport=40000)
+    return ip / tcp / Raw(b"x" * size)
+
+
+def test_running_stats_match_numpy():
+    values = [3.0, 1.5, 9.0, 0.25, 4.0]
+    st = RunningStats()
+    for v in values:
+        st.add(v)
+    assert st.count == 5 and st.min == 0.25 and st.max == 9.0
+    assert np.isclose(st.mean, np.mean(values))
+    assert np.isclose(st.std, np.std(values))
+    assert RunningStats().mean == 0.0
+
+
+def test_flow_features_without_packet_lists():
+    sizes = [(True, 100), (False, 40), (True, 300), (False, 0), (True, 20)]
+    stamps = [1_700_000_000.0 + t for t in (0.0, 0.1, 0.4, 0.45, 1.0)]
+    flow = Flow(_pkt(True, 100), stamps[0])
+    for (fwd, size), ts in zip(sizes, stamps):
+        flow.update(_pkt(fwd, size), ts)
+
+    assert isinstance(flow.fwd_lens, RunningStats)
+    feats = flow.build_cicids_features()
+    # lengths include the 20-byte TCP header (bytes of the IP payload)
+    assert feats[3:7] == [3, 2, 480.0, 80.0]
+    assert np.isclose(feats[7], 160.0) and np.isclose(feats[8], 40.0)
+    assert np.isclose(feats[9], np.mean(np.diff(stamps)))
+    assert flow.fwd_lens.max == 320 and flow.bwd_lens.min == 20
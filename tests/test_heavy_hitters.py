@@ -0,0 +1,47 @@
+# tests/test_heavy_hitters.py
+# -------------------------------------------------------------
+# Count-Min rows must hash independently: integer keys that are
+# equal mod WIDTH may not collide in every row
+# -------------------------------------------------------------
+from utils import heavy_hitters as hh
+
+NOW = 1_700_000_000.0
+
+
+def _event(dport, src="10.0.0.1"):
+    return {"src_ip": src, "dst_ip": "10.0.0.2", "dport": dport, "prediction": "BENIGN"}
+
+
+def test_rows_are_independent_for_colliding_ints():
+    colliding = [80 + i * hh.WIDTH for i in range(1, 50)]
+    own = hh._cells(80)
+    assert len(set(c // hh.WIDTH for c in own)) == hh.DEPTH
+    assert all(hh._cells(k) != own for k in colliding)
+    # rows of one key should not all sit on the same column
+    assert len({c % hh.WIDTH for c in own}) > 1 or hh.DEPTH == 1
+
+
+def test_count_min_bound_on_colliding_ports():
+    hh.reset()
+    for _ in range(1000):
+        hh.observe(_event(80 + hh.WIDTH), ts=NOW)
+    for i in range(2, 40):
+        for _ in range(5):
+            hh.observe(_event(80 + i * hh.WIDTH), ts=NOW)
+    res = hh.estimate(80, dim="dport", window=60, now=NOW)
+    assert res["count"] <= res["bounds"]["count_min_max_error"]
+    hot = hh.estimate(80 + hh.WIDTH, dim="dport", window=60, now=NOW)
+    assert 1000 <= hot["count"] <= 1000 + hot["bounds"]["count_min_max_error"]
+
+
+def test_top_not_inflated_by_collisions():
+    hh.reset()
+    for i in range(1, 20):
+        for _ in range(10 * i):
+            hh.observe(_event(80 + i * hh.WIDTH), ts=NOW)
+    top = hh.top(dim="dport", metric="packets", window=60, k=5, now=NOW)
+    keys = [item["key"] for item in top["items"]]
+    assert keys == [80 + i * hh.WIDTH for i in range(19, 14, -1)]
+    for item, i in zip(top["items"], range(19, 14, -1)):
+        assert item["count"] == 10 * i
+    hh.reset()
@@ -0,0 +1,59 @@
+# tests/test_logger.py
+# -------------------------------------------------------------
+# push_event queues rows in id order, including scan events that
+# the detector pushes from inside push_event
+# -------------------------------------------------------------
+import threading
+from collections import deque
+
+import pytest
+
+from utils import logger, scan_detector
+
+
+@pytest.fixture
+def quiet_logger(monkeypatch):
+    monkeypatch.setattr(logger, "_loaded", True)
+    monkeypatch.setattr(logger, "_ensure_writer", lambda: None)
+    monkeypatch.setattr(logger, "_write_buffer", deque())
+    monkeypatch.setattr(logger, "_next_id", 0)
+    monkeypatch.setattr(logger, "_model_events", {"bcc": [], "cicids": []})
+    monkeypatch.setattr(logger, "_model_stats", {"bcc": {}, "cicids": {}})
+    monkeypatch.setattr(logger, "_GROUP_ROWS", 10 ** 9)
+    for sl in scan_detector._ring:
+        sl.reset(-1)
+    scan_detector._checked.clear()
+    scan_detector._alerted.clear()
+    return logger
+
+
+def _ids(buffer):
+    return [item["id"] for item in buffer]
+
+
+def test_scan_event_is_queued_after_the_event_that_raised_it(quiet_logger, monkeypatch):
+    monkeypatch.setattr(scan_detector, "PORT_THRESHOLD", 5)
+    ts = 1_700_000_000.0
+    for port in range(12):
+        quiet_logger.push_event({"src_ip": "10.9.0.1", "dst_ip": "10.9.0.2", "dport": port,
+                                 "prediction": "BENIGN", "ts": ts + port * scan_detector.CHECK_INTERVAL})
+    ids = _ids(quiet_logger._write_buffer)
+    kinds = [item["prediction"] for item in quiet_logger._write_buffer]
+    assert scan_detector.PORT_SCAN in kinds
+    assert ids == sorted(ids) and len(set(ids)) == len(ids)
+
+
+def test_concurrent_pushes_queue_in_id_order(quiet_logger):
+    def worker(n):
+        for i in range(300):
+            quiet_logger.push_event({"src_ip": f"10.8.{n}.1", "dst_ip": "10.8.0.2", "dport": i % 50,
+                                     "prediction": "BENIGN"})
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    ids = _ids(quiet_logger._write_buffer)
+    assert len(ids) >= 1800
+    assert ids == sorted(ids)
@@ -0,0 +1,55 @@
+# tests/test_model_registry.py
+# -------------------------------------------------------------
+# Install records version/checksum history; verify trusts unchanged
+# files, adopts untracked ones and refuses corrupted ones
+# -------------------------------------------------------------
+import os
+
+import pytest
+
+from utils import model_registry
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    ml_dir = tmp_path / "ml_models"
+    monkeypatch.setattr(model_registry, "ML_DIR", str(ml_dir))
+    monkeypatch.setattr(model_registry, "MANIFEST_FILE", str(ml_dir / "manifest.json"))
+    monkeypatch.setattr(model_registry, "_manifest", None)
+    monkeypatch.setattr(model_registry, "_install_listeners", [])
+    return model_registry
+
+
+def _src(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_install_keeps_history_and_checks_sha(registry, tmp_path):
+    seen = []
+    registry.on_install(seen.append)
+    registry.install("m.pkl", _src(tmp_path, "a", b"one"), version="v1")
+    registry.install("m.pkl", _src(tmp_path, "b", b"two"), version="v2")
+    entry = registry.get_entry("m.pkl")
+    assert entry["version"] == "v2" and entry["history"][0]["version"] == "v1"
+    assert seen == ["m.pkl", "m.pkl"]
+
+    with pytest.raises(ValueError):
+        registry.install("m.pkl", _src(tmp_path, "c", b"three"), expected_sha256="0" * 64)
+    assert registry.get_version("m.pkl") == "v2"
+    assert [f for f in os.listdir(registry.ML_DIR) if f.endswith(".tmp")] == []
+
+
+def test_verify_adopts_and_refuses_corruption(registry, tmp_path):
+    os.makedirs(registry.ML_DIR)
+    path = os.path.join(registry.ML_DIR, "m.pkl")
+    with open(path, "wb") as f:
+        f.write(b"local")
+    assert registry.verify("m.pkl") == path
+    assert registry.get_version("m.pkl") == "local"
+
+    with open(path, "wb") as f:
+        f.write(b"tampered!")
+    assert registry.verify("m.pkl") is None
+    assert registry.verify_all(["m.pkl", "gone.pkl"]) == {"m.pkl": "corrupt", "gone.pkl": "missing"}
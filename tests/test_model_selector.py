@@ -0,0 +1,63 @@
+# tests/test_model_selector.py
+# -------------------------------------------------------------
+# PreparedModel: scaler failures surface on the strict (default) path,
+# scaler column names must match the model's features
+# -------------------------------------------------------------
+import numpy as np
+import pytest
+
+from utils.model_selector import PreparedModel, BCC_FEATURES
+
+
+class Model:
+    classes_ = np.array([0, 1])
+
+    def predict_proba(self, X):
+        X = np.asarray(X, dtype=float)
+        p = (X[:, 0] > 0).astype(float)
+        return np.column_stack([1 - p, p])
+
+
+class BrokenScaler:
+    def transform(self, X):
+        raise ValueError("scaler exploded")
+
+
+class NamedScaler:
+    """Returns only its first column (by name) so tests can see the ordering."""
+
+    def __init__(self, names):
+        self.feature_names_in_ = np.array(names, dtype=object)
+
+    def transform(self, df):
+        assert list(df.columns) == list(self.feature_names_in_)
+        return df.to_numpy()
+
+
+def _x(first=1.0):
+    X = np.zeros((1, len(BCC_FEATURES)))
+    X[0, 0] = first
+    return X
+
+
+def test_broken_scaler_raises_on_the_default_path():
+    bundle = PreparedModel("bcc", {"model": Model(), "scaler": BrokenScaler()})
+    with pytest.raises(ValueError):
+        bundle.predict_labels_with_confidence(_x())
+    labels, _ = bundle.predict_labels_with_confidence(_x(), strict=False)
+    assert labels.tolist() == ["1"]
+    assert bundle.scaler_fallbacks == 1
+
+
+def test_scaler_columns_must_match_features():
+    bundle = PreparedModel("bcc", {"model": Model(), "scaler": NamedScaler(["a", "b"])})
+    assert not bundle.ready
+    assert "do not match" in bundle.load_error
+
+
+def test_scaler_columns_in_another_order_are_permuted():
+    names = list(reversed(BCC_FEATURES))
+    bundle = PreparedModel("bcc", {"model": Model(), "scaler": NamedScaler(names)})
+    assert bundle.ready
+    Xs = bundle.transform(_x(7.0))
+    assert Xs[0, names.index(BCC_FEATURES[0])] == 7.0
@@ -0,0 +1,65 @@
+# tests/test_offline_cache.py
+# -------------------------------------------------------------
+# Offline result cache keys follow the loaded model files:
+# installs reload the model and invalidate, live-model switches don't
+# -------------------------------------------------------------
+from collections import OrderedDict
+
+import pytest
+
+from utils import model_registry, model_selector, offline_cache, offline_jobs
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    ml_dir = tmp_path / "ml_models"
+    monkeypatch.setattr(model_registry, "ML_DIR", str(ml_dir))
+    monkeypatch.setattr(model_registry, "MANIFEST_FILE", str(ml_dir / "manifest.json"))
+    monkeypatch.setattr(model_registry, "_manifest", None)
+    monkeypatch.setattr(model_selector, "_MODEL_CACHE", {})
+    monkeypatch.setattr(model_selector, "_joblib_load", lambda path: open(path).read())
+    monkeypatch.setattr(offline_cache, "_ENTRIES", OrderedDict())
+    monkeypatch.setattr(offline_cache, "_bytes", 0)
+    results = tmp_path / "results.csv"
+    results.write_text("row\n")
+    monkeypatch.setattr(offline_jobs, "result_path", lambda job_id: str(results))
+    monkeypatch.setattr(offline_jobs, "pin", lambda job_id, pinned=True: None)
+    monkeypatch.setattr(offline_jobs, "get_job", lambda job_id, include_result=True:
+                        {"job_id": job_id, "status": offline_jobs.DONE})
+
+    def install(tag):
+        for fname in model_registry.MODEL_FILES["bcc"].values():
+            src = tmp_path / f"{fname}.{tag}"
+            src.write_text(f"{fname}:{tag}")
+            model_registry.install(fname, str(src))
+
+    install("v1")
+    return install
+
+
+def test_active_model_switch_keeps_entries(registry):
+    key = offline_cache.cache_key("abc", "bcc", "full")
+    offline_cache.store(key, "job-1")
+    model_selector.set_active_model("cicids")
+    model_selector.set_active_model("bcc")
+    assert offline_cache.cache_key("abc", "bcc", "full") == key
+    assert offline_cache.lookup(key)["job_id"] == "job-1"
+
+
+def test_install_reloads_model_and_drops_entries(registry):
+    key = offline_cache.cache_key("abc", "bcc", "full")
+    offline_cache.store(key, "job-1")
+    assert model_selector.load_model("bcc").model.endswith(":v1")
+
+    registry("v2")
+    assert offline_cache.stats()["entries"] == 0
+    new_key = offline_cache.cache_key("abc", "bcc", "full")
+    assert new_key != key
+    assert model_selector.load_model("bcc").model.endswith(":v2")
+
+
+def test_result_scored_across_an_install_is_not_cached(registry):
+    key = offline_cache.cache_key("abc", "bcc", "full")
+    registry("v2")
+    offline_cache.store(key, "job-1")
+    assert offline_cache.stats()["entries"] == 0
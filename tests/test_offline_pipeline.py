@@ -0,0 +1,40 @@
+# tests/test_offline_pipeline.py
+# -------------------------------------------------------------
+# Chunked CSV reader: dirty numeric cells must not turn derived
+# fields into text (object-dtype fallback in _iter_chunks)
+# -------------------------------------------------------------
+import pandas as pd
+
+from utils import offline_pipeline as op
+
+DIRTY_CSV = (
+    "Source Port,Destination Port,Total Fwd Packets,Total Bwd Packets,Protocol\n"
+    "1234,80,3,4,TCP\n"
+    "zz,443,3,4,UDP\n"
+    "5678,53,1,,UDP\n"
+)
+
+
+def _frames(tmp_path, chunk_rows):
+    path = tmp_path / "dirty.csv"
+    path.write_text(DIRTY_CSV)
+    plan = op._read_plan(str(path), "bcc")
+    chunks = op._iter_chunks(str(path), plan.usecols, plan.dtypes, chunk_rows)
+    return pd.concat([plan.apply(c) for c in chunks], ignore_index=True)
+
+
+def test_dirty_cell_keeps_packet_counts_numeric(tmp_path):
+    for chunk_rows in (1, 2, 3):
+        df = _frames(tmp_path, chunk_rows)
+        assert len(df) == 3
+        assert pd.api.types.is_numeric_dtype(df["packets_count"])
+        assert df["packets_count"].tolist() == [7, 7, 1]
+        assert pd.api.types.is_numeric_dtype(df["src_port"])
+        assert pd.isna(df["src_port"][1])
+
+
+def test_dirty_rows_score_as_numbers(tmp_path):
+    df = _frames(tmp_path, 2)
+    X = op.feature_matrix(df, op.expected_features("bcc"))
+    col = op.expected_features("bcc").index("packets_count")
+    assert X[:, col].tolist() == [7.0, 7.0, 1.0]
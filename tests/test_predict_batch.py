@@ -0,0 +1,79 @@
+# tests/test_predict_batch.py
+# -------------------------------------------------------------
+# /api/predict/batch: every accepted Content-Type is parsed and scored
+# -------------------------------------------------------------
+import io
+import json
+
+import numpy as np
+import pytest
+from flask import Flask
+
+from routes import predict_route
+
+FEATURES = ["a", "b"]
+ROWS = [[1, 2], [0, 5], [3, 0]]
+
+
+class FakeModel:
+    ready = True
+    features = FEATURES
+
+    def predict_labels_with_confidence(self, X):
+        X = np.asarray(X, dtype=float)
+        return np.where(X[:, 0] > 0, "TOR", "BENIGN"), np.full(len(X), 0.5)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(predict_route, "load_model", lambda key: FakeModel())
+    app = Flask(__name__)
+    app.register_blueprint(predict_route.predict_bp, url_prefix="/api/predict")
+    return app.test_client()
+
+
+def _post(client, body, ctype):
+    res = client.post("/api/predict/batch?model=bcc", data=body, content_type=ctype)
+    assert res.status_code == 200
+    lines = [json.loads(l) for l in res.get_data(as_text=True).splitlines() if l]
+    assert not any("error" in l for l in lines), lines
+    return [l["prediction"] for l in lines[:-1]], lines[-1]["summary"]
+
+
+def _arrow(kind):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.ipc as ipc
+    table = pa.table({f: [r[i] for r in ROWS] for i, f in enumerate(FEATURES)})
+    sink = io.BytesIO()
+    opener = ipc.new_file if kind == "file" else ipc.new_stream
+    with opener(sink, table.schema) as writer:
+        writer.write_table(table, max_chunksize=2)
+    return sink.getvalue()
+
+
+EXPECTED = ["TOR", "BENIGN", "TOR"]
+
+
+def test_json(client):
+    preds, summary = _post(client, json.dumps(ROWS), "application/json")
+    assert preds == EXPECTED and summary["total"] == 3
+
+
+@pytest.mark.parametrize("ctype", predict_route._NDJSON_TYPES)
+def test_ndjson(client, ctype):
+    body = "\n".join(json.dumps(dict(zip(FEATURES, r))) for r in ROWS)
+    assert _post(client, body, ctype)[0] == EXPECTED
+
+
+@pytest.mark.parametrize("ctype", predict_route._CSV_TYPES)
+def test_csv(client, ctype):
+    body = "a,b\n" + "\n".join(",".join(map(str, r)) for r in ROWS)
+    assert _post(client, body, ctype)[0] == EXPECTED
+
+
+def test_arrow_stream(client):
+    assert _post(client, _arrow("stream"), predict_route._ARROW_STREAM)[0] == EXPECTED
+
+
+def test_arrow_file(client):
+    assert _post(client, _arrow("file"), predict_route._ARROW_FILE)[0] == EXPECTED
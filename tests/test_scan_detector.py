@@ -0,0 +1,113 @@
+# tests/test_scan_detector.py
+# -------------------------------------------------------------
+# Distinct counting (exact set -> HyperLogLog), slice merging and
+# the threshold / cooldown path of the scan detector
+# -------------------------------------------------------------
+import pytest
+
+from utils import scan_detector as sd
+from utils.risk_engine import BASE_SCORES
+
+NOW = 1_700_000_000.0
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    for sl in sd._ring:
+        sl.reset(-1)
+    sd._checked.clear()
+    sd._alerted.clear()
+    sd._detections.clear()
+    yield
+
+
+@pytest.fixture
+def pushed(monkeypatch):
+    events = []
+    monkeypatch.setattr("utils.logger.push_event", events.append)
+    return events
+
+
+def _acc(*counters):
+    acc = {"items": set(), "registers": None}
+    for c in counters:
+        c.merge_into(acc)
+    return acc
+
+
+def _filled(values):
+    d = sd.Distinct()
+    for v in values:
+        d.add(sd._hash64(v))
+    return d
+
+
+def test_sparse_is_exact_then_switches_to_registers():
+    d = _filled(range(sd.SPARSE_MAX))
+    assert d.registers is None
+    assert sd._estimate(_acc(d)) == sd.SPARSE_MAX
+    d.add(sd._hash64(sd.SPARSE_MAX))
+    assert d.registers is not None and not d.items
+    assert abs(sd._estimate(_acc(d)) - (sd.SPARSE_MAX + 1)) <= 3
+
+
+def test_dense_estimate_within_error():
+    n = 5000
+    est = sd._estimate(_acc(_filled(range(n))))
+    assert abs(est - n) / n < 4 * 1.04 / sd._M ** 0.5
+
+
+def test_merge_sparse_and_dense_slices():
+    dense = _filled(range(400))                  # dense
+    overlap = _filled(range(390, 410))           # sparse, 10 new values
+    est = sd._estimate(_acc(dense, overlap))
+    assert abs(est - 410) / 410 < 0.2
+    # merging two sparse counters stays exact
+    assert sd._estimate(_acc(_filled(range(10)), _filled(range(5, 20)))) == 20
+    # merge order does not matter
+    assert sd._estimate(_acc(overlap, dense)) == est
+
+
+def test_distinct_spans_live_slices_only():
+    span = sd.WINDOW / sd.SLICES
+    for i in range(10):
+        sd.observe({"src_ip": "10.0.0.9", "dst_ip": f"10.1.0.{i}", "dport": 80}, ts=NOW)
+        sd.observe({"src_ip": "10.0.0.9", "dst_ip": f"10.2.0.{i}", "dport": 80}, ts=NOW + span)
+    assert sd.distinct("10.0.0.9", now=NOW + span)["distinct_hosts"] == 20
+    assert sd.distinct("10.0.0.9", now=NOW + sd.WINDOW + span)["distinct_hosts"] == 0
+
+
+def test_port_scan_threshold_and_cooldown(pushed):
+    ts = NOW
+    for port in range(sd.PORT_THRESHOLD // 2):
+        sd.observe({"src_ip": "10.0.0.5", "dst_ip": "10.0.0.6", "dport": port}, ts=ts)
+        ts += sd.CHECK_INTERVAL / 10
+    assert not pushed
+    ts += sd.CHECK_INTERVAL
+    for port in range(sd.PORT_THRESHOLD // 2, sd.PORT_THRESHOLD + 20):
+        sd.observe({"src_ip": "10.0.0.5", "dst_ip": "10.0.0.6", "dport": port}, ts=ts)
+        ts += sd.CHECK_INTERVAL / 10
+    # checks are rate-limited per source: the next one sees every port
+    ts += sd.CHECK_INTERVAL
+    sd.observe({"src_ip": "10.0.0.5", "dst_ip": "10.0.0.6", "dport": 80}, ts=ts)
+    assert [e["prediction"] for e in pushed] == [sd.PORT_SCAN]
+    evt = pushed[0]
+    assert evt["risk_score"] == BASE_SCORES[sd.PORT_SCAN]
+    assert evt["distinct_ports"] >= sd.PORT_THRESHOLD
+
+    # still scanning inside the cooldown: no second alert
+    sd.observe({"src_ip": "10.0.0.5", "dst_ip": "10.0.0.6", "dport": 9999}, ts=ts + 2 * sd.CHECK_INTERVAL)
+    assert len(pushed) == 1
+    # own scan events are ignored
+    sd.observe(dict(evt, ts=ts + 3 * sd.CHECK_INTERVAL))
+    assert len(pushed) == 1
+
+
+def test_host_sweep(pushed):
+    for i in range(sd.HOST_THRESHOLD + 5):
+        sd.observe({"src_ip": "10.0.0.7", "dst_ip": f"10.3.{i // 250}.{i % 250}", "dport": 22},
+                   ts=NOW + i * sd.CHECK_INTERVAL / 4)
+    kinds = [e["prediction"] for e in pushed]
+    assert kinds == [sd.HOST_SWEEP]
+    assert pushed[0]["risk_score"] == BASE_SCORES[sd.HOST_SWEEP]
+    assert sd.recent_detections()[0]["scan_kind"] == sd.HOST_SWEEP
@@ -0,0 +1,144 @@
+# utils/alert_index.py
+# -------------------------------------------------------------
+# Materialized alert index for /api/alerts
+# - push_event hands every event here; Medium/High predictions become
+#   alerts once, with their risk score computed at ingest
+# - alerts are kept per model, ordered by the event id assigned in
+#   utils.logger (monotonic, persisted), which doubles as the cursor:
+#   since(model, id) returns only newer alerts via bisect
+# - each model keeps the newest MAX_ALERTS; on startup (and after
+#   deletes) the index is reloaded from the event store
+# -------------------------------------------------------------
+import os
+import threading
+from bisect import bisect_right
+from datetime import datetime
+
+MAX_ALERTS = int(os.environ.get("NIDS_ALERT_INDEX_SIZE", 5000))
+MAX_PAGE = 500
+
+HIGH = {"TOR", "I2P", "ZERONET", "FREENET", "PORT_SCAN", "HOST_SWEEP"}
+MEDIUM = {"VPN"}
+
+_lock = threading.Lock()
+_index = {}     # model -> {"ids", "alerts", "by_src": {src: n}, "trimmed": last id no longer held}
+
+
+def classify_risk(prediction):
+    """Alert level from the predicted class (Low = not an alert)."""
+    pred = str(prediction).upper()
+    if pred in HIGH:
+        return "High"
+    if pred in MEDIUM:
+        return "Medium"
+    return "Low"
+
+
+def _state(model):
+    st = _index.get(model)
+    if st is None:
+        st = _index[model] = _empty()
+    return st
+
+
+def _empty():
+    return {"ids": [], "alerts": [], "by_src": {}, "trimmed": 0}
+
+
+def _add_locked(st, model, evt):
+    from utils.risk_engine import BASE_SCORES, DEFAULT_BASE, frequency_boost
+
+    pred = evt.get("prediction", "Unknown")
+    level = classify_risk(pred)
+    if level == "Low" or evt.get("id") is None:
+        return None
+    src = evt.get("src_ip")
+    seen = st["by_src"].get(src, 0) + 1
+    st["by_src"][src] = seen
+    base = BASE_SCORES.get(str(pred).upper(), DEFAULT_BASE)
+    ts = float(evt.get("ts") or 0)
+    alert = {
+        "id": int(evt["id"]),
+        "model": model,
+        "ts": ts,
+        "timestamp": datetime.fromtimestamp(ts).strftime("%H:%M:%S") if ts else evt.get("time"),
+        "time": evt.get("time"),
+        "src_ip": src,
+        "dst_ip": evt.get("dst_ip"),
+        "sport": evt.get("sport", "—"),
+        "dport": evt.get("dport", "—"),
+        "proto": evt.get("proto", "-"),
+        "prediction": pred,
+        "risk_level": level,
+        "risk_score": min(100, base + frequency_boost(seen)),
+    }
+    ids = st["ids"]
+    if ids and alert["id"] <= ids[-1]:
+        return None     # already indexed
+    ids.append(alert["id"])
+    st["alerts"].append(alert)
+    if len(ids) > MAX_ALERTS * 5 // 4:
+        # trim in bulk so appends stay amortized O(1)
+        cut = len(ids) - MAX_ALERTS
+        for old in st["alerts"][:cut]:
+            n = st["by_src"].get(old["src_ip"], 0) - 1
+            if n > 0:
+                st["by_src"][old["src_ip"]] = n
+            else:
+                st["by_src"].pop(old["src_ip"], None)
+        st["trimmed"] = ids[cut - 1]
+        del ids[:cut]
+        del st["alerts"][:cut]
+    return alert
+
+
+# -------------------------
+# Update
+# -------------------------
+def add(model, evt):
+    """Index `evt` (needs its event id) if it is an alert; returns the alert or None."""
+    with _lock:
+        return _add_locked(_state(model), model, evt)
+
+
+def reload(model):
+    """Rebuild a model's index from the newest alert rows in the event store."""
+    from utils import event_store
+    limit = min(MAX_ALERTS, event_store.MAX_PAGE)
+    rows, total = event_store.query_events(model=model, prediction=sorted(HIGH | MEDIUM),
+                                           limit=limit, newest_first=True)
+    rows.sort(key=lambda r: r["id"])
+    with _lock:
+        st = _index[model] = _empty()
+        if total > len(rows) and rows:
+            st["trimmed"] = rows[0]["id"] - 1     # older alerts stay in the store only
+        for row in rows:
+            _add_locked(st, model, row)
+
+
+# -------------------------
+# Query
+# -------------------------
+def since(model, since_id=None, limit=150):
+    """
+    since_id=None: the newest `limit` alerts, newest first.
+    since_id=N: alerts with id > N, oldest first (at most `limit`).
+    Returns {"alerts", "cursor" (id to poll from next), "more", "total",
+    "gap" (alerts after since_id were already trimmed from the index)}.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE))
+    with _lock:
+        st = _state(model)
+        ids, alerts = st["ids"], st["alerts"]
+        total = len(ids)
+        if since_id is None:
+            page = alerts[-limit:][::-1]
+            return {"alerts": [dict(a) for a in page], "cursor": ids[-1] if ids else 0,
+                    "more": False, "total": total, "gap": False}
+        since_id = int(since_id)
+        i = bisect_right(ids, since_id)
+        page = alerts[i:i + limit]
+        more = i + limit < total
+        gap = since_id < st["trimmed"]
+    cursor = page[-1]["id"] if page else max(since_id, 0)
+    return {"alerts": [dict(a) for a in page], "cursor": cursor, "more": more, "total": total, "gap": gap}
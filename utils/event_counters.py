@@ -0,0 +1,157 @@
+# utils/event_counters.py
+# -------------------------------------------------------------
+# Live traffic counters, updated by utils.logger.push_event
+# - per model: totals plus counts by prediction, proto, dst port,
+#   src IP, src country and risk level; each update is O(1)
+# - a per-second ring (SECOND_WINDOW slots) holds events/bytes/alerts
+#   per second for the bandwidth chart
+# - high-cardinality dimensions (IPs, ports) are capped at MAX_KEYS;
+#   when a cap is hit the smaller half is folded into "other"
+# - counts cover the traffic seen since the server started
+# -------------------------------------------------------------
+import os
+import time
+import threading
+from datetime import datetime
+
+DIMENSIONS = ("prediction", "proto", "dport", "src_ip", "src_country", "risk_level")
+SECOND_WINDOW = int(os.environ.get("NIDS_COUNTER_SECONDS", 300))
+MAX_KEYS = int(os.environ.get("NIDS_COUNTER_MAX_KEYS", 10_000))
+BENIGN = {"BENIGN", "NORMAL"}
+
+_lock = threading.Lock()
+_models = {}
+
+
+def _new_model():
+    return {
+        "total": 0,
+        "bytes": 0,
+        "alerts": 0,
+        "other": {d: 0 for d in DIMENSIONS},     # folded away by the key cap
+        "dims": {d: {} for d in DIMENSIONS},
+        "since": time.time(),
+        # ring slot i holds second `sec` -> [sec, events, bytes, alerts]
+        "seconds": [[-1, 0, 0, 0] for _ in range(SECOND_WINDOW)],
+    }
+
+
+def _state(model):
+    st = _models.get(model)
+    if st is None:
+        st = _models[model] = _new_model()
+    return st
+
+
+def event_bytes(evt):
+    """Bytes carried by an event (packet length or flow bytes), 0 when unknown."""
+    meta = evt.get("packet_meta")
+    if isinstance(meta, dict) and meta.get("pkt_len"):
+        return int(meta["pkt_len"])
+    flow = evt.get("flow_summary")
+    if isinstance(flow, dict):
+        return int(flow.get("bytes_fwd", 0) or 0) + int(flow.get("bytes_bwd", 0) or 0)
+    return 0
+
+
+def is_alert(evt):
+    return str(evt.get("prediction", "")).upper() not in BENIGN
+
+
+def _bump(st, dim, key):
+    counts = st["dims"][dim]
+    n = counts.get(key)
+    if n is not None:
+        counts[key] = n + 1
+        return
+    if len(counts) >= MAX_KEYS:
+        # fold the lighter half into "other" (one sort per MAX_KEYS/2 new keys)
+        ranked = sorted(counts.items(), key=lambda kv: kv[1])
+        cut = len(ranked) // 2
+        st["other"][dim] += sum(n for _, n in ranked[:cut])
+        st["dims"][dim] = counts = dict(ranked[cut:])
+    counts[key] = 1
+
+
+# -------------------------
+# Update
+# -------------------------
+def record(model, evt, ts=None):
+    """Count one event for `model`."""
+    ts = ts or evt.get("ts") or time.time()
+    size = event_bytes(evt)
+    alert = is_alert(evt)
+    sec = int(ts)
+    with _lock:
+        st = _state(model)
+        st["total"] += 1
+        st["bytes"] += size
+        st["alerts"] += alert
+        _bump(st, "prediction", str(evt.get("prediction", "Unknown")))
+        _bump(st, "proto", str(evt.get("proto") or "OTHER").upper())
+        _bump(st, "dport", evt.get("dport") if evt.get("dport") not in (None, "") else "Unknown")
+        _bump(st, "src_ip", evt.get("src_ip") or "Unknown")
+        _bump(st, "src_country", evt.get("src_country") or "Unknown")
+        _bump(st, "risk_level", str(evt.get("risk_level") or "Low"))
+        slot = st["seconds"][sec % SECOND_WINDOW]
+        if slot[0] != sec:
+            slot[0], slot[1], slot[2], slot[3] = sec, 0, 0, 0
+        slot[1] += 1
+        slot[2] += size
+        slot[3] += alert
+
+
+def reset(model=None):
+    with _lock:
+        for m in ([model] if model else list(_models)):
+            _models[m] = _new_model()
+
+
+# -------------------------
+# Read
+# -------------------------
+def counts(model, dim, top=None):
+    """{key: count} of one dimension, largest first (optionally the top N)."""
+    with _lock:
+        items = list(_state(model)["dims"][dim].items())
+    items.sort(key=lambda kv: kv[1], reverse=True)
+    return dict(items[:top] if top else items)
+
+
+def snapshot(model, top=10):
+    """Totals and the top N of every dimension."""
+    with _lock:
+        st = _state(model)
+        out = {
+            "model": model,
+            "total": st["total"],
+            "bytes": st["bytes"],
+            "alerts": st["alerts"],
+            "since": st["since"],
+            "other": dict(st["other"]),
+            "dims": {d: list(c.items()) for d, c in st["dims"].items()},
+        }
+    for d, items in out["dims"].items():
+        items.sort(key=lambda kv: kv[1], reverse=True)
+        out["dims"][d] = [{"key": k, "count": n} for k, n in items[:top]]
+    return out
+
+
+def timeline(model, seconds=60, now=None):
+    """Per-second events/bytes/alerts for the last `seconds` (oldest first, gaps are 0)."""
+    seconds = max(1, min(int(seconds), SECOND_WINDOW))
+    now = int(now or time.time())
+    with _lock:
+        ring = [list(s) for s in _state(model)["seconds"]]
+    out = []
+    for sec in range(now - seconds + 1, now + 1):
+        slot = ring[sec % SECOND_WINDOW]
+        hit = slot[0] == sec
+        out.append({
+            "time": datetime.fromtimestamp(sec).strftime("%H:%M:%S"),
+            "ts": sec,
+            "value": slot[1] if hit else 0,
+            "bytes": slot[2] if hit else 0,
+            "alerts": slot[3] if hit else 0,
+        })
+    return out
@@ -0,0 +1,258 @@
+# utils/event_rollups.py
+# -------------------------------------------------------------
+# Per-class time-series rollups for the reports endpoints
+# - push_event counts every event into second, minute, hour and day
+#   buckets per model (hour/day buckets follow local time)
+# - each resolution keeps its own retention (NIDS_ROLLUP_KEEP_<RES>,
+#   seconds); older buckets are dropped when saved
+# - saved by the logger's writer every SAVE_INTERVAL to
+#   logs/rollups/<resolution>.json.gz as [bucket, class index, count]
+#   triples with one shared class table
+# - on first start the buckets are backfilled from the event store
+# - series()/totals() read the finest resolution that still holds the
+#   range in <= MAX_POINTS buckets, so reports never touch raw events;
+#   an explicit resolution whose retention or MAX_POINTS cannot cover
+#   the range raises ResolutionError instead of returning empty buckets
+# -------------------------------------------------------------
+import os
+import gzip
+import json
+import time
+import threading
+from datetime import datetime
+
+from utils import event_store
+
+ROLLUP_DIR = os.path.join(os.path.dirname(event_store.DB_PATH), "rollups")
+SAVE_INTERVAL = float(os.environ.get("NIDS_ROLLUP_SAVE_INTERVAL", 60.0))
+MAX_POINTS = 1000
+
+# resolution -> (bucket width, retention) in seconds
+RESOLUTIONS = {
+    "second": (1, int(os.environ.get("NIDS_ROLLUP_KEEP_SECOND", 3600))),
+    "minute": (60, int(os.environ.get("NIDS_ROLLUP_KEEP_MINUTE", 2 * 86400))),
+    "hour": (3600, int(os.environ.get("NIDS_ROLLUP_KEEP_HOUR", 90 * 86400))),
+    "day": (86400, int(os.environ.get("NIDS_ROLLUP_KEEP_DAY", 5 * 365 * 86400))),
+}
+_LABELS = {"second": "%H:%M:%S", "minute": "%Y-%m-%d %H:%M", "hour": "%Y-%m-%d %H:00", "day": "%Y-%m-%d"}
+
+
+
+class ResolutionError(ValueError):
+    """The requested resolution cannot serve the requested range."""
+
+
+_lock = threading.Lock()
+# _buckets[res][model][bucket_start] -> {class: count}
+_buckets = {res: {} for res in RESOLUTIONS}
+_dirty = set()
+_loaded = False
+_last_save = 0.0
+
+
+def bucket_start(ts, res):
+    """Start of the `res` bucket holding `ts` (hour/day aligned to local time)."""
+    width = RESOLUTIONS[res][0]
+    if width < 3600:
+        return int(ts // width * width)
+    off = time.localtime(ts).tm_gmtoff
+    return int((ts + off) // width * width - off)
+
+
+# -------------------------
+# Update
+# -------------------------
+def record(model, prediction, ts=None):
+    """Count one event of class `prediction` at `ts` in every resolution."""
+    ts = ts or time.time()
+    cls = str(prediction)
+    off = time.localtime(ts).tm_gmtoff
+    with _lock:
+        for res, (width, _) in RESOLUTIONS.items():
+            if width < 3600:
+                b = int(ts // width * width)
+            else:
+                b = int((ts + off) // width * width - off)
+            counts = _buckets[res].setdefault(model, {}).setdefault(b, {})
+            counts[cls] = counts.get(cls, 0) + 1
+            _dirty.add(res)
+
+
+# -------------------------
+# Persistence
+# -------------------------
+def _path(res):
+    return os.path.join(ROLLUP_DIR, f"{res}.json.gz")
+
+
+def _prune(res, now):
+    keep_after = now - RESOLUTIONS[res][1]
+    for buckets in _buckets[res].values():
+        for b in [b for b in buckets if b < keep_after]:
+            del buckets[b]
+
+
+def _encode(res):
+    classes, index = [], {}
+    models = {}
+    for model, buckets in _buckets[res].items():
+        rows = []
+        for b in sorted(buckets):
+            for cls, n in buckets[b].items():
+                i = index.get(cls)
+                if i is None:
+                    i = index[cls] = len(classes)
+                    classes.append(cls)
+                rows.append([b, i, n])
+        models[model] = rows
+    return {"resolution": res, "width": RESOLUTIONS[res][0], "classes": classes, "models": models}
+
+
+def save(force=False):
+    """Prune and write changed resolutions (at most every SAVE_INTERVAL unless forced)."""
+    global _last_save
+    now = time.time()
+    if not force and now - _last_save < SAVE_INTERVAL:
+        return
+    _last_save = now
+    with _lock:
+        payloads = []
+        for res in RESOLUTIONS:
+            if res in _dirty or force:
+                _prune(res, now)
+                payloads.append((res, _encode(res)))
+        _dirty.clear()
+    if not payloads:
+        return
+    os.makedirs(ROLLUP_DIR, exist_ok=True)
+    for res, payload in payloads:
+        tmp = _path(res) + ".tmp"
+        try:
+            with gzip.open(tmp, "wt", encoding="utf-8") as f:
+                json.dump(payload, f, separators=(",", ":"))
+            os.replace(tmp, _path(res))
+        except OSError as e:
+            print(f"[event_rollups] Could not save {res} rollups: {e}")
+
+
+def load():
+    """Read saved rollups once; backfill from the event store when there are none."""
+    global _loaded
+    with _lock:
+        if _loaded:
+            return
+        found = False
+        for res in RESOLUTIONS:
+            try:
+                with gzip.open(_path(res), "rt", encoding="utf-8") as f:
+                    payload = json.load(f)
+            except (OSError, ValueError):
+                continue
+            found = True
+            classes = payload["classes"]
+            for model, rows in payload["models"].items():
+                buckets = _buckets[res].setdefault(model, {})
+                for b, i, n in rows:
+                    counts = buckets.setdefault(b, {})
+                    counts[classes[i]] = counts.get(classes[i], 0) + n
+        _loaded = True
+    if not found:
+        _backfill()
+
+
+def _backfill():
+    """Seed minute/hour/day buckets from the rows still in the event store."""
+    now = time.time()
+    off = time.localtime(now).tm_gmtoff
+    seeded = 0
+    for res in ("minute", "hour", "day"):
+        width, keep = RESOLUTIONS[res]
+        shift = off if width >= 3600 else 0
+        for model in ("bcc", "cicids"):
+            rows = event_store.bucket_counts(model, width, shift, start=now - keep)
+            with _lock:
+                buckets = _buckets[res].setdefault(model, {})
+                for b, cls, n in rows:
+                    counts = buckets.setdefault(b, {})
+                    counts[str(cls)] = counts.get(str(cls), 0) + n
+            if res == "day":
+                seeded += sum(n for _, _, n in rows)
+    if seeded:
+        print(f"[event_rollups] Backfilled rollups from {seeded} stored events")
+        save(force=True)
+
+
+# -------------------------
+# Query
+# -------------------------
+def pick_resolution(start, end):
+    """Finest resolution still holding `start` that spans [start, end) in <= MAX_POINTS buckets."""
+    now = time.time()
+    for res, (width, keep) in RESOLUTIONS.items():
+        if start >= now - keep and (end - start) / width <= MAX_POINTS:
+            return res
+    return "day"
+
+
+def _resolve(start, end, resolution, points=True):
+    if resolution is None:
+        res = pick_resolution(start, end)
+    elif resolution not in RESOLUTIONS:
+        raise ResolutionError(f"resolution must be one of {list(RESOLUTIONS)}")
+    else:
+        res = resolution
+        if start < time.time() - RESOLUTIONS[res][1]:
+            raise ResolutionError(f"{res} buckets are only kept for {RESOLUTIONS[res][1]}s; "
+                                  f"use a coarser resolution or a later start")
+    if points and (end - start) / RESOLUTIONS[res][0] > MAX_POINTS:
+        raise ResolutionError(f"range spans more than {MAX_POINTS} {res} buckets; "
+                              f"use a coarser resolution or a shorter range")
+    return res
+
+
+def _next_bucket(b, res):
+    width = RESOLUTIONS[res][0]
+    if width < 3600:
+        return b + width
+    # local days can be 23/25h long around DST: re-align from mid-bucket
+    return bucket_start(b + width * 1.5, res)
+
+
+def series(model, start, end=None, resolution=None, classes=None):
+    """
+    Buckets in [start, end) oldest first, gaps included:
+    [{"ts", "date", "counts": {class: n}, "total"}].
+    Raises ResolutionError if the range needs more than MAX_POINTS buckets
+    or starts before `resolution` keeps data.
+    """
+    end = end or time.time()
+    res = _resolve(start, end, resolution)
+    load()
+    first = bucket_start(start, res)
+    with _lock:
+        buckets = _buckets[res].get(model, {})
+        out = []
+        b = first
+        while b < end and len(out) <= MAX_POINTS:
+            counts = dict(buckets.get(b, {}))
+            if classes is not None:
+                counts = {c: n for c, n in counts.items() if c in classes}
+            out.append({"ts": b, "date": datetime.fromtimestamp(b).strftime(_LABELS[res]),
+                        "counts": counts, "total": sum(counts.values())})
+            b = _next_bucket(b, res)
+    return res, out
+
+
+def totals(model, start, end=None, resolution=None):
+    """{class: count} over [start, end) at the resolution series() would use."""
+    end = end or time.time()
+    res = _resolve(start, end, resolution, points=False)
+    load()
+    first = bucket_start(start, res)
+    out = {}
+    with _lock:
+        for b, counts in _buckets[res].get(model, {}).items():
+            if first <= b < end:
+                for cls, n in counts.items():
+                    out[cls] = out.get(cls, 0) + n
+    return out
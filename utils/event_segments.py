@@ -0,0 +1,231 @@
+# utils/event_segments.py
+# -------------------------------------------------------------
+# Time/size-bounded segments over the event store
+# - each model's events are cut into segments (id ranges) once the open
+#   segment is SEGMENT_SECONDS old or holds SEGMENT_MAX_ROWS events
+# - closed segments are exported to logs/segments/<model>-<first>-<last>.csv.gz
+#   in the background (failed exports are retried on the next check);
+#   index.json records each segment's time/id range
+# - rows stay queryable in SQLite for HOT_SECONDS, then the whole
+#   segment's range is dropped from the store ("evicted")
+# - retention deletes whole segment files past RETENTION_SECONDS;
+#   nothing is ever rewritten
+# - iter_export() streams a time range: evicted segments that overlap it
+#   from their .gz files, the rest straight from SQLite
+# -------------------------------------------------------------
+import os
+import io
+import csv
+import gzip
+import json
+import time
+import threading
+from datetime import datetime
+
+from utils import event_store
+
+SEGMENT_DIR = os.path.join(os.path.dirname(event_store.DB_PATH), "segments")
+INDEX_FILE = os.path.join(SEGMENT_DIR, "index.json")
+SEGMENT_SECONDS = int(os.environ.get("NIDS_LOG_SEGMENT_SECONDS", 3600))
+SEGMENT_MAX_ROWS = int(os.environ.get("NIDS_LOG_SEGMENT_ROWS", 250_000))
+HOT_SECONDS = int(os.environ.get("NIDS_LOG_HOT_SECONDS", 7 * 86400))            # queryable in SQLite
+RETENTION_SECONDS = int(os.environ.get("NIDS_LOG_RETENTION_SECONDS", 30 * 86400))  # kept at all
+CHECK_INTERVAL = 30.0
+MODELS = ("bcc", "cicids")
+
+_index = None          # {"segments": [...], "open": {model: {"first_id", "start_ts"}}}
+_lock = threading.Lock()
+_last_check = 0.0
+
+
+# -------------------------
+# Index
+# -------------------------
+def _load_index():
+    global _index
+    if _index is None:
+        try:
+            with open(INDEX_FILE, "r", encoding="utf-8") as f:
+                _index = json.load(f)
+        except (OSError, ValueError):
+            _index = {"segments": [], "open": {}}
+    return _index
+
+
+def _save_index():
+    os.makedirs(SEGMENT_DIR, exist_ok=True)
+    tmp = INDEX_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(_index, f, indent=1)
+    os.replace(tmp, INDEX_FILE)
+
+
+def segments(model=None):
+    """Snapshot of the segment index (oldest first)."""
+    with _lock:
+        segs = _load_index()["segments"]
+        return [dict(s) for s in segs if model is None or s["model"] == model]
+
+
+# -------------------------
+# Rotation
+# -------------------------
+def maybe_rotate(now=None, force=False):
+    """Close due segments, archive them and apply hot/retention limits. Cheap when nothing is due."""
+    global _last_check
+    now = now or time.time()
+    if not force and now - _last_check < CHECK_INTERVAL:
+        return
+    _last_check = now
+
+    closed = []
+    with _lock:
+        index = _load_index()
+        for model in MODELS:
+            open_seg = index["open"].get(model)
+            after = open_seg["first_id"] - 1 if open_seg else _last_closed_id(index, model)
+            rows, last_id, min_ts, max_ts = event_store.id_range_stats(model, after)
+            if not rows:
+                continue
+            if open_seg is None:
+                open_seg = index["open"][model] = {"first_id": after + 1, "start_ts": min_ts}
+            if now - open_seg["start_ts"] < SEGMENT_SECONDS and rows < SEGMENT_MAX_ROWS:
+                continue
+            seg = {
+                "model": model, "first_id": open_seg["first_id"], "last_id": last_id,
+                "start": min_ts, "end": max_ts, "rows": rows,
+                "file": None, "bytes": 0, "evicted": False,
+            }
+            index["segments"].append(seg)
+            index["open"][model] = {"first_id": last_id + 1, "start_ts": now}
+            closed.append(seg)
+        if closed:
+            _save_index()
+        # includes segments whose earlier archive attempt failed
+        pending = [dict(s) for s in index["segments"] if not s["file"] and not s["evicted"]]
+
+    for seg in pending:
+        _archive(seg)
+    _enforce_limits(now)
+
+
+def _last_closed_id(index, model):
+    ids = [s["last_id"] for s in index["segments"] if s["model"] == model]
+    return max(ids) if ids else 0
+
+
+def _segment_name(seg):
+    stamp = lambda ts: datetime.fromtimestamp(ts).strftime("%Y%m%dT%H%M%S")
+    return f"{seg['model']}-{stamp(seg['start'])}-{stamp(seg['end'])}-{seg['first_id']}.csv.gz"
+
+
+def _archive(seg):
+    """Write one closed segment to its .csv.gz (off the event loop when eventlet runs)."""
+    from utils.offline_jobs import run_blocking
+
+    name = _segment_name(seg)
+    path = os.path.join(SEGMENT_DIR, name)
+    try:
+        os.makedirs(SEGMENT_DIR, exist_ok=True)
+        run_blocking(_write_gzip, path, seg)
+    except Exception as e:
+        print(f"[event_segments] Archiving {name} failed: {e}")
+        return
+    with _lock:
+        for s in _load_index()["segments"]:
+            if s["model"] == seg["model"] and s["first_id"] == seg["first_id"]:
+                s["file"] = name
+                s["bytes"] = os.path.getsize(path)
+        _save_index()
+    print(f"[event_segments] Archived {seg['rows']} {seg['model']} events -> {name}")
+
+
+def _write_gzip(path, seg):
+    tmp = path + ".tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8", newline="", compresslevel=6) as f:
+        for chunk in event_store.iter_csv(model=seg["model"], after_id=seg["first_id"] - 1,
+                                          last_id=seg["last_id"]):
+            f.write(chunk)
+    os.replace(tmp, path)
+
+
+def _enforce_limits(now):
+    """Evict archived segments past HOT_SECONDS from SQLite; delete files past retention."""
+    evict, expire = [], []
+    with _lock:
+        index = _load_index()
+        keep = []
+        for seg in index["segments"]:
+            age = now - seg["end"]
+            if age > RETENTION_SECONDS:
+                expire.append(seg)
+                continue
+            if seg["file"] and not seg["evicted"] and age > HOT_SECONDS:
+                seg["evicted"] = True
+                evict.append(seg)
+            keep.append(seg)
+        if evict or expire:
+            index["segments"] = keep
+            _save_index()
+
+    for seg in evict + [s for s in expire if not s["evicted"]]:
+        event_store.delete_through(seg["model"], seg["last_id"])
+    for seg in expire:
+        if seg["file"]:
+            try:
+                os.remove(os.path.join(SEGMENT_DIR, seg["file"]))
+            except OSError:
+                pass
+        print(f"[event_segments] Retention dropped segment {seg['file'] or seg['first_id']}")
+
+
+# -------------------------
+# Export
+# -------------------------
+def _iso(ts):
+    return datetime.fromtimestamp(ts).isoformat(timespec="seconds") if ts is not None else None
+
+
+def _iter_segment(seg, start, end, block=256 * 1024):
+    """Rows of an archived segment (no header); only boundary segments are parsed."""
+    path = os.path.join(SEGMENT_DIR, seg["file"])
+    inside = (start is None or seg["start"] >= start) and (end is None or seg["end"] < end)
+    with gzip.open(path, "rt", encoding="utf-8", newline="") as f:
+        f.readline()  # header
+        if inside:
+            while True:
+                data = f.read(block)
+                if not data:
+                    return
+                yield data
+        lo, hi = _iso(start), _iso(end)
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for row in csv.reader(f):
+            stamp = row[0]
+            if (lo is None or stamp >= lo) and (hi is None or stamp < hi):
+                writer.writerow(row)
+            if buf.tell() >= block:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        if buf.tell():
+            yield buf.getvalue()
+
+
+def iter_export(model, start=None, end=None):
+    """CSV text for a model and time range: overlapping evicted segments, then the store."""
+    buf = io.StringIO()
+    csv.writer(buf).writerow(event_store.CSV_HEADER)
+    yield buf.getvalue()
+
+    evicted_through = 0
+    for seg in segments(model):
+        if not seg["evicted"]:
+            continue
+        evicted_through = max(evicted_through, seg["last_id"])
+        if (start is not None and seg["end"] < start) or (end is not None and seg["start"] >= end):
+            continue
+        yield from _iter_segment(seg, start, end)
+    yield from event_store.iter_csv(header=False, model=model, start=start, end=end,
+                                    after_id=evicted_through or None)
@@ -0,0 +1,400 @@
+# utils/event_store.py
+# -------------------------------------------------------------
+# Embedded event store for the live logger (SQLite, WAL mode)
+# - one table for both models; every row carries its model, an epoch
+#   timestamp (ts) and the logger's display fields
+# - the logger's writer thread keeps one connection open (open_writer)
+#   and inserts everything pending per group commit (insert_many)
+# - indexes on (model, ts), (model, src_ip), (model, dst_ip) and
+#   (model, prediction) back the query API: time range, IP, class,
+#   offset/limit pagination and CSV export
+# - meta "id_high" holds the highest id ever committed, so ids stay
+#   monotonic across restarts even after the newest rows were removed
+# - legacy per-model CSV logs are imported once on first open
+# -------------------------------------------------------------
+import os
+import csv
+import io
+import time
+import uuid
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+LOG_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "logs"))
+DB_PATH = os.environ.get("NIDS_EVENT_DB", os.path.join(LOG_DIR, "events.db"))
+MAX_PAGE = 5000
+
+# Display fields persisted per event (same order as the old CSV logs)
+FIELDS = [
+    "time", "src_ip", "sport", "dst_ip", "dport", "proto",
+    "prediction", "risk_level", "risk_score",
+    "src_country", "src_city", "src_lat", "src_lon",
+    "dst_country", "dst_city", "dst_lat", "dst_lon"
+]
+_INT_FIELDS = {"sport", "dport"}
+_REAL_FIELDS = {"risk_score", "src_lat", "src_lon", "dst_lat", "dst_lon", "confidence"}
+COLUMNS = ["id", "ts", "model"] + FIELDS + ["confidence"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    model TEXT NOT NULL,
+    {fields},
+    confidence REAL
+);
+CREATE INDEX IF NOT EXISTS idx_events_model_ts ON events (model, ts);
+CREATE INDEX IF NOT EXISTS idx_events_src ON events (model, src_ip, ts);
+CREATE INDEX IF NOT EXISTS idx_events_dst ON events (model, dst_ip, ts);
+CREATE INDEX IF NOT EXISTS idx_events_pred ON events (model, prediction, ts);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+""".format(fields=",\n    ".join(
+    f"{f} {'INTEGER' if f in _INT_FIELDS else 'REAL' if f in _REAL_FIELDS else 'TEXT'}" for f in FIELDS))
+
+_INSERT = f"INSERT OR REPLACE INTO events ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+_init_lock = threading.Lock()
+_initialized = False
+
+
+def _connect():
+    conn = sqlite3.connect(DB_PATH, timeout=30, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def open_writer(synchronous="NORMAL"):
+    """
+    Long-lived connection for the logger's writer. `synchronous` is the
+    commit durability: OFF (no fsync), NORMAL (fsync at WAL checkpoints)
+    or FULL (fsync every commit).
+    """
+    init()
+    conn = _connect()
+    conn.execute(f"PRAGMA synchronous={synchronous}")
+    return conn
+
+
+def init(legacy_csvs=None):
+    """Create the schema (WAL mode) and import legacy CSV logs once. Idempotent."""
+    global _initialized
+    if _initialized:
+        return
+    with _init_lock:
+        if _initialized:
+            return
+        os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+        conn = _connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('instance', ?)", (uuid.uuid4().hex,))
+            for model, path in (legacy_csvs or {}).items():
+                _import_legacy_csv(conn, model, path)
+            conn.commit()
+        finally:
+            conn.close()
+        _initialized = True
+
+
+# -------------------------
+# Writing
+# -------------------------
+def _row(evt):
+    out = [evt.get("id"), float(evt.get("ts") or time.time()), evt.get("model", "bcc")]
+    for f in FIELDS + ["confidence"]:
+        v = evt.get(f)
+        out.append(None if v == "" else v if v is None or isinstance(v, (int, float, str)) else str(v))
+    return out
+
+
+def insert_many(events, conn=None):
+    """Insert event dicts (must carry "model"; "id"/"ts" optional) in one transaction."""
+    if not events:
+        return 0
+    init()
+    own = conn is None
+    conn = conn or _connect()
+    try:
+        rows = [_row(e) for e in events]
+        top = max((r[0] for r in rows if r[0] is not None), default=None)
+        with conn:
+            conn.executemany(_INSERT, rows)
+            if top is not None:
+                _raise_id_high(conn, top)
+    finally:
+        if own:
+            conn.close()
+    return len(events)
+
+
+def delete_events(model, ids=None, prediction=None, last=None):
+    """
+    Delete by id list, by prediction, or the `last` newest rows of a model.
+    Returns {prediction: rows deleted}.
+    """
+    init()
+    if ids is not None:
+        ids = [int(i) for i in ids]
+        cond, args = f"model = ? AND id IN ({', '.join('?' * len(ids))})", [model] + ids
+    elif prediction is not None:
+        cond, args = "model = ? AND prediction = ?", [model, prediction]
+    elif last is not None:
+        cond, args = ("id IN (SELECT id FROM events WHERE model = ? ORDER BY id DESC LIMIT ?)",
+                      [model, int(last)])
+    else:
+        return {}
+    if ids == []:
+        return {}
+    conn = _connect()
+    try:
+        with conn:
+            removed = conn.execute(f"SELECT prediction, COUNT(*) FROM events WHERE {cond} GROUP BY prediction",
+                                   args).fetchall()
+            conn.execute(f"DELETE FROM events WHERE {cond}", args)
+    finally:
+        conn.close()
+    return {str(p): int(c) for p, c in removed}
+
+
+# -------------------------
+# Querying
+# -------------------------
+def parse_time(value):
+    """Epoch seconds from a number or an ISO-8601 string; None passes through."""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return datetime.fromisoformat(str(value)).timestamp()
+
+
+def _where(model=None, start=None, end=None, ip=None, src_ip=None, dst_ip=None,
+           prediction=None, after_id=None):
+    clauses, args = [], []
+    if model:
+        clauses.append("model = ?")
+        args.append(model)
+    if start is not None:
+        clauses.append("ts >= ?")
+        args.append(float(start))
+    if end is not None:
+        clauses.append("ts < ?")
+        args.append(float(end))
+    if ip:
+        clauses.append("(src_ip = ? OR dst_ip = ?)")
+        args += [ip, ip]
+    if src_ip:
+        clauses.append("src_ip = ?")
+        args.append(src_ip)
+    if dst_ip:
+        clauses.append("dst_ip = ?")
+        args.append(dst_ip)
+    if prediction:
+        preds = [prediction] if isinstance(prediction, str) else list(prediction)
+        clauses.append(f"prediction IN ({', '.join('?' * len(preds))})")
+        args += preds
+    if after_id is not None:
+        clauses.append("id > ?")
+        args.append(int(after_id))
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+
+def query_events(offset=0, limit=100, newest_first=True, **filters):
+    """
+    One page of events as (rows, total). Filters: model, start/end (epoch,
+    end exclusive), ip (either side), src_ip, dst_ip, prediction (str or
+    list), after_id.
+    """
+    init()
+    limit = max(1, min(int(limit), MAX_PAGE))
+    offset = max(0, int(offset))
+    where, args = _where(**filters)
+    order = "DESC" if newest_first else "ASC"
+    conn = _connect()
+    try:
+        total = conn.execute(f"SELECT COUNT(*) FROM events{where}", args).fetchone()[0]
+        rows = conn.execute(f"SELECT * FROM events{where} ORDER BY ts {order}, id {order} LIMIT ? OFFSET ?",
+                            args + [limit, offset]).fetchall()
+    finally:
+        conn.close()
+    return [dict(r) for r in rows], total
+
+
+def recent(model, n):
+    """Newest `n` events of a model, oldest first."""
+    init()
+    conn = _connect()
+    try:
+        rows = conn.execute("SELECT * FROM events WHERE model = ? ORDER BY ts DESC, id DESC LIMIT ?",
+                            (model, int(n))).fetchall()
+    finally:
+        conn.close()
+    return [dict(r) for r in reversed(rows)]
+
+
+def class_counts(model, start=None, end=None, after_id=None):
+    init()
+    where, args = _where(model=model, start=start, end=end, after_id=after_id)
+    conn = _connect()
+    try:
+        rows = conn.execute(f"SELECT prediction, COUNT(*) FROM events{where} GROUP BY prediction", args).fetchall()
+    finally:
+        conn.close()
+    return {str(p): int(c) for p, c in rows}
+
+
+def bucket_counts(model, width, shift=0, start=None):
+    """(bucket start, prediction, count) rows for `width`-second buckets (shifted by `shift` s)."""
+    init()
+    where, args = _where(model=model, start=start)
+    conn = _connect()
+    try:
+        return conn.execute(
+            f"SELECT CAST((ts + ?) / ? AS INTEGER) * ? - ? AS b, prediction, COUNT(*) "
+            f"FROM events{where} GROUP BY b, prediction",
+            [shift, width, width, shift] + args).fetchall()
+    finally:
+        conn.close()
+
+
+def id_range_stats(model, after_id=0):
+    """(rows, max_id, min_ts, max_ts) of a model's events with id > after_id."""
+    init()
+    conn = _connect()
+    try:
+        return tuple(conn.execute("SELECT COUNT(*), MAX(id), MIN(ts), MAX(ts) FROM events "
+                                  "WHERE model = ? AND id > ?", (model, int(after_id))).fetchone())
+    finally:
+        conn.close()
+
+
+def delete_through(model, last_id):
+    """Drop a model's events with id <= last_id (a whole archived segment)."""
+    init()
+    conn = _connect()
+    try:
+        with conn:
+            return conn.execute("DELETE FROM events WHERE model = ? AND id <= ?", (model, int(last_id))).rowcount
+    finally:
+        conn.close()
+
+
+def instance_id():
+    """Random id written when the database is created (tells a recreated store apart)."""
+    init()
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'instance'").fetchone()
+        return row[0] if row else None
+    finally:
+        conn.close()
+
+
+def _raise_id_high(conn, top):
+    """Record `top` as the highest id ever committed (inside the caller's transaction)."""
+    conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('id_high', '0')")
+    conn.execute("UPDATE meta SET value = ? WHERE key = 'id_high' AND CAST(value AS INTEGER) < ?",
+                 (str(int(top)), int(top)))
+
+
+def max_id():
+    """
+    Highest event id ever committed. Rows evicted or deleted from the top
+    still count, so ids handed out after a restart never repeat.
+    """
+    init()
+    conn = _connect()
+    try:
+        row = conn.execute("SELECT MAX(COALESCE((SELECT MAX(id) FROM events), 0), "
+                           "COALESCE((SELECT CAST(value AS INTEGER) FROM meta WHERE key = 'id_high'), 0))"
+                           ).fetchone()
+        return row[0]
+    finally:
+        conn.close()
+
+
+CSV_HEADER = ["timestamp"] + FIELDS
+
+
+def iter_csv(batch_rows=5000, header=True, last_id=None, **filters):
+    """
+    Yield CSV text (header first) for the matching events, oldest first, in
+    batches. `last_id` caps the id range (segment export).
+    """
+    init()
+    where, args = _where(**filters)
+    if last_id is not None:
+        where += (" AND" if where else " WHERE") + " id <= ?"
+        args.append(int(last_id))
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    if header:
+        writer.writerow(CSV_HEADER)
+        yield buf.getvalue()
+
+    conn = _connect()
+    try:
+        # one read snapshot (WAL), streamed in batches
+        cur = conn.execute(f"SELECT ts, {', '.join(FIELDS)} FROM events{where} ORDER BY ts, id", args)
+        while True:
+            page = cur.fetchmany(batch_rows)
+            if not page:
+                return
+            buf.seek(0)
+            buf.truncate()
+            for r in page:
+                writer.writerow([datetime.fromtimestamp(r[0]).isoformat(timespec="seconds")]
+                                + ["" if v is None else v for v in r[1:]])
+            yield buf.getvalue()
+    finally:
+        conn.close()
+
+
+# -------------------------
+# Legacy CSV import
+# -------------------------
+def _legacy_timestamps(times, mtime):
+    """
+    Old logs only stored HH:MM:SS. Anchor the last row at the file's mtime
+    and walk backwards, stepping back a day whenever the clock wraps.
+    """
+    day = datetime.fromtimestamp(mtime).replace(hour=0, minute=0, second=0, microsecond=0)
+    out = [None] * len(times)
+    later = None
+    for i in range(len(times) - 1, -1, -1):
+        try:
+            t = datetime.strptime(str(times[i]), "%H:%M:%S")
+            secs = t.hour * 3600 + t.minute * 60 + t.second
+        except ValueError:
+            secs = later if later is not None else 0
+        if later is None:
+            if day.timestamp() + secs > mtime:
+                day -= timedelta(days=1)
+        elif secs > later:
+            day -= timedelta(days=1)
+        out[i] = day.timestamp() + secs
+        later = secs
+    return out
+
+
+def _import_legacy_csv(conn, model, path):
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return
+    st = os.stat(path)
+    key = f"imported:{os.path.basename(path)}"
+    if conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+        return
+    try:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+    except Exception as e:
+        print(f"[event_store] Could not read legacy log {path}: {e}")
+        return
+    stamps = _legacy_timestamps([r.get("time") for r in rows], st.st_mtime)
+    conn.executemany(_INSERT, [_row(dict(r, model=model, ts=ts)) for r, ts in zip(rows, stamps)])
+    conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, f"{len(rows)} rows"))
+    print(f"[event_store] Imported {len(rows)} {model} events from {os.path.basename(path)}")
@@ -0,0 +1,308 @@
+# utils/heavy_hitters.py
+# -------------------------------------------------------------
+# Streaming heavy hitters over the live pipeline (fixed memory)
+# - keys: src IP, dst port, src /24 and /16 prefix (IPv4)
+# - metrics: packets, bytes, alerts
+# - sliding windows (WINDOWS, seconds) are rings of SLICES time slices;
+#   a query merges the slices inside the window (slice granularity)
+# - every slice keeps a Space-Saving summary (K counters) per key/metric
+#   for the top-K, and a Count-Min sketch (DEPTH x WIDTH) for point
+#   estimates of any key
+# - bounds per window of N total: Space-Saving overestimates a key by
+#   at most N/K (summed over the slices); Count-Min by e*N/WIDTH with
+#   probability 1 - e^-DEPTH; reported counts take the smaller estimate
+# -------------------------------------------------------------
+import os
+import math
+import time
+import heapq
+import hashlib
+import threading
+from functools import lru_cache
+from array import array
+
+K = int(os.environ.get("NIDS_HH_K", 64))
+WINDOWS = tuple(int(w) for w in os.environ.get("NIDS_HH_WINDOWS", "60,300,3600").split(","))
+SLICES = int(os.environ.get("NIDS_HH_SLICES", 6))
+WIDTH = int(os.environ.get("NIDS_HH_CMS_WIDTH", 512))
+DEPTH = int(os.environ.get("NIDS_HH_CMS_DEPTH", 4))
+
+DIMENSIONS = ("src_ip", "dport", "src_24", "src_16")
+METRICS = ("packets", "bytes", "alerts")
+
+_lock = threading.Lock()
+
+
+# -------------------------
+# Space-Saving summary
+# -------------------------
+class SpaceSaving:
+    """Top-K counters: counts[key] overestimates by at most errors[key]."""
+
+    __slots__ = ("k", "counts", "errors", "heap", "total")
+
+    def __init__(self, k):
+        self.k = k
+        self.counts = {}
+        self.errors = {}
+        self.heap = []      # (count, key); entries may be stale (count too low)
+        self.total = 0
+
+    def add(self, key, weight=1):
+        self.total += weight
+        counts = self.counts
+        n = counts.get(key)
+        if n is not None:
+            counts[key] = n + weight
+            return
+        if len(counts) < self.k:
+            counts[key] = weight
+            self.errors[key] = 0
+            heapq.heappush(self.heap, (weight, key))
+            return
+        # evict the current minimum; it becomes the newcomer's error
+        floor, victim = self._pop_min()
+        del counts[victim]
+        del self.errors[victim]
+        counts[key] = floor + weight
+        self.errors[key] = floor
+        heapq.heappush(self.heap, (floor + weight, key))
+        if len(self.heap) > 4 * self.k:
+            self.heap = [(c, k) for k, c in counts.items()]
+            heapq.heapify(self.heap)
+
+    def _pop_min(self):
+        heap, counts = self.heap, self.counts
+        while True:
+            c, key = heapq.heappop(heap)
+            real = counts.get(key)
+            if real is None:
+                continue
+            if real == c:
+                return c, key
+            heapq.heappush(heap, (real, key))
+
+    def floor(self):
+        """Upper bound for any key not in the summary."""
+        if len(self.counts) < self.k:
+            return 0
+        while self.heap:
+            c, key = self.heap[0]
+            real = self.counts.get(key)
+            if real == c:
+                return c
+            heapq.heappop(self.heap)
+            if real is not None:
+                heapq.heappush(self.heap, (real, key))
+        return 0
+
+    def clear(self):
+        self.counts.clear()
+        self.errors.clear()
+        self.heap = []
+        self.total = 0
+
+
+# -------------------------
+# Count-Min sketch
+# -------------------------
+@lru_cache(maxsize=65536)
+def _cells(key):
+    # row i uses h1 + i*h2 (double hashing) over a stable 64-bit digest of the
+    # key's text: hash() of an int is the int itself, so rows built from it
+    # all collapse onto key mod WIDTH
+    h = int.from_bytes(hashlib.blake2b(str(key).encode(), digest_size=8).digest(), "little")
+    h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+    return tuple((h1 + row * h2) % WIDTH + row * WIDTH for row in range(DEPTH))
+
+
+class CountMin:
+    __slots__ = ("table",)
+
+    def __init__(self):
+        self.table = array("q", bytes(8 * WIDTH * DEPTH))
+
+    def add(self, cells, weight):
+        t = self.table
+        for c in cells:
+            t[c] += weight
+
+    def estimate(self, cells):
+        t = self.table
+        return min(t[c] for c in cells)
+
+    def clear(self):
+        self.table = array("q", bytes(8 * WIDTH * DEPTH))
+
+
+class _Slice:
+    __slots__ = ("sid", "ss", "cms")
+
+    def __init__(self):
+        self.sid = -1
+        self.ss = {(d, m): SpaceSaving(K) for d in DIMENSIONS for m in METRICS}
+        self.cms = {(d, m): CountMin() for d in DIMENSIONS for m in METRICS}
+
+    def reset(self, sid):
+        self.sid = sid
+        for s in self.ss.values():
+            s.clear()
+        for c in self.cms.values():
+            c.clear()
+
+
+# window seconds -> ring of slices
+_rings = {w: [_Slice() for _ in range(SLICES)] for w in WINDOWS}
+
+
+# -------------------------
+# Update
+# -------------------------
+def _keys(evt):
+    src = evt.get("src_ip")
+    keys = {"src_ip": src or "Unknown", "dport": evt.get("dport") if evt.get("dport") not in (None, "") else "Unknown"}
+    parts = str(src or "").split(".")
+    if len(parts) == 4:
+        keys["src_24"] = ".".join(parts[:3]) + ".0/24"
+        keys["src_16"] = ".".join(parts[:2]) + ".0.0/16"
+    return keys
+
+
+def _packets(evt):
+    flow = evt.get("flow_summary")
+    if isinstance(flow, dict):
+        return int(flow.get("packets_fwd", 0) or 0) + int(flow.get("packets_bwd", 0) or 0) or 1
+    return 1
+
+
+def observe(evt, ts=None):
+    """Feed one live event (called from utils.logger.push_event)."""
+    from utils.event_counters import event_bytes, is_alert
+
+    ts = ts or evt.get("ts") or time.time()
+    weights = {"packets": _packets(evt), "bytes": event_bytes(evt), "alerts": 1 if is_alert(evt) else 0}
+    keys = _keys(evt)
+    cells = {d: _cells(k) for d, k in keys.items()}
+    with _lock:
+        for window, ring in _rings.items():
+            span = window / SLICES
+            sid = int(ts // span)
+            sl = ring[sid % SLICES]
+            if sl.sid != sid:
+                if sid < sl.sid:
+                    continue        # late event for a slice already recycled
+                sl.reset(sid)
+            for dim, key in keys.items():
+                dim_cells = cells[dim]
+                for metric, w in weights.items():
+                    if not w:
+                        continue
+                    ss = sl.ss[(dim, metric)]
+                    n = ss.counts.get(key)
+                    if n is None:
+                        ss.add(key, w)
+                    else:                       # hot path: key already tracked
+                        ss.counts[key] = n + w
+                        ss.total += w
+                    t = sl.cms[(dim, metric)].table
+                    for c in dim_cells:
+                        t[c] += w
+
+
+def reset():
+    with _lock:
+        for ring in _rings.values():
+            for sl in ring:
+                sl.reset(-1)
+
+
+# -------------------------
+# Query
+# -------------------------
+def _window(window):
+    """Configured window closest to `window` seconds."""
+    return min(WINDOWS, key=lambda w: abs(w - int(window)))
+
+
+def _live_slices(window, now):
+    span = window / SLICES
+    current = int(now // span)
+    return [sl for sl in _rings[window] if current - SLICES < sl.sid <= current]
+
+
+def top(dim="src_ip", metric="packets", window=300, k=10, now=None):
+    """
+    Top-k keys of `dim` by `metric` over the window:
+    {"window", "total", "items": [{"key", "count", "lower", "error", "guaranteed"}], "bounds"}.
+    """
+    if dim not in DIMENSIONS or metric not in METRICS:
+        raise ValueError(f"dim must be one of {DIMENSIONS}, metric one of {METRICS}")
+    window = _window(window)
+    now = now or time.time()
+    k = max(1, min(int(k), K))
+    with _lock:
+        slices = _live_slices(window, now)
+        summaries = [sl.ss[(dim, metric)] for sl in slices]
+        sketches = [sl.cms[(dim, metric)] for sl in slices]
+        total = sum(s.total for s in summaries)
+        floors = [s.floor() for s in summaries]
+        upper, error = {}, {}
+        for s, floor in zip(summaries, floors):
+            for key in s.counts:
+                upper.setdefault(key, 0)
+        for key in upper:
+            u = e = 0
+            for s, floor in zip(summaries, floors):
+                n = s.counts.get(key)
+                if n is None:
+                    u += floor
+                    e += floor
+                else:
+                    u += n
+                    e += s.errors[key]
+            upper[key], error[key] = u, e
+        ranked = sorted(upper, key=upper.get, reverse=True)
+        cms = {key: sum(c.estimate(_cells(key)) for c in sketches) for key in ranked[:k]}
+    # anything ranked below k (or never counted) is bounded by this
+    cutoff = max(upper[ranked[k]] if len(ranked) > k else 0, sum(floors))
+    items = []
+    for key in ranked[:k]:
+        count = min(upper[key], cms[key])
+        lower = max(0, upper[key] - error[key])
+        items.append({"key": key, "count": count, "lower": lower,
+                      "error": count - lower, "guaranteed": lower >= cutoff})
+    return {"dim": dim, "metric": metric, "window": window, "total": total, "items": items,
+            "bounds": _bounds(total)}
+
+
+def estimate(key, dim="src_ip", metric="packets", window=300, now=None):
+    """Count-Min estimate (an upper bound) of one key's metric over the window."""
+    if dim not in DIMENSIONS or metric not in METRICS:
+        raise ValueError(f"dim must be one of {DIMENSIONS}, metric one of {METRICS}")
+    window = _window(window)
+    now = now or time.time()
+    if dim == "dport":
+        try:
+            key = int(key)
+        except (TypeError, ValueError):
+            pass
+    cells = _cells(key)
+    with _lock:
+        slices = _live_slices(window, now)
+        total = sum(sl.ss[(dim, metric)].total for sl in slices)
+        count = sum(sl.cms[(dim, metric)].estimate(cells) for sl in slices)
+    return {"key": key, "dim": dim, "metric": metric, "window": window, "count": count,
+            "total": total, "bounds": _bounds(total)}
+
+
+def _bounds(total):
+    return {
+        "space_saving_max_error": math.ceil(total / K),
+        "count_min_max_error": math.ceil(math.e * total / WIDTH),
+        "count_min_confidence": round(1 - math.exp(-DEPTH), 4),
+    }
+
+
+def config():
+    return {"k": K, "windows": list(WINDOWS), "slices": SLICES, "cms_width": WIDTH, "cms_depth": DEPTH,
+            "dimensions": list(DIMENSIONS), "metrics": list(METRICS)}
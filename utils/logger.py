@@ -1,16 +1,41 @@
-# logger.py (Model-separated, non-blocking logger, per-model CSVs)
+# logger.py (Model-separated, non-blocking logger)
+# -------------------------------------------------------------
+# - events are persisted to the SQLite event store (utils.event_store)
+#   by a background writer; the old per-model CSVs are only read once,
+#   to import their history
+# - the writer sleeps on a condition and drains everything pending per
+#   cycle as one group commit over a connection it keeps open; it wakes
+#   early once _GROUP_ROWS events are queued
+# - the queue is bounded (_MAX_PENDING): when full, push_event either
+#   waits up to _BLOCK_MS for room ("block") or drops the write ("drop");
+#   drops are counted per model and reported by writer_stats()
+# - the last _MAX_RECENT events per model stay in memory for the live UI;
+#   query_events() answers anything older (time range, IP, class, pages)
+# - per-model class counts survive restarts: committed counts are
+#   snapshotted to stats_snapshot.json (with the last committed id);
+#   startup adds a GROUP BY over rows newer than the snapshot
+# - push_event also feeds the live counters (utils.event_counters)
+#   that the traffic/status endpoints read, and the per-class time
+#   rollups behind the reports (utils.event_rollups), the top-talker
+#   sketches (utils.heavy_hitters), scan detection (utils.scan_detector)
+#   and the alert index behind /api/alerts (utils.alert_index)
+# - the writer also rotates the store into gzip segments
+#   (utils.event_segments); exports stream only the overlapping ones
 # -------------------------------------------------------------
 import os
-import csv
+import json
 import threading
 import time
+from collections import deque
 from datetime import datetime
 import numpy as np
 
+from utils import event_store, event_segments, event_counters, event_rollups, heavy_hitters, scan_detector, alert_index
+
 LOG_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "logs"))
 os.makedirs(LOG_DIR, exist_ok=True)
 
-# ADD THESE TWO LINES:
+# Legacy CSV logs (imported into the event store on first start)
 LOG_FILE = os.path.join(LOG_DIR, "bcc_logs.csv") # Fallback to BCC log
 
 def classify_risk(score):
@@ -23,15 +48,19 @@ BCC_LOG_FILE = os.path.join(LOG_DIR, "bcc_logs.csv")
 CICIDS_LOG_FILE = os.path.join(LOG_DIR, "cicids_logs.csv")
 
 _MAX_RECENT = 500
-_FLUSH_INTERVAL = 2.0
-_FLUSH_BATCH = 50
-
-_headers = [
-    "time", "src_ip", "sport", "dst_ip", "dport", "proto",
-    "prediction", "risk_level", "risk_score",
-    "src_country", "src_city", "src_lat", "src_lon",
-    "dst_country", "dst_city", "dst_lat", "dst_lon"
-]
+# writer tuning (group commit window, queue bound, overflow/fsync policy)
+_FLUSH_INTERVAL = float(os.environ.get("NIDS_LOG_FLUSH_INTERVAL", 1.0))
+_GROUP_ROWS = int(os.environ.get("NIDS_LOG_GROUP_ROWS", 2000))
+_MAX_PENDING = int(os.environ.get("NIDS_LOG_MAX_PENDING", 100_000))
+_OVERFLOW = os.environ.get("NIDS_LOG_OVERFLOW", "drop").lower()          # drop | block
+_BLOCK_MS = int(os.environ.get("NIDS_LOG_BLOCK_MS", 200))
+_SYNC = os.environ.get("NIDS_LOG_SYNC", "NORMAL").upper()                # OFF | NORMAL | FULL
+if _SYNC not in ("OFF", "NORMAL", "FULL"):
+    _SYNC = "NORMAL"
+_STATS_INTERVAL = float(os.environ.get("NIDS_LOG_STATS_INTERVAL", 30.0))
+STATS_SNAPSHOT = os.path.join(os.path.dirname(event_store.DB_PATH), "stats_snapshot.json")
+
+_headers = event_store.FIELDS
 
 # In-memory per-model buffers & stats
 _model_events = {
@@ -49,104 +78,245 @@ _active_model_lock = threading.Lock()
 _active_model = "bcc"
 
 # writer buffers and locks
-_write_buffer = []   # list of dicts, each item must include "model" key
+_write_buffer = deque()   # dicts, each item must include "model" key
 _buffer_lock = threading.Lock()
+_buffer_cond = threading.Condition(_buffer_lock)   # wakes the writer / blocked pushers
+_flush_lock = threading.Lock()   # one batch in flight at a time
+_writer_conn = None              # writer's SQLite connection (used under _flush_lock)
 _events_lock = threading.Lock()
 
 _stop_writer = threading.Event()
 
-# -------------------------
-# Helpers: file name for model
-# -------------------------
-def _file_for_model(model):
-    if model == "cicids":
-        return CICIDS_LOG_FILE
-    return BCC_LOG_FILE
+# event ids are assigned at push time (monotonic across models)
+_next_id = 0
+
+def _init_store():
+    event_store.init({"bcc": BCC_LOG_FILE, "cicids": CICIDS_LOG_FILE})
+
+# class counts of committed rows (what the stats snapshot stores)
+_persisted_stats = {"bcc": {}, "cicids": {}}
+_persisted_id = 0
+_snapshot_at = 0.0
+_snapshot_id = -1
+
+# writer counters (read via writer_stats)
+_writer_stats = {
+    "written": 0, "commits": 0, "errors": 0, "blocked": 0,
+    "dropped": {"bcc": 0, "cicids": 0},
+    "last_batch": 0, "max_batch": 0, "last_commit_ms": 0.0, "peak_pending": 0,
+}
 
 # -------------------------
-# Full overwrite for a model CSV
+# Group commit to the event store
 # -------------------------
-def _flush_full_overwrite_model(model):
-    """Rewrite the entire CSV for a specific model from its in-memory buffer."""
-    fname = _file_for_model(model)
-    try:
+def _commit(batch):
+    global _writer_conn
+    if _writer_conn is None:
+        _writer_conn = event_store.open_writer(_SYNC)
+    event_store.insert_many(batch, _writer_conn)
+
+def _flush_to_disk():
+    """Write everything queued so far in one transaction."""
+    global _writer_conn, _persisted_id
+    from utils.offline_jobs import run_blocking
+
+    with _flush_lock:
+        with _buffer_cond:
+            if not _write_buffer:
+                return
+            batch = list(_write_buffer)
+            _write_buffer.clear()
+            _buffer_cond.notify_all()   # room again for blocked pushers
+
+        t0 = time.time()
+        try:
+            run_blocking(_commit, batch)
+        except Exception as e:
+            print("[logger] Event store write error:", e)
+            _writer_stats["errors"] += 1
+            if _writer_conn is not None:
+                try:
+                    _writer_conn.close()
+                except Exception:
+                    pass
+                _writer_conn = None
+            return
         with _events_lock:
-            rows = list(_model_events.get(model, []))
-        with open(fname, "w", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=_headers)
-            writer.writeheader()
-            for row in rows:
-                writer.writerow({k: row.get(k, "") for k in _headers})
-        # optional debug print
-        # print(f"[logger] {model} CSV fully rewritten: {len(rows)} rows -> {fname}")
-    except Exception as e:
-        print("[logger] Full overwrite failed:", e)
+            for item in batch:
+                counts = _persisted_stats.setdefault(item["model"], {})
+                pred = str(item.get("prediction", "Unknown"))
+                counts[pred] = counts.get(pred, 0) + 1
+            _persisted_id = max(_persisted_id, batch[-1]["id"])
+        _writer_stats["written"] += len(batch)
+        _writer_stats["commits"] += 1
+        _writer_stats["last_batch"] = len(batch)
+        _writer_stats["max_batch"] = max(_writer_stats["max_batch"], len(batch))
+        _writer_stats["last_commit_ms"] = round((time.time() - t0) * 1000, 2)
+
+def _flush_all():
+    """Drain the whole write buffer (before reads/deletes, so they see every event)."""
+    _flush_to_disk()
+    # an event pushed meanwhile is written by the writer's next cycle
 
 # -------------------------
-# Flush small batches to disk (append)
+# Stats snapshot
 # -------------------------
-def _flush_to_disk():
-    global _write_buffer
-    with _buffer_lock:
-        if not _write_buffer:
+def _save_stats_snapshot(force=False):
+    """Write committed class counts + last committed id (every _STATS_INTERVAL s)."""
+    global _snapshot_at, _snapshot_id
+    now = time.time()
+    if not force and now - _snapshot_at < _STATS_INTERVAL:
+        return
+    with _events_lock:
+        if _persisted_id == _snapshot_id and not force:
             return
-        batch = _write_buffer[:_FLUSH_BATCH]
-        _write_buffer = _write_buffer[len(batch):]
-
-    # group by model for efficient writes
-    groups = {}
-    for row in batch:
-        m = row.get("model", "bcc")
-        groups.setdefault(m, []).append(row)
-
-    for model, rows in groups.items():
-        fname = _file_for_model(model)
-        try:
-            file_empty = not os.path.exists(fname) or os.stat(fname).st_size == 0
-            with open(fname, "a", newline="", encoding="utf-8") as f:
-                writer = csv.DictWriter(f, fieldnames=_headers)
-                if file_empty:
-                    writer.writeheader()
-                for r in rows:
-                    # write only header keys (ignore extra)
-                    writer.writerow({k: r.get(k, "") for k in _headers})
-        except Exception as e:
-            print("[logger] Append write error for", model, ":", e)
+        snap = {
+            "instance": _store_instance,
+            "last_id": _persisted_id,
+            "saved": now,
+            "models": {m: dict(c) for m, c in _persisted_stats.items()},
+        }
+    try:
+        tmp = STATS_SNAPSHOT + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(snap, f)
+        os.replace(tmp, STATS_SNAPSHOT)
+    except OSError as e:
+        print("[logger] Could not save stats snapshot:", e)
+        return
+    _snapshot_at, _snapshot_id = now, snap["last_id"]
+
+def _load_stats():
+    """Class counts per model: snapshot + rows committed after it (full GROUP BY without one)."""
+    snap = None
+    try:
+        with open(STATS_SNAPSHOT, "r", encoding="utf-8") as f:
+            snap = json.load(f)
+    except (OSError, ValueError):
+        pass
+    top = event_store.max_id()
+    if not snap or snap.get("instance") != _store_instance or snap.get("last_id", 0) > top:
+        snap = {"last_id": 0, "models": {}}
+    after = snap["last_id"]
+    stats = {}
+    for model in ("bcc", "cicids"):
+        counts = dict(snap["models"].get(model, {}))
+        for pred, n in event_store.class_counts(model, after_id=after or None).items():
+            counts[pred] = counts.get(pred, 0) + n
+        stats[model] = counts
+    return stats, top
+
+def _forget_counts(model, removed):
+    """Take deleted rows ({prediction: n}) out of the live and committed counts."""
+    with _events_lock:
+        for counts in (_model_stats.setdefault(model, {}), _persisted_stats.setdefault(model, {})):
+            for pred, n in removed.items():
+                left = counts.get(pred, 0) - n
+                if left > 0:
+                    counts[pred] = left
+                else:
+                    counts.pop(pred, None)
+    if removed:
+        _save_stats_snapshot(force=True)
+        alert_index.reload(model)
 
 # -------------------------
 # Background writer thread
 # -------------------------
 def _writer_thread():
     while not _stop_writer.is_set():
-        time.sleep(_FLUSH_INTERVAL)
+        with _buffer_cond:
+            _buffer_cond.wait_for(lambda: len(_write_buffer) >= _GROUP_ROWS or _stop_writer.is_set(),
+                                  timeout=_FLUSH_INTERVAL)
         _flush_to_disk()
+        _save_stats_snapshot()
+        event_rollups.save()
+        try:
+            event_segments.maybe_rotate()
+        except Exception as e:
+            print("[logger] Segment rotation failed:", e)
     # flush remaining on shutdown
-    _flush_to_disk()
-
-_writer_thr = threading.Thread(target=_writer_thread, daemon=True)
-_writer_thr.start()
+    _flush_all()
+    _save_stats_snapshot(force=True)
+    event_rollups.save(force=True)
+
+def writer_stats():
+    """Queue depth, commit sizes/latency and per-model drop counts of the writer."""
+    with _buffer_cond:
+        pending = len(_write_buffer)
+    out = dict(_writer_stats, dropped=dict(_writer_stats["dropped"]))
+    out.update(pending=pending, max_pending=_MAX_PENDING, overflow=_OVERFLOW,
+               flush_interval=_FLUSH_INTERVAL, group_rows=_GROUP_ROWS, synchronous=_SYNC)
+    return out
+
+
+_writer_thr = None
+_writer_start_lock = threading.Lock()
+
+def _ensure_writer():
+    """Start the background writer on the first push (not at import)."""
+    global _writer_thr
+    if _writer_thr is not None:
+        return
+    with _writer_start_lock:
+        if _writer_thr is None:
+            _writer_thr = threading.Thread(target=_writer_thread, daemon=True)
+            _writer_thr.start()
 
 # -------------------------
-# Load existing CSVs into _model_events on startup (keep last _MAX_RECENT)
+# Load the newest events per model on startup (keep last _MAX_RECENT)
 # -------------------------
 def _load_recent_model(model):
-    fname = _file_for_model(model)
-    if not os.path.exists(fname):
-        return []
     try:
-        with open(fname, "r", encoding="utf-8") as f:
-            reader = list(csv.DictReader(f))
-            return reader[-_MAX_RECENT:]
-    except Exception:
+        return event_store.recent(model, _MAX_RECENT)
+    except Exception as e:
+        print(f"[logger] Could not load recent {model} events:", e)
         return []
 
 def _load_all_recent():
-    global _model_events
+    global _model_events, _next_id, _persisted_id, _store_instance
+    _init_store()
+    _store_instance = event_store.instance_id()
+    try:
+        stats, top = _load_stats()
+    except Exception as e:
+        print("[logger] Could not load class counts:", e)
+        stats, top = {}, event_store.max_id()
     with _events_lock:
         _model_events["bcc"] = _load_recent_model("bcc")
         _model_events["cicids"] = _load_recent_model("cicids")
-
-_load_all_recent()
+        _next_id = max(_next_id, top)
+        _persisted_id = top
+        for model, counts in stats.items():
+            _persisted_stats[model] = dict(counts)
+            # pushes that raced the load are already in _model_stats
+            live = _model_stats.setdefault(model, {})
+            for pred, n in counts.items():
+                live[pred] = live.get(pred, 0) + n
+    _save_stats_snapshot(force=True)
+    try:
+        event_rollups.load()
+    except Exception as e:
+        print("[logger] Could not load rollups:", e)
+    for model in ("bcc", "cicids"):
+        try:
+            alert_index.reload(model)
+        except Exception as e:
+            print(f"[logger] Could not load {model} alerts:", e)
+
+# The event store is opened on first access instead of at import time
+_store_instance = None
+_loaded = False
+_load_lock = threading.Lock()
+
+def _ensure_loaded():
+    global _loaded
+    if _loaded:
+        return
+    with _load_lock:
+        if not _loaded:
+            _load_all_recent()
+            _loaded = True
 
 # ===============================
 # Public API: push_event
@@ -157,53 +327,132 @@ def push_event(evt):
     Uses current active model to store event.
     Also enqueues to write buffer for background flush.
     """
-    global _write_buffer
+    _ensure_loaded()
+    _ensure_writer()
 
     # attach model at time of push
     with _active_model_lock:
         model = _active_model
 
+    global _next_id
     e = dict(evt)
     e.setdefault("time", datetime.now().strftime("%H:%M:%S"))
+    e.setdefault("ts", time.time())
     e.setdefault("risk_level", "Low")
     e.setdefault("risk_score", 0)
 
-    # add to in-memory buffer for model
-    with _events_lock:
-        _model_events.setdefault(model, [])
-        _model_events[model].append(e)
-        if len(_model_events[model]) > _MAX_RECENT:
-            _model_events[model] = _model_events[model][-_MAX_RECENT:]
-
-        # update stats
-        pred = str(e.get("prediction", "Unknown"))
-        _model_stats.setdefault(model, {})
-        _model_stats[model][pred] = _model_stats[model].get(pred, 0) + 1
-
-    # add to write buffer with model tag for background writer
-    item = dict(e)
-    item["model"] = model
-    with _buffer_lock:
-        _write_buffer.append(item)
-        # if buffer grows big, flush asynchronously
-        if len(_write_buffer) > (_FLUSH_BATCH * 4):
-            threading.Thread(target=_flush_to_disk, daemon=True).start()
+    # The id is assigned in the same critical section that queues the row,
+    # so rows reach the writer (and the store) in id order: a segment
+    # closed at the store's MAX(id) never skips a row still in flight.
+    with _buffer_cond:
+        if len(_write_buffer) >= _MAX_PENDING and _OVERFLOW == "block":
+            _writer_stats["blocked"] += 1
+            _buffer_cond.notify_all()
+            _buffer_cond.wait_for(lambda: len(_write_buffer) < _MAX_PENDING, timeout=_BLOCK_MS / 1000.0)
+
+        # add to in-memory buffer for model
+        with _events_lock:
+            _next_id += 1
+            e["id"] = _next_id
+            _model_events.setdefault(model, [])
+            _model_events[model].append(e)
+            if len(_model_events[model]) > _MAX_RECENT:
+                _model_events[model] = _model_events[model][-_MAX_RECENT:]
+
+            # update stats
+            pred = str(e.get("prediction", "Unknown"))
+            _model_stats.setdefault(model, {})
+            _model_stats[model][pred] = _model_stats[model].get(pred, 0) + 1
+
+            # indexed under the id lock so alert ids reach the index in order
+            alert_index.add(model, e)
+
+        # add to write buffer with model tag for background writer
+        if len(_write_buffer) >= _MAX_PENDING:
+            # still full: the event stays in the live window but is not persisted
+            _writer_stats["dropped"][model] = _writer_stats["dropped"].get(model, 0) + 1
+        else:
+            item = dict(e)
+            item["model"] = model
+            _write_buffer.append(item)
+            _writer_stats["peak_pending"] = max(_writer_stats["peak_pending"], len(_write_buffer))
+            if len(_write_buffer) >= _GROUP_ROWS:
+                _buffer_cond.notify_all()
+
+    # live traffic counters (protocols, ports, IPs, per-second rates)
+    event_counters.record(model, e)
+    event_rollups.record(model, e.get("prediction", "Unknown"), e["ts"])
+    heavy_hitters.observe(e)
+    # distinct-destination sketches; may push a scan event of its own,
+    # which is queued after this one
+    scan_detector.observe(e)
 
 # ===============================
 # Public API: get recent & stats
 # ===============================
 def get_recent_events(model="bcc", n=None):
+    _ensure_loaded()
     with _events_lock:
         data = list(_model_events.get(model, []))
     if n:
         return data[-n:]
     return data
 
+def query_events(model=None, start=None, end=None, ip=None, src_ip=None, dst_ip=None,
+                 prediction=None, offset=0, limit=100, newest_first=True):
+    """
+    Historical events from the store as (rows, total). `start`/`end` are epoch
+    seconds or ISO strings; events still waiting for the writer are flushed first.
+    """
+    _ensure_loaded()
+    _flush_all()
+    return event_store.query_events(
+        offset=offset, limit=limit, newest_first=newest_first, model=model,
+        start=event_store.parse_time(start), end=event_store.parse_time(end),
+        ip=ip, src_ip=src_ip, dst_ip=dst_ip, prediction=prediction)
+
+def export_csv(model="bcc", start=None, end=None):
+    """CSV text chunks for a model / time range (streamed by /api/logs/download)."""
+    _ensure_loaded()
+    _flush_all()
+    return event_segments.iter_export(model, event_store.parse_time(start), event_store.parse_time(end))
+
+def list_segments(model=None):
+    _ensure_loaded()
+    return event_segments.segments(model)
+
 def get_model_stats(model="bcc"):
+    _ensure_loaded()
     with _events_lock:
         # return a shallow copy to avoid external mutation
         return dict(_model_stats.get(model, {}))
 
+def get_counters(model="bcc", top=10):
+    """Live counter snapshot (totals + top N per dimension) since startup."""
+    return event_counters.snapshot(model, top)
+
+def get_counts(model, dim, top=None):
+    return event_counters.counts(model, dim, top)
+
+def get_timeline(model="bcc", seconds=60):
+    """Per-second events/bytes/alerts for the last `seconds`."""
+    return event_counters.timeline(model, seconds)
+
+def get_series(model="bcc", start=None, end=None, resolution=None):
+    """Per-class rollup buckets over [start, end): (resolution, points)."""
+    _ensure_loaded()
+    return event_rollups.series(model, event_store.parse_time(start), event_store.parse_time(end), resolution)
+
+def get_totals(model="bcc", start=None, end=None):
+    """{class: count} over [start, end) from the rollups."""
+    _ensure_loaded()
+    return event_rollups.totals(model, event_store.parse_time(start), event_store.parse_time(end))
+
+def get_alerts(model="bcc", since=None, limit=150):
+    """Indexed alerts page ({"alerts", "cursor", "more", "total", "gap"}); see utils.alert_index.since."""
+    _ensure_loaded()
+    return alert_index.since(model, since, limit)
+
 # -------------------------
 # Convenience: summary across active model (legacy)
 # -------------------------
@@ -232,45 +481,41 @@ def get_active_model():
 # CLEAR / DELETE (model-wise)
 # ===============================
 def clear_last_events(model="bcc", n=99999):
+    _ensure_loaded()
     with _events_lock:
         ev = _model_events.get(model, [])
         if n >= len(ev):
             _model_events[model] = []
         else:
             _model_events[model] = ev[:-n]
-        # reset stats for this model
-        _model_stats[model] = {}
-    # rewrite model CSV fully
-    _flush_full_overwrite_model(model)
+    # delete the same newest rows from the store
+    _flush_all()
+    _forget_counts(model, event_store.delete_events(model, last=n))
     return True
 
 def delete_by_index(model="bcc", idx=0):
+    _ensure_loaded()
     with _events_lock:
         ev = _model_events.get(model, [])
         if 0 <= idx < len(ev):
-            ev.pop(idx)
+            removed = ev.pop(idx)
             _model_events[model] = ev
-            # recompute stats (simple recompute)
-            _model_stats[model] = {}
-            for e in ev:
-                pred = str(e.get("prediction", "Unknown"))
-                _model_stats[model][pred] = _model_stats[model].get(pred, 0) + 1
-            _flush_full_overwrite_model(model)
-            return True
-    return False
+        else:
+            return False
+    if removed.get("id") is not None:
+        _flush_all()
+        _forget_counts(model, event_store.delete_events(model, ids=[removed["id"]]))
+    return True
 
 def delete_by_prediction(model="bcc", pred=None):
     if pred is None:
         return False
+    _ensure_loaded()
     with _events_lock:
         ev = _model_events.get(model, [])
         _model_events[model] = [e for e in ev if e.get("prediction") != pred]
-        # recompute stats
-        _model_stats[model] = {}
-        for e in _model_events[model]:
-            p = str(e.get("prediction", "Unknown"))
-            _model_stats[model][p] = _model_stats[model].get(p, 0) + 1
-    _flush_full_overwrite_model(model)
+    _flush_all()
+    _forget_counts(model, event_store.delete_events(model, prediction=pred))
     return True
 
 # ===============================
@@ -278,5 +523,8 @@ def delete_by_prediction(model="bcc", pred=None):
 # ===============================
 def shutdown_logger():
     _stop_writer.set()
-    _writer_thr.join(timeout=3)
+    with _buffer_cond:
+        _buffer_cond.notify_all()
+    if _writer_thr is not None:
+        _writer_thr.join(timeout=3)
 
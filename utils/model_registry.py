@@ -0,0 +1,330 @@
+# utils/model_registry.py
+# -------------------------------------------------------------
+# Offline-first local model registry for ml_models/
+# - manifest.json records version, sha256, size and mtime per file
+# - startup verification trusts (size, mtime_ns) and only re-hashes
+#   files whose stat signature changed since they were recorded
+# - new versions are installed atomically (temp file + os.replace);
+#   on_install listeners drop whatever was loaded from the old file
+# - remote fetching is an explicit prefetch step, never a side effect
+#   of serving:  python -m utils.model_registry prefetch
+# -------------------------------------------------------------
+import os
+import sys
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from datetime import datetime
+
+HF_REPO_ID = "CodebaseAi/netraids-ml-models"
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ML_DIR = os.path.join(BASE_DIR, "ml_models")
+MANIFEST_FILE = os.path.join(ML_DIR, "manifest.json")
+
+# Files each model bundle is built from (model_selector.load_model)
+MODEL_FILES = {
+    "bcc": {
+        "model": "realtime_model.pkl",
+        "scaler": "realtime_scaler.pkl",
+        "encoder": "realtime_encoder.pkl",
+    },
+    "cicids": {
+        "model": "rf_pipeline.joblib",
+        "artifacts": "training_artifacts.joblib",
+    },
+}
+
+_HASH_CHUNK = 1024 * 1024
+_MAX_HISTORY = 5
+
+_manifest_lock = threading.Lock()
+_manifest = None
+_install_listeners = []
+
+
+def all_model_files():
+    """Every file referenced by MODEL_FILES, in a stable order."""
+    out = []
+    for parts in MODEL_FILES.values():
+        for fname in parts.values():
+            if fname not in out:
+                out.append(fname)
+    return out
+
+
+# -------------------------
+# Manifest IO
+# -------------------------
+def _empty_manifest():
+    return {"format": 1, "models": {}}
+
+
+def _read_manifest():
+    if not os.path.exists(MANIFEST_FILE):
+        return _empty_manifest()
+    try:
+        with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or not isinstance(data.get("models"), dict):
+            raise ValueError("malformed manifest")
+        return data
+    except Exception as e:
+        print(f"[model_registry] WARNING: ignoring unreadable manifest: {e}")
+        return _empty_manifest()
+
+
+def _write_manifest(data):
+    """Atomically replace manifest.json (caller holds _manifest_lock)."""
+    os.makedirs(ML_DIR, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".manifest-", suffix=".tmp", dir=ML_DIR)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, MANIFEST_FILE)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def _get_manifest():
+    global _manifest
+    if _manifest is None:
+        _manifest = _read_manifest()
+    return _manifest
+
+
+def get_manifest():
+    """Return a deep copy of the current manifest."""
+    with _manifest_lock:
+        return json.loads(json.dumps(_get_manifest()))
+
+
+def get_entry(filename):
+    with _manifest_lock:
+        entry = _get_manifest()["models"].get(filename)
+        return dict(entry) if entry else None
+
+
+def get_version(filename):
+    entry = get_entry(filename)
+    return entry.get("version") if entry else None
+
+
+# -------------------------
+# Hashing / stat helpers
+# -------------------------
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(_HASH_CHUNK)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _stat_signature(path):
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def _record(filename, path, sha256, version, source):
+    size, mtime_ns = _stat_signature(path)
+    return {
+        "version": version,
+        "sha256": sha256,
+        "size": size,
+        "mtime_ns": mtime_ns,
+        "source": source,
+        "installed_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+# -------------------------
+# Verification
+# -------------------------
+def verify(filename):
+    """
+    Return the local path for `filename` if it is present and intact, else None.
+
+    Files whose (size, mtime_ns) still match the manifest are trusted without
+    hashing. Changed files are re-hashed once; a checksum mismatch is refused.
+    Untracked local files are adopted into the manifest with version "local".
+    """
+    path = os.path.join(ML_DIR, filename)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        size, mtime_ns = _stat_signature(path)
+    except OSError:
+        return None
+
+    with _manifest_lock:
+        entry = _get_manifest()["models"].get(filename)
+        if entry and entry.get("size") == size and entry.get("mtime_ns") == mtime_ns:
+            return path
+
+    # hash outside the lock (and off the event loop): artifacts run to
+    # hundreds of MB
+    from utils.offline_jobs import run_blocking
+    digest = run_blocking(file_sha256, path)
+    try:
+        if _stat_signature(path) != (size, mtime_ns):
+            print(f"[model_registry] {filename} changed while being verified; not trusting it")
+            return None
+    except OSError:
+        return None
+
+    with _manifest_lock:
+        manifest = _get_manifest()
+        entry = manifest["models"].get(filename)
+        if entry is None:
+            manifest["models"][filename] = _record(filename, path, digest, "local", "adopted")
+            print(f"[model_registry] Adopted untracked {filename} ({size} bytes)")
+        elif entry.get("sha256") != digest:
+            print(f"[model_registry] ERROR: checksum mismatch for {filename}; refusing to load")
+            return None
+        elif entry.get("size") == size and entry.get("mtime_ns") == mtime_ns:
+            return path     # recorded by a concurrent verify/install meanwhile
+        else:
+            # content unchanged (e.g. touched/copied); refresh stat signature
+            entry["size"] = size
+            entry["mtime_ns"] = mtime_ns
+        _write_manifest(manifest)
+    return path
+
+
+def verify_all(filenames=None):
+    """Verify every known model file. Returns {filename: "ok"|"missing"|"corrupt"}."""
+    status = {}
+    for fname in filenames or all_model_files():
+        if not os.path.exists(os.path.join(ML_DIR, fname)):
+            status[fname] = "missing"
+        else:
+            status[fname] = "ok" if verify(fname) else "corrupt"
+    return status
+
+
+# -------------------------
+# Atomic install
+# -------------------------
+def install(filename, src_path, version=None, expected_sha256=None, source="manual"):
+    """
+    Atomically install `src_path` as ml_models/<filename> and record it.
+
+    The file is copied to a temp file in ML_DIR, fsynced, checked against
+    `expected_sha256` (if given) and moved into place with os.replace, so
+    readers never observe a partially written model.
+    """
+    os.makedirs(ML_DIR, exist_ok=True)
+    dest = os.path.join(ML_DIR, filename)
+    fd, tmp = tempfile.mkstemp(prefix=f".{filename}-", suffix=".tmp", dir=ML_DIR)
+    h = hashlib.sha256()
+    try:
+        with os.fdopen(fd, "wb") as out, open(src_path, "rb") as src:
+            while True:
+                chunk = src.read(_HASH_CHUNK)
+                if not chunk:
+                    break
+                h.update(chunk)
+                out.write(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+        digest = h.hexdigest()
+        if expected_sha256 and digest != expected_sha256:
+            raise ValueError(f"checksum mismatch for {filename}: {digest} != {expected_sha256}")
+        os.replace(tmp, dest)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+    version = version or digest[:12]
+    with _manifest_lock:
+        manifest = _get_manifest()
+        previous = manifest["models"].get(filename)
+        entry = _record(filename, dest, digest, version, source)
+        if previous:
+            history = previous.pop("history", [])
+            history.insert(0, {k: previous.get(k) for k in ("version", "sha256", "installed_at")})
+            entry["history"] = history[:_MAX_HISTORY]
+        manifest["models"][filename] = entry
+        _write_manifest(manifest)
+
+    print(f"[model_registry] Installed {filename} version={version}")
+    for fn in list(_install_listeners):
+        try:
+            fn(filename)
+        except Exception as e:
+            print(f"[model_registry] install listener failed: {e}")
+    return dest
+
+
+def on_install(fn):
+    """Register fn(filename), called after a new file version is installed."""
+    _install_listeners.append(fn)
+    return fn
+
+
+# -------------------------
+# Explicit remote prefetch (opt-in)
+# -------------------------
+def prefetch(filenames=None, repo_id=HF_REPO_ID, revision=None, force=False):
+    """
+    Download model files from the Hugging Face Hub and install them locally.
+
+    This is the only code path that touches the network. Files already present
+    and verified are skipped unless `force` is set.
+    """
+    from huggingface_hub import hf_hub_download
+
+    results = {}
+    staging = tempfile.mkdtemp(prefix=".staging-", dir=ML_DIR if os.path.isdir(ML_DIR) else None)
+    try:
+        for fname in filenames or all_model_files():
+            if not force and verify(fname):
+                results[fname] = "present"
+                continue
+            try:
+                print(f"[model_registry] Fetching {fname} from {repo_id}...")
+                downloaded = hf_hub_download(
+                    repo_id=repo_id,
+                    filename=fname,
+                    revision=revision,
+                    local_dir=staging,
+                )
+                install(fname, downloaded, version=revision, source=f"hf:{repo_id}")
+                results[fname] = "installed"
+            except Exception as e:
+                print(f"[model_registry] ERROR: prefetch of {fname} failed: {e}")
+                results[fname] = f"error: {e}"
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return results
+
+
+def _main(argv):
+    cmd = argv[0] if argv else "verify"
+    if cmd == "prefetch":
+        res = prefetch(argv[1:] or None, force=os.environ.get("NIDS_PREFETCH_FORCE") == "1")
+    elif cmd == "verify":
+        res = verify_all(argv[1:] or None)
+    elif cmd == "list":
+        res = get_manifest()
+    else:
+        print("usage: python -m utils.model_registry [prefetch|verify|list] [files...]")
+        return 2
+    print(json.dumps(res, indent=2))
+    return 0 if all(not str(v).startswith(("error", "corrupt")) for v in res.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(_main(sys.argv[1:]))
@@ -1,52 +1,70 @@
 import os
-import joblib
 import threading
 import traceback
-from huggingface_hub import hf_hub_download
-import sklearn.utils
+import numpy as np
+from utils import model_registry
 
 
 # --- CONFIGURATION ---
-HF_REPO_ID = "CodebaseAi/netraids-ml-models"  # Replace with your actual public repo ID
+# Remote downloads live in utils/model_registry.prefetch (explicit opt-in)
+HF_REPO_ID = model_registry.HF_REPO_ID
 # ---------------------
 
+# Column order the realtime (BCC) model was fitted on
+BCC_FEATURES = [
+    "protocol", "src_port", "dst_port", "duration", "packets_count",
+    "fwd_packets_count", "bwd_packets_count", "total_payload_bytes",
+    "total_header_bytes", "bytes_rate", "packets_rate",
+    "syn_flag_counts", "ack_flag_counts", "rst_flag_counts", "fin_flag_counts",
+]
+
 ACTIVE_MODEL = "bcc"
 _ACTIVE_LOCK = threading.Lock()
 _MODEL_CACHE = {}
+_LOAD_LOCK = threading.Lock()
+_PATCH_LOCK = threading.Lock()
+_PATCHED = False
 
 
 # --- THE "BULLETPROOF" SKLEARN PATCH ---
-# We must do this BEFORE any other ML imports
-import sklearn.utils
-try:
-    import sklearn.utils._column_transformer as ct_utils
-    sklearn.utils._get_column_indices = ct_utils._get_column_indices
-    print("[Patch] Successfully injected _get_column_indices")
-except Exception as e:
-    # If the above fails, we define a dummy function to stop the crash
-    def _get_column_indices(X, key):
-        from sklearn.utils._column_transformer import _get_column_indices as gci
-        return gci(X, key)
-    sklearn.utils._get_column_indices = _get_column_indices
-    print(f"[Patch] Manual injection fallback used: {e}")
-
-# Patch for parse_version
-if not hasattr(sklearn.utils, 'parse_version'):
-    try:
-        from packaging import version
-        sklearn.utils.parse_version = version.parse
-        print("[Patch] Successfully injected parse_version")
-    except ImportError:
-        print("[Patch] 'packaging' library missing. Ensure it is in requirements.txt")
+# Must run BEFORE any pickled model is unpickled. Importing sklearn costs
+# over a second, so it is applied on the first load instead of at import.
+def apply_sklearn_patch():
+    global _PATCHED
+    with _PATCH_LOCK:
+        if _PATCHED:
+            return
+        _PATCHED = True
+
+        import sklearn.utils
+        try:
+            import sklearn.utils._column_transformer as ct_utils
+            sklearn.utils._get_column_indices = ct_utils._get_column_indices
+            print("[Patch] Successfully injected _get_column_indices")
+        except Exception as e:
+            # If the above fails, we define a dummy function to stop the crash
+            def _get_column_indices(X, key):
+                from sklearn.utils._column_transformer import _get_column_indices as gci
+                return gci(X, key)
+            sklearn.utils._get_column_indices = _get_column_indices
+            print(f"[Patch] Manual injection fallback used: {e}")
+
+        # Patch for parse_version
+        if not hasattr(sklearn.utils, 'parse_version'):
+            try:
+                from packaging import version
+                sklearn.utils.parse_version = version.parse
+                print("[Patch] Successfully injected parse_version")
+            except ImportError:
+                print("[Patch] 'packaging' library missing. Ensure it is in requirements.txt")
 # ---------------------------------------
-# --------------------------------------------
 
 # 1. FIXED PATH LOGIC:
 # __file__ is /app/utils/model_selector.py
 # dirname(__file__) is /app/utils
 # dirname(dirname(...)) is /app (the ROOT)
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-ML_DIR = os.path.join(BASE_DIR, "ml_models")
+BASE_DIR = model_registry.BASE_DIR
+ML_DIR = model_registry.ML_DIR
 
 # Ensure the local ml_models directory exists for caching
 if not os.path.exists(ML_DIR):
@@ -57,28 +75,15 @@ print(f"[model_selector] ML_DIR: {ML_DIR}")
 
 def _get_model_path(filename):
     """
-    First looks in the local 'ml_models' folder. 
-    If not found, downloads from the public Hugging Face Hub.
+    Resolve a model file from the local registry in 'ml_models'.
+    Never touches the network: missing files must be fetched beforehand with
+    `python -m utils.model_registry prefetch`.
     """
-    local_path = os.path.join(ML_DIR, filename)
-    
-    # 1. Check if the file is already there
-    if os.path.exists(local_path):
-        return local_path
-    
-    # 2. Download from Hub if missing
-    try:
-        print(f"[model_selector] {filename} not found locally. Downloading from Hub...")
-        # We specify local_dir to force it into our ml_models folder
-        downloaded_path = hf_hub_download(
-            repo_id=HF_REPO_ID, 
-            filename=filename,
-            local_dir=ML_DIR
-        )
-        return downloaded_path
-    except Exception as e:
-        print(f"[model_selector] ERROR: Could not find/download {filename}: {e}")
-        return None
+    path = model_registry.verify(filename)
+    if path is None:
+        print(f"[model_selector] {filename} not available locally. "
+              f"Run `python -m utils.model_registry prefetch` to install it.")
+    return path
 
 def _try_load(filename):
     path = _get_model_path(filename)
@@ -91,34 +96,188 @@ def _try_load(filename):
             print(f"[model_selector] ERROR: {filename} is an empty file.")
             return None
             
+        from utils.offline_jobs import run_blocking
         print(f"[model_selector] Attempting joblib.load for {filename}")
-        return joblib.load(path)
+        # sklearn import + unpickling take seconds: keep them off the event loop
+        return run_blocking(_joblib_load, path)
     except Exception as e:
         print(f"[model_selector] CRITICAL FAILED to load {filename}")
         print(traceback.format_exc()) # This will show exactly why in HF logs
         return None
 
+def _joblib_load(path):
+    apply_sklearn_patch()
+    import joblib
+    return joblib.load(path)
+
+class PreparedModel(dict):
+    """
+    Inference bundle returned by load_model().
+
+    Still a dict of the raw parts ({"model", "scaler", "encoder"} or
+    {"model", "artifacts"}) for older callers, but feature order, scaler,
+    encoder and the class -> label lookup are resolved once here so every
+    prediction path shares one vectorized fast path.
+    """
+
+    def __init__(self, key, parts):
+        super().__init__(parts)
+        artifacts = parts.get("artifacts") or {}
+        self.key = key
+        self.identity = None
+        self.model = parts.get("model")
+        self.artifacts = artifacts
+        self.scaler = parts.get("scaler") or artifacts.get("scaler") or artifacts.get("scaler_object")
+        self.encoder = parts.get("encoder") or artifacts.get("label_encoder")
+
+        label_map = artifacts.get("label_map")
+        self._inv_label_map = {v: k for k, v in label_map.items()} if label_map else None
+
+        if key == "bcc":
+            self.features = list(BCC_FEATURES)
+        else:
+            self.features = list(
+                artifacts.get("features") or artifacts.get("features_used") or artifacts.get("feature_list") or []
+            )
+
+        # scaler fitted on a DataFrame -> keep its column names to avoid warnings;
+        # they must be the model's features (X arrives in `features` order and
+        # is permuted into the scaler's order)
+        self.load_error = None
+        self.scaler_fallbacks = 0
+        names = getattr(self.scaler, "feature_names_in_", None)
+        self._scaler_columns = list(names) if names is not None else None
+        self._scaler_order = None
+        if self._scaler_columns is not None and self.features:
+            if sorted(self._scaler_columns) != sorted(self.features):
+                self.load_error = (f"scaler columns {self._scaler_columns} do not match "
+                                   f"{key} features {self.features}")
+                print(f"[model_selector] ERROR: {self.load_error}; refusing to load")
+                self.model = None
+            elif self._scaler_columns != self.features:
+                self._scaler_order = [self.features.index(c) for c in self._scaler_columns]
+
+        self.classes = None
+        self.class_labels = None
+        self.has_proba = False
+        if self.model is not None and hasattr(self.model, "classes_"):
+            self.classes = np.asarray(self.model.classes_)
+            self.class_labels = np.array([self._decode_one(c) for c in self.classes], dtype=object)
+            self.has_proba = hasattr(self.model, "predict_proba")
+
+    @property
+    def ready(self):
+        return self.model is not None
+
+    def label_classes(self):
+        """Human-readable class names (encoder classes first, then model classes)."""
+        if self.encoder is not None and hasattr(self.encoder, "classes_"):
+            return [str(c) for c in self.encoder.classes_]
+        if self.classes is not None:
+            return [str(c) for c in self.classes]
+        return None
+
+    def _decode_one(self, raw):
+        try:
+            if self._inv_label_map is not None:
+                return str(self._inv_label_map.get(int(raw), raw))
+            if self.encoder is not None:
+                return str(self.encoder.inverse_transform([int(raw)])[0])
+        except Exception:
+            pass
+        return str(raw)
+
+    def decode(self, raw):
+        """Vectorized raw prediction -> label strings."""
+        raw = np.asarray(raw)
+        if self.classes is not None:
+            pos = {c: i for i, c in enumerate(self.classes.tolist())}
+            idx = [pos.get(r) for r in raw.tolist()]
+            if all(i is not None for i in idx):
+                return self.class_labels[np.asarray(idx, dtype=int)]
+        return np.array([self._decode_one(r) for r in raw.tolist()], dtype=object)
+
+    def transform(self, X, strict=True):
+        """
+        Apply the scaler. A failing scaler raises; with strict=False the raw
+        X is returned instead and the fallback is counted (scaler_fallbacks)
+        and logged once.
+        """
+        X = np.asarray(X, dtype=float)
+        if self.scaler is None:
+            return X
+        try:
+            if self._scaler_columns is not None and len(self._scaler_columns) == X.shape[1]:
+                import pandas as pd
+                Xo = X[:, self._scaler_order] if self._scaler_order is not None else X
+                return self.scaler.transform(pd.DataFrame(Xo, columns=self._scaler_columns))
+            return self.scaler.transform(X)
+        except Exception as e:
+            if strict:
+                raise
+            self.scaler_fallbacks += 1
+            if self.scaler_fallbacks == 1:
+                print(f"[model_selector] {self.key} scaler transform failed, scoring unscaled input: {e}")
+            return X
+
+    def predict_raw(self, Xs):
+        """Scaled matrix -> (raw predictions, probabilities or None), one model call."""
+        if self.has_proba:
+            probs = self.model.predict_proba(Xs)
+            return self.classes[np.argmax(probs, axis=1)], probs
+        return np.asarray(self.model.predict(Xs)), None
+
+    def predict_labels_with_confidence(self, X, strict=True):
+        """
+        Fused fast path: scale, predict_proba once, argmax, and look up the
+        precomputed label array. Returns (labels, confidence-or-None), both
+        numpy arrays of len(X); confidence is in [0, 1]. A scaler failure
+        raises unless strict=False (see transform).
+        """
+        Xs = self.transform(X, strict)
+        if self.has_proba:
+            probs = self.model.predict_proba(Xs)
+            idx = np.argmax(probs, axis=1)
+            return self.class_labels[idx], probs[np.arange(len(idx)), idx]
+        return self.decode(self.model.predict(Xs)), None
+
+
 def load_model(model_key):
-    if model_key in _MODEL_CACHE:
+    cached = _MODEL_CACHE.get(model_key)
+    if cached is not None:
+        return cached
+
+    files = model_registry.MODEL_FILES.get(model_key)
+    if files is None:
+        raise ValueError(f"Unknown model_key: {model_key}")
+
+    with _LOAD_LOCK:
+        if model_key not in _MODEL_CACHE:
+            parts = {part: _try_load(fname) for part, fname in files.items()}
+            bundle = PreparedModel(model_key, parts)
+            bundle.identity = _bundle_identity(files.values())
+            _MODEL_CACHE[model_key] = bundle
         return _MODEL_CACHE[model_key]
 
-    if model_key == "bcc":
-        _MODEL_CACHE["bcc"] = {
-            "model": _try_load("realtime_model.pkl"),
-            "scaler": _try_load("realtime_scaler.pkl"),
-            "encoder": _try_load("realtime_encoder.pkl")
-        }
-        return _MODEL_CACHE["bcc"]
-
-    if model_key == "cicids":
-        # It will look for your RF files in the Hub
-        _MODEL_CACHE["cicids"] = {
-            "model": _try_load("rf_pipeline.joblib"),
-            "artifacts": _try_load("training_artifacts.joblib")
-        }
-        return _MODEL_CACHE["cicids"]
-
-    raise ValueError(f"Unknown model_key: {model_key}")
+def _bundle_identity(filenames):
+    digests = []
+    for fname in filenames:
+        entry = model_registry.get_entry(fname)
+        digests.append((entry or {}).get("sha256", "none")[:16])
+    return "+".join(digests)
+
+def model_identity(model_key):
+    """Checksums of the files the loaded `model_key` bundle was built from."""
+    return load_model(model_key).identity
+
+def _on_model_installed(filename):
+    with _LOAD_LOCK:
+        stale = [k for k, files in model_registry.MODEL_FILES.items()
+                 if filename in files.values() and _MODEL_CACHE.pop(k, None) is not None]
+    if stale:
+        print(f"[model_selector] {filename} reinstalled; reloading {', '.join(stale)} on next use")
+
+model_registry.on_install(_on_model_installed)
 
 def set_active_model(key: str):
     global ACTIVE_MODEL
@@ -0,0 +1,130 @@
+# utils/offline_cache.py
+# -------------------------------------------------------------
+# Result reuse for repeated offline uploads
+# - uploads are sha256-hashed while they stream in (utils.offline_upload)
+# - key = content hash + model + checksums of the loaded model files
+#   (+ scoring mode); offline jobs score with the form's model, so
+#   switching the live model does not touch the cache
+# - hits return the finished job (summary + stored results) directly
+# - LRU bounded by entry count and total results-file bytes; cached
+#   jobs are pinned in utils.offline_jobs until evicted
+# - installing a new model file drops the entries scored with it
+# -------------------------------------------------------------
+import os
+import threading
+from collections import OrderedDict
+
+from utils import offline_jobs
+
+MAX_ENTRIES = int(os.environ.get("NIDS_OFFLINE_CACHE_ENTRIES", 64))
+MAX_BYTES = int(os.environ.get("NIDS_OFFLINE_CACHE_BYTES", 2 * 1024 * 1024 * 1024))
+
+_ENTRIES = OrderedDict()   # key -> {"job_id", "bytes", "hits"}
+_LOCK = threading.Lock()
+_bytes = 0
+_stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+
+def cache_key(digest, model_type, mode):
+    from utils.model_selector import model_identity
+    models = ("bcc", "cicids") if model_type == "both" else (model_type,)
+    identity = "|".join(model_identity(m) for m in models)
+    return f"{digest}:{model_type}:{identity}:{mode}"
+
+
+def lookup(key):
+    """Finished job snapshot for `key`, or None (stale entries are dropped)."""
+    with _LOCK:
+        entry = _ENTRIES.get(key)
+        if entry is None:
+            _stats["misses"] += 1
+            return None
+    job = offline_jobs.get_job(entry["job_id"])
+    if job is None or job["status"] != offline_jobs.DONE or not offline_jobs.result_path(entry["job_id"]):
+        _drop(key)
+        with _LOCK:
+            _stats["misses"] += 1
+        return None
+    with _LOCK:
+        if key in _ENTRIES:
+            _ENTRIES.move_to_end(key)
+            entry["hits"] += 1
+        _stats["hits"] += 1
+    return job
+
+
+def store(key, job_id):
+    """Remember a finished job for `key` and evict LRU entries over the bounds."""
+    global _bytes
+    digest, model_type, _, mode = key.split(":")
+    if cache_key(digest, model_type, mode) != key:
+        # a model file was installed while the job ran
+        return
+    path = offline_jobs.result_path(job_id)
+    if not path:
+        return
+    size = os.path.getsize(path)
+    if size > MAX_BYTES:
+        return
+    evicted = []
+    with _LOCK:
+        old = _ENTRIES.pop(key, None)
+        if old:
+            _bytes -= old["bytes"]
+            evicted.append(old["job_id"])
+        _ENTRIES[key] = {"job_id": job_id, "bytes": size, "hits": 0}
+        _bytes += size
+        while len(_ENTRIES) > MAX_ENTRIES or _bytes > MAX_BYTES:
+            _, victim = _ENTRIES.popitem(last=False)
+            _bytes -= victim["bytes"]
+            evicted.append(victim["job_id"])
+            _stats["evictions"] += 1
+    offline_jobs.pin(job_id)
+    for jid in evicted:
+        offline_jobs.pin(jid, False)
+
+
+def _drop(key):
+    global _bytes
+    with _LOCK:
+        entry = _ENTRIES.pop(key, None)
+        if entry:
+            _bytes -= entry["bytes"]
+    if entry:
+        offline_jobs.pin(entry["job_id"], False)
+
+
+def invalidate(model_type=None):
+    """Drop cached results (all, or only those scored with `model_type`)."""
+    global _bytes
+    with _LOCK:
+        keys = [k for k in _ENTRIES if model_type is None or k.split(":")[1] in (model_type, "both")]
+        dropped = [_ENTRIES.pop(k) for k in keys]
+        _bytes -= sum(e["bytes"] for e in dropped)
+        _stats["invalidations"] += len(dropped)
+    for entry in dropped:
+        offline_jobs.pin(entry["job_id"], False)
+    if dropped:
+        print(f"[offline_cache] Invalidated {len(dropped)} cached result(s)")
+    return len(dropped)
+
+
+def stats():
+    with _LOCK:
+        return dict(_stats, entries=len(_ENTRIES), bytes=_bytes,
+                    max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES)
+
+
+def _on_model_installed(filename):
+    from utils import model_registry
+    for model_type, files in model_registry.MODEL_FILES.items():
+        if filename in files.values():
+            invalidate(model_type)
+
+
+def _register():
+    from utils import model_registry
+    model_registry.on_install(_on_model_installed)
+
+
+_register()
@@ -0,0 +1,261 @@
+# utils/offline_jobs.py
+# -------------------------------------------------------------
+# Background job queue for offline detection
+# - bounded worker pool; each job gets an id and its own directory
+#   (uploads/jobs/<id>/) holding the upload and its results file
+# - progress is recorded on the job and pushed over Socket.IO
+#   (event "offline_job") by a small pump, throttled per job
+# - finished jobs and their files expire after a TTL unless pinned
+#   (utils.offline_cache pins jobs it can still serve)
+# - CPU-bound in-process scoring runs in eventlet's OS thread pool so
+#   the server keeps answering requests while big jobs run
+# -------------------------------------------------------------
+import os
+import time
+import uuid
+import shutil
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+JOBS_DIR = os.path.join("uploads", "jobs")
+JOB_WORKERS = int(os.environ.get("NIDS_OFFLINE_JOB_WORKERS", 2))
+MAX_PENDING = int(os.environ.get("NIDS_OFFLINE_MAX_PENDING", 16))   # queued + running
+JOB_TTL = int(os.environ.get("NIDS_OFFLINE_JOB_TTL", 3600))         # seconds after finishing
+PROGRESS_INTERVAL = 1.0                                               # min seconds between pushes
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+_JOBS = {}
+_JOBS_LOCK = threading.Lock()
+_EXECUTOR = None
+_PUMP = None
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+def _get_executor():
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        _EXECUTOR = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="offline-job")
+    return _EXECUTOR
+
+
+def _green():
+    try:
+        from eventlet import patcher
+        return patcher.is_monkey_patched("thread")
+    except Exception:
+        return False
+
+
+def run_blocking(fn, *args):
+    """Run CPU-bound work off the event loop when eventlet is active."""
+    if _green():
+        from eventlet import tpool
+        return tpool.execute(fn, *args)
+    return fn(*args)
+
+
+# -------------------------
+# Job records
+# -------------------------
+def job_dir(job_id):
+    return os.path.join(JOBS_DIR, job_id)
+
+
+def _snapshot(job):
+    out = {k: v for k, v in job.items() if not k.startswith("_")}
+    if job["status"] != DONE:
+        out.pop("result", None)
+    return out
+
+
+def get_job(job_id, include_result=True):
+    _sweep()
+    with _JOBS_LOCK:
+        job = _JOBS.get(job_id)
+        if job is None:
+            return None
+        snap = _snapshot(job)
+    if not include_result:
+        snap.pop("result", None)
+    return snap
+
+
+def result_path(job_id):
+    """Path of a finished job's results file (parquet or csv.gz), or None."""
+    from utils.offline_results import RESULTS_NAME, result_file
+    with _JOBS_LOCK:
+        job = _JOBS.get(job_id)
+        if job is None or job["status"] != DONE:
+            return None
+    return result_file(os.path.join(job_dir(job_id), RESULTS_NAME))
+
+
+def new_job(meta=None):
+    """Reserve a job id and directory. Raises JobQueueFull when the queue is saturated."""
+    _sweep()
+    with _JOBS_LOCK:
+        pending = sum(1 for j in _JOBS.values() if j["status"] in (QUEUED, RUNNING))
+        if pending >= MAX_PENDING:
+            raise JobQueueFull(f"{pending} offline jobs pending; try again later")
+        job_id = uuid.uuid4().hex[:16]
+        os.makedirs(job_dir(job_id), exist_ok=True)
+        _JOBS[job_id] = {
+            "job_id": job_id,
+            "status": QUEUED,
+            "processed": 0,
+            "created": time.time(),
+            "started": None,
+            "finished": None,
+            "error": None,
+            "result": None,
+            "_pinned": False,
+            "_pushed": 0.0,
+            "_pushed_processed": -1,
+            **(meta or {}),
+        }
+    return job_id
+
+
+def discard(job_id):
+    """Forget a job that was never submitted (e.g. the upload was rejected)."""
+    with _JOBS_LOCK:
+        _JOBS.pop(job_id, None)
+    shutil.rmtree(job_dir(job_id), ignore_errors=True)
+
+
+def set_meta(job_id, **meta):
+    """Attach descriptive fields (model, filename, size...) to a job."""
+    _update(job_id, **{k: v for k, v in meta.items() if not k.startswith("_")})
+
+
+def pin(job_id, pinned=True):
+    """Pinned jobs are kept past JOB_TTL (e.g. while a result cache references them)."""
+    _update(job_id, _pinned=pinned)
+
+
+def submit(job_id, fn, on_done=None):
+    """
+    Run fn(job_dir, progress) in the worker pool. `progress(rows_done)` may be
+    called from any thread; fn's return value becomes the job result and
+    on_done(job_id, result) is called after a successful run.
+    """
+    _get_executor().submit(_run, job_id, fn, on_done)
+    _ensure_pump()
+    return get_job(job_id)
+
+
+def _run(job_id, fn, on_done=None):
+    _update(job_id, status=RUNNING, started=time.time())
+    _push(job_id, force=True)
+
+    with _JOBS_LOCK:
+        job = _JOBS.get(job_id)
+
+    def progress(rows):
+        # may run on an OS thread (tpool): a single dict store, no green lock
+        job["processed"] = int(rows)
+
+    try:
+        result = fn(job_dir(job_id), progress)
+        _update(job_id, status=DONE, result=result, finished=time.time(),
+                processed=(result or {}).get("total_processed", 0))
+        if on_done:
+            try:
+                on_done(job_id, result)
+            except Exception as e:
+                print(f"[offline_jobs] on_done hook for {job_id} failed: {e}")
+    except Exception as e:
+        print(f"[offline_jobs] job {job_id} failed: {e}")
+        if not isinstance(e, ValueError):  # bad input is reported, not a crash
+            print(traceback.format_exc())
+        _update(job_id, status=FAILED, error=str(e), finished=time.time())
+    _push(job_id, force=True)
+
+
+def _update(job_id, **fields):
+    with _JOBS_LOCK:
+        job = _JOBS.get(job_id)
+        if job:
+            job.update(fields)
+
+
+# -------------------------
+# Progress push
+# -------------------------
+def _push(job_id, force=False):
+    from socket_manager import emit_job_update
+    with _JOBS_LOCK:
+        job = _JOBS.get(job_id)
+        if job is None:
+            return
+        now = time.time()
+        if not force and (job["processed"] == job["_pushed_processed"]
+                          or now - job["_pushed"] < PROGRESS_INTERVAL):
+            return
+        job["_pushed"] = now
+        job["_pushed_processed"] = job["processed"]
+        snap = _snapshot(job)
+    snap.pop("result", None)  # clients fetch the result via /api/offline/jobs/<id>
+    emit_job_update(snap)
+
+
+def _pump():
+    """Push progress of running jobs; exits once nothing is queued or running."""
+    global _PUMP
+    while True:
+        time.sleep(PROGRESS_INTERVAL)
+        with _JOBS_LOCK:
+            running = [j["job_id"] for j in _JOBS.values() if j["status"] == RUNNING]
+            active = running or any(j["status"] == QUEUED for j in _JOBS.values())
+            if not active:
+                _PUMP = None
+                return
+        for job_id in running:
+            _push(job_id)
+
+
+def _ensure_pump():
+    global _PUMP
+    with _JOBS_LOCK:
+        if _PUMP is not None:
+            return
+        _PUMP = threading.Thread(target=_pump, daemon=True)
+    _PUMP.start()
+
+
+# -------------------------
+# TTL cleanup
+# -------------------------
+_last_sweep = 0.0
+
+
+def _sweep():
+    """Drop finished jobs older than JOB_TTL and orphaned job dirs (e.g. from a restart)."""
+    global _last_sweep
+    now = time.time()
+    if now - _last_sweep < 60:
+        return
+    _last_sweep = now
+
+    expired = []
+    with _JOBS_LOCK:
+        for job_id, job in list(_JOBS.items()):
+            if job["finished"] and not job["_pinned"] and now - job["finished"] > JOB_TTL:
+                expired.append(job_id)
+                del _JOBS[job_id]
+        known = set(_JOBS)
+
+    if os.path.isdir(JOBS_DIR):
+        for entry in os.scandir(JOBS_DIR):
+            if entry.name in known:
+                continue
+            try:
+                if entry.name in expired or now - entry.stat().st_mtime > JOB_TTL:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+            except OSError:
+                pass
@@ -0,0 +1,266 @@
+# utils/offline_parallel.py
+# -------------------------------------------------------------
+# Multi-core offline scoring
+# - CSVs are split into newline-aligned byte ranges, pcaps into
+#   flow-hash shards; each task runs in a process pool worker (every
+#   pcap shard reads the whole capture, so shards are capped)
+# - workers load the model themselves (model_selector cache) and write
+#   their rows to a part results file; the parent merges class counts and
+#   appends the parts in order to the job's results, numbering rows
+#   (in eventlet's OS thread pool, like the rest of the job)
+# - per-worker throughput is reported in the summary
+# -------------------------------------------------------------
+import os
+import time
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from utils import offline_pipeline as pipeline
+from utils import offline_results
+from utils.offline_jobs import run_blocking
+
+WORKERS = int(os.environ.get("NIDS_OFFLINE_WORKERS", 0)) or (os.cpu_count() or 1)
+# Files smaller than this are cheaper to score in-process
+PARALLEL_MIN_BYTES = int(os.environ.get("NIDS_OFFLINE_PARALLEL_BYTES", 32 * 1024 * 1024))
+MIN_RANGE_BYTES = 8 * 1024 * 1024     # smallest CSV byte range handed to a worker
+RANGES_PER_WORKER = 2                 # extra ranges smooth out uneven chunks
+# every pcap shard re-reads the whole capture (N shards = N x the I/O),
+# so the shard count is capped below the worker count
+PCAP_MAX_SHARDS = int(os.environ.get("NIDS_OFFLINE_PCAP_SHARDS", 4))
+# spawn: the server process is eventlet-monkey-patched with live green
+# threads, hub state and held locks (logger writer, socket.io, model
+# caches), none of which survive a fork safely. Workers load models
+# themselves. "fork" is an explicit opt-in for non-eventlet runs.
+START_METHOD = os.environ.get("NIDS_OFFLINE_MP_START", "spawn")
+
+_POOL = None
+_POOL_LOCK = threading.Lock()
+
+
+def _get_pool():
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            ctx = multiprocessing.get_context(START_METHOD)
+            _POOL = ProcessPoolExecutor(max_workers=WORKERS, mp_context=ctx)
+            atexit.register(shutdown)
+            print(f"[offline_parallel] Started process pool ({WORKERS} workers, {START_METHOD})")
+        return _POOL
+
+
+def shutdown():
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(wait=True, cancel_futures=True)
+            _POOL = None
+
+
+def should_parallelize(path):
+    # in-memory uploads are below the spool threshold and never worth a pool
+    return WORKERS > 1 and isinstance(path, str) and os.path.getsize(path) >= PARALLEL_MIN_BYTES
+
+
+# -------------------------
+# Task planning
+# -------------------------
+def plan_csv_ranges(path, parts):
+    """
+    Split a CSV into at most `parts` byte ranges that start and end on line
+    boundaries. Returns (header_bytes, [(start, end), ...]).
+    Assumes no quoted newlines inside fields (true for flow exports).
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        header = f.readline()
+        body_start = f.tell()
+        span = max((size - body_start) // max(parts, 1), MIN_RANGE_BYTES)
+        bounds = [body_start]
+        pos = body_start + span
+        while pos < size:
+            f.seek(pos)
+            f.readline()  # finish the partial line
+            cut = f.tell()
+            if cut >= size:
+                break
+            if cut > bounds[-1]:
+                bounds.append(cut)
+            pos = cut + span
+        bounds.append(size)
+    return header, [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+# -------------------------
+# Worker side
+# -------------------------
+def _worker_bundle(model_type):
+    from utils.model_selector import load_model
+    bundle = load_model(model_type)
+    if not bundle or not bundle.ready:
+        raise RuntimeError(f"model '{model_type}' failed to load in worker {os.getpid()}")
+    return bundle
+
+
+def _csv_task(task):
+    """Score one byte range into the unindexed part file at task['part']."""
+    import numpy as np
+    import pandas as pd
+
+    started = time.time()
+    bundle = _worker_bundle(task["model_type"])
+    counts, rows, preview, stats = {}, 0, [], {}
+    writer = offline_results.ResultWriter(task["part"], index=False)
+    try:
+        for labels in pipeline.iter_scored_csv(task["path"], task["model_type"], bundle,
+                                               task["chunk_rows"], plan=task["plan"],
+                                               byte_range=task["range"], stats=stats):
+            pipeline.add_counts(counts, labels)
+            writer.write(pd.DataFrame({"prediction": np.asarray(labels, dtype=str)}))
+            if len(preview) < pipeline.RESULTS_PREVIEW:
+                preview.extend(str(l) for l in labels[:pipeline.RESULTS_PREVIEW - len(preview)])
+            rows += len(labels)
+        writer.close()
+    except Exception:
+        writer.abort()
+        raise
+    return {"pid": os.getpid(), "rows": rows, "counts": counts, "preview": preview,
+            "unique": stats.get("unique", 0), "seconds": time.time() - started}
+
+
+def _pcap_task(task):
+    """Aggregate and score one flow-hash shard of a capture."""
+    started = time.time()
+    bundle = _worker_bundle(task["model_type"])
+    counts, rows, packets, preview, stats = {}, 0, 0, [], {}
+    writer = offline_results.ResultWriter(task["part"], index=False)
+    try:
+        for frame, n_packets in pipeline.iter_scored_flows(task["path"], task["model_type"], bundle,
+                                                           shard=task["shard"], stats=stats):
+            pipeline.add_counts(counts, frame["prediction"])
+            writer.write(frame)
+            if len(preview) < pipeline.RESULTS_PREVIEW:
+                preview.extend(pipeline.flow_preview(frame, 0, pipeline.RESULTS_PREVIEW - len(preview)))
+            rows += len(frame)
+            packets += n_packets
+        writer.close()
+    except Exception:
+        writer.abort()
+        raise
+    return {"pid": os.getpid(), "rows": rows, "packets": packets, "counts": counts,
+            "preview": preview, "unique": stats.get("unique", 0), "seconds": time.time() - started}
+
+
+# -------------------------
+# Parent side: run + merge
+# -------------------------
+def _run(fn, tasks, progress):
+    pool = _get_pool()
+    futures = [pool.submit(fn, t) for t in tasks]
+    done_rows = 0
+    results = []
+    try:
+        for fut in futures:  # in task order, so parts concatenate in order
+            res = fut.result()
+            done_rows += res["rows"]
+            results.append(res)
+            if progress:
+                progress(done_rows)
+    except Exception:
+        for fut in futures:
+            fut.cancel()
+        raise
+    return results
+
+
+def _merge(results, tasks, out_base, started):
+    counts = {}
+    preview = []
+    writer = offline_results.ResultWriter(out_base)
+    try:
+        for res, task in zip(results, tasks):
+            for lbl, c in res["counts"].items():
+                counts[lbl] = counts.get(lbl, 0) + c
+            for i, rec in enumerate(res["preview"]):
+                if len(preview) >= pipeline.RESULTS_PREVIEW:
+                    break
+                if isinstance(rec, dict):
+                    preview.append(dict(rec, index=writer.rows + i))
+                else:
+                    preview.append({"index": writer.rows + i, "class": rec})
+            part = offline_results.result_file(task["part"])
+            for frame in offline_results.iter_frames(part):
+                writer.write(frame)
+            os.remove(part)
+        writer.close()
+    except Exception:
+        writer.abort()
+        raise
+    total = writer.rows
+
+    per_worker = {}
+    for res in results:
+        w = per_worker.setdefault(res["pid"], {"pid": res["pid"], "tasks": 0, "rows": 0, "seconds": 0.0})
+        w["tasks"] += 1
+        w["rows"] += res["rows"]
+        w["seconds"] += res["seconds"]
+    for w in per_worker.values():
+        w["seconds"] = round(w["seconds"], 3)
+        w["rows_per_sec"] = round(w["rows"] / w["seconds"], 1) if w["seconds"] else None
+
+    return {
+        "classCounts": counts,
+        "total_processed": total,
+        "results": preview,
+        "results_truncated": total > len(preview),
+        "chunks": len(tasks),
+        "workers": len(per_worker),
+        "per_worker": sorted(per_worker.values(), key=lambda w: w["pid"]),
+        **pipeline.dedup_summary({"rows": total, "unique": sum(r["unique"] for r in results)}),
+        "seconds": round(time.time() - started, 3),
+    }
+
+
+def _cleanup(tasks):
+    for task in tasks:
+        part = offline_results.result_file(task["part"])
+        if part:
+            os.remove(part)
+
+
+def parallel_score_csv(path, model_type, out_base, chunk_rows=pipeline.CHUNK_ROWS, progress=None):
+    """Score a CSV across the process pool; same summary shape as stream_score_csv()."""
+    started = time.time()
+    plan = pipeline._read_plan(path, model_type)
+    header, ranges = plan_csv_ranges(path, WORKERS * RANGES_PER_WORKER)
+    tasks = [{
+        "path": path, "model_type": model_type, "plan": plan, "chunk_rows": chunk_rows,
+        "range": (start, end, header), "part": f"{out_base}.part{i}",
+    } for i, (start, end) in enumerate(ranges)]
+    try:
+        results = _run(_csv_task, tasks, progress)
+        # re-reads and rewrites every part file: keep it off the event loop
+        return run_blocking(_merge, results, tasks, out_base, started)
+    finally:
+        _cleanup(tasks)
+
+
+def parallel_score_pcap(path, model_type, out_base, shards=None, progress=None):
+    """
+    Score a capture as `shards` flow-hash shards (default: one per worker,
+    at most PCAP_MAX_SHARDS). Each worker reads the whole file but only
+    dissects packets of its shard, so I/O grows with the shard count.
+    """
+    started = time.time()
+    shards = shards or max(1, min(WORKERS, PCAP_MAX_SHARDS))
+    tasks = [{
+        "path": path, "model_type": model_type, "shard": (i, shards), "part": f"{out_base}.part{i}",
+    } for i in range(shards)]
+    try:
+        results = _run(_pcap_task, tasks, progress)
+        summary = run_blocking(_merge, results, tasks, out_base, started)
+    finally:
+        _cleanup(tasks)
+    summary["packets"] = sum(r["packets"] for r in results)
+    return summary
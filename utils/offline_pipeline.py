@@ -0,0 +1,602 @@
+# utils/offline_pipeline.py
+# -------------------------------------------------------------
+# Shared normalization + scoring for offline (uploaded) datasets
+# - normalize_frame(): header mapping, flag extraction, protocol names
+#   through a ColumnPlan compiled once per header signature and cached,
+#   so repeated uploads from the same exporter skip schema inference;
+#   protocol/flag text is mapped per distinct value, not per row
+# - stream_score_csv(): chunked reader with fixed dtypes, vectorized
+#   scoring per chunk, incremental class counts and per-row results
+#   appended to a columnar results file (utils.offline_results), so peak
+#   memory is bounded by the chunk size
+# - score_matrix(): only distinct feature vectors reach the model; labels
+#   are broadcast back to duplicate rows (dedup ratio in every summary)
+# - stream_score_pcap(): packet-streamed flow aggregation, flows scored
+#   in batches as they expire
+# - stream_score_both(): one parse of a CSV/pcap feeds both the BCC and
+#   CICIDS matrices; the two models score each batch concurrently and
+#   the summary carries per-model counts plus a label agreement matrix
+# -------------------------------------------------------------
+import io
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+from utils.model_selector import BCC_FEATURES
+from utils.offline_results import ResultWriter
+
+CICIDS_FEATURES = [
+    "Protocol", "Dst Port", "Flow Duration", "Tot Fwd Pkts", "Tot Bwd Pkts",
+    "TotLen Fwd Pkts", "TotLen Bwd Pkts", "Fwd Pkt Len Mean", "Bwd Pkt Len Mean",
+    "Flow IAT Mean", "Fwd PSH Flags", "Fwd URG Flags", "Fwd IAT Mean"
+]
+
+CHUNK_ROWS = 50_000              # rows per streamed chunk
+RESULTS_PREVIEW = 100            # rows echoed back inline in streaming mode
+
+# Renames common CSV headers to the specific technical names the model expects
+COLUMN_MAPPING = {
+    'Protocol': 'protocol', 'proto': 'protocol',
+    'Source Port': 'src_port',
+    'Destination Port': 'dst_port',
+    'Flow Duration': 'duration', 'flow_duration': 'duration',
+    'Total Fwd Packets': 'fwd_packets_count', 'total_fwd_pkts': 'fwd_packets_count',
+    'Total Bwd Packets': 'bwd_packets_count', 'total_bwd_pkts': 'bwd_packets_count',
+    'Total Length of Fwd Packets': 'total_payload_bytes', 'payload_len': 'total_payload_bytes',
+    'fwd_header_len': 'total_header_bytes', 'header_len': 'total_header_bytes',
+    'Flow Bytes/s': 'bytes_rate', 'rate': 'bytes_rate',
+    'Flow Pkts/s': 'packets_rate',
+    'syn': 'syn_flag_counts', 'ack': 'ack_flag_counts',
+    'rst': 'rst_flag_counts', 'fin': 'fin_flag_counts'
+}
+
+FLAG_MAP = {
+    'syn_flag_counts': 'syn',
+    'ack_flag_counts': 'ack',
+    'rst_flag_counts': 'rst',
+    'fin_flag_counts': 'fin'
+}
+
+PROTO_MAP = {'TCP': 6, 'UDP': 17, 'ICMP': 1, 'tcp': 6, 'udp': 17, 'icmp': 1}
+
+# Text-valued columns; everything else the model reads is numeric
+_TEXT_COLUMNS = {"protocol", "Protocol", "flags"}
+_NA_VALUES = ["", "NaN", "nan", "Infinity", "-Infinity", "inf", "-inf"]
+_PLAN_COLUMNS = set(FLAG_MAP) | {'protocol', 'flags', 'packets_count', 'fwd_packets_count', 'bwd_packets_count'}
+
+PLAN_CACHE_SIZE = 256            # compiled header plans kept (LRU-ish)
+
+
+def expected_features(model_type):
+    return BCC_FEATURES if model_type == "bcc" else CICIDS_FEATURES
+
+
+def column_mapping(model_type):
+    """Header renames for a model; CICIDS keeps its own fit-time column names."""
+    if model_type == "bcc":
+        return COLUMN_MAPPING
+    keep = set(CICIDS_FEATURES)
+    return {k: v for k, v in COLUMN_MAPPING.items() if k not in keep}
+
+
+# -------------------------
+# Normalization
+# -------------------------
+class ColumnPlan:
+    """
+    Everything normalize_frame() decides from the header alone, for one
+    (model, header) pair: the columns to read and their dtypes, the renames
+    that apply, and how packets_count / flags / protocol are derived.
+    Plain attributes so plans pickle into offline_parallel workers.
+    """
+
+    def __init__(self, header, model_type):
+        mapping = column_mapping(model_type)
+        wanted = set(expected_features(model_type)) | _PLAN_COLUMNS
+        self.model_type = model_type
+        self.signature = header_signature(header)
+        self.usecols, self.dtypes = [], {}
+        for col in header:
+            target = mapping.get(col, col)
+            if target in wanted:
+                self.usecols.append(col)
+                self.dtypes[col] = "object" if target in _TEXT_COLUMNS else "float64"
+        self.renames = {c: mapping[c] for c in header if c in mapping}
+        targets = {self.renames.get(c, c) for c in header}
+        self.derive_packets = 'packets_count' not in targets and 'fwd_packets_count' in targets
+        self.has_bwd = 'bwd_packets_count' in targets
+        missing = [m for m in FLAG_MAP if m not in targets]
+        self.flags_from_text = missing if 'flags' in targets else []
+        self.flags_zero = [] if self.flags_from_text else missing
+        self.protocol_cols = [c for c in ('protocol', 'Protocol') if c in targets]
+
+    def apply(self, df):
+        df = df.rename(columns=self.renames)
+
+        # Calculate packets_count if missing
+        if self.derive_packets:
+            packets = pd.to_numeric(df['fwd_packets_count'], errors='coerce').fillna(0)
+            if self.has_bwd:
+                packets = packets + pd.to_numeric(df['bwd_packets_count'], errors='coerce').fillna(0)
+            df['packets_count'] = packets
+
+        # --- FLAG EXTRACTION LOGIC ---
+        if self.flags_from_text and df['flags'].dtype == object:
+            # Handle String flags safely: one substring test per distinct value
+            codes, uniq = pd.factorize(df['flags'])
+            lowered = [u.lower() if isinstance(u, str) else "" for u in uniq]
+            for model_name in self.flags_from_text:
+                hit = np.array([FLAG_MAP[model_name] in u for u in lowered] + [False])
+                df[model_name] = hit[codes].astype(int)
+        else:
+            # Fallback for numeric or missing flag data
+            for model_name in self.flags_from_text + self.flags_zero:
+                df[model_name] = 0
+
+        for col in self.protocol_cols:
+            df[col] = _map_protocol(df[col])
+        return df
+
+
+def _map_protocol(col):
+    """Protocol names -> numbers, looked up once per distinct value."""
+    if col.dtype != object:
+        return col
+    codes, uniq = pd.factorize(col)
+    mapped = np.array([PROTO_MAP.get(u, u) if isinstance(u, str) else u for u in uniq] + [np.nan],
+                      dtype=object)
+    return pd.Series(mapped[codes], index=col.index, name=col.name)
+
+
+def header_signature(header):
+    return hashlib.sha1("\x1f".join(map(str, header)).encode("utf-8")).hexdigest()[:16]
+
+
+# (model, signature) -> ColumnPlan. Plain dict ops only: lookups also happen
+# on tpool OS threads, where a green lock can't be taken.
+_PLANS = {}
+_plan_stats = {"hits": 0, "misses": 0}
+
+
+def column_plan(header, model_type="bcc"):
+    """Cached ColumnPlan for a header (compiled on first sight of the signature)."""
+    header = list(header)
+    key = (model_type, header_signature(header))
+    plan = _PLANS.get(key)
+    if plan is not None:
+        _plan_stats["hits"] += 1
+        return plan
+    _plan_stats["misses"] += 1
+    plan = ColumnPlan(header, model_type)
+    while len(_PLANS) >= PLAN_CACHE_SIZE:
+        try:
+            del _PLANS[next(iter(_PLANS))]
+        except (KeyError, StopIteration, RuntimeError):
+            break
+    _PLANS[key] = plan
+    return plan
+
+
+def plan_cache_stats():
+    return dict(_plan_stats, entries=len(_PLANS), max_entries=PLAN_CACHE_SIZE)
+
+
+def normalize_frame(df, model_type="bcc", plan=None):
+    """Rename known headers, derive packets_count / TCP flags and map protocol names."""
+    return (plan or column_plan(df.columns, model_type)).apply(df)
+
+
+def feature_matrix(df, expected):
+    """Aligned float matrix in model column order (missing features -> 0)."""
+    cols = {}
+    for col in expected:
+        if col in df.columns:
+            cols[col] = pd.to_numeric(df[col], errors='coerce')
+        else:
+            # 🚀 SAFETY PADDING: Fill missing features with 0 to prevent "CRITICAL_ERROR"
+            cols[col] = 0
+    X = pd.DataFrame(cols, index=df.index)[expected].to_numpy(dtype=float)
+    return np.nan_to_num(X, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def unique_rows(X):
+    """(unique_rows, inverse) so that unique_rows[inverse] == X."""
+    X = np.ascontiguousarray(X, dtype=float)
+    keys = X.view(np.dtype((np.void, X.dtype.itemsize * X.shape[1]))).ravel()
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    return X[first], inverse.ravel()
+
+
+def score_matrix(bundle, X, stats=None):
+    """
+    Score only the distinct feature vectors of X and broadcast labels back.
+    `stats` (if given) accumulates {"rows", "unique"} for the dedup ratio.
+    """
+    if len(X) > 1:
+        uniq, inverse = unique_rows(X)
+    else:
+        uniq, inverse = X, None
+    labels, _ = bundle.predict_labels_with_confidence(uniq)
+    labels = np.asarray(labels)
+    if inverse is not None:
+        labels = labels[inverse]
+    if stats is not None:
+        stats["rows"] = stats.get("rows", 0) + len(X)
+        stats["unique"] = stats.get("unique", 0) + len(uniq)
+    return labels
+
+
+def dedup_summary(stats):
+    rows, unique = stats.get("rows", 0), stats.get("unique", 0)
+    return {"unique_rows": unique, "dedup_ratio": round(rows / unique, 2) if unique else None}
+
+
+def score_frame(bundle, df, model_type, stats=None):
+    """Normalized frame -> label array (fused scale/predict/decode on unique rows)."""
+    X = feature_matrix(df, expected_features(model_type))
+    return score_matrix(bundle, X, stats)
+
+
+# -------------------------
+# Chunked streaming mode
+# -------------------------
+def header_is_scorable(columns):
+    """True when at least one column maps onto a BCC or CICIDS feature."""
+    known = set(BCC_FEATURES) | set(CICIDS_FEATURES) | set(FLAG_MAP) | {"flags"}
+    return any(COLUMN_MAPPING.get(c, c) in known or c in known for c in columns)
+
+
+def _rewind(source):
+    """Paths pass through; in-memory uploads (BytesIO) are re-read from the start."""
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return source
+
+
+def _read_plan(path, model_type):
+    """ColumnPlan for a CSV's header: only the usable columns, with fixed dtypes."""
+    return column_plan(pd.read_csv(_rewind(path), nrows=0).columns, model_type)
+
+
+class _ByteRange(io.RawIOBase):
+    """Header line followed by bytes [start, end) of a file, as a readable stream."""
+
+    def __init__(self, path, start, end, header):
+        self._f = open(path, "rb")
+        self._f.seek(start)
+        self._left = end - start
+        self._head = header
+
+    def readable(self):
+        return True
+
+    def readinto(self, buf):
+        if self._head:
+            n = min(len(buf), len(self._head))
+            buf[:n] = self._head[:n]
+            self._head = self._head[n:]
+            return n
+        if self._left <= 0:
+            return 0
+        data = self._f.read(min(len(buf), self._left))
+        self._left -= len(data)
+        buf[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        self._f.close()
+        super().close()
+
+
+def _open_source(path, byte_range):
+    if byte_range is None:
+        return _rewind(path)
+    start, end, header = byte_range
+    return io.BufferedReader(_ByteRange(path, start, end, header))
+
+
+def _coerce_numeric(chunk, dtypes):
+    """Junk cells in planned float columns -> NaN, so derived fields never see text."""
+    for col, dtype in dtypes.items():
+        if dtype != "object" and col in chunk.columns:
+            chunk[col] = pd.to_numeric(chunk[col], errors="coerce")
+
+
+def _iter_chunks(path, usecols, dtypes, chunk_rows, byte_range=None):
+    kwargs = dict(usecols=usecols or None, chunksize=chunk_rows, na_values=_NA_VALUES)
+    reader = pd.read_csv(_open_source(path, byte_range), dtype=dtypes, **kwargs)
+    done = 0
+    fallback = False
+    while True:
+        try:
+            chunk = next(reader)
+        except StopIteration:
+            return
+        except ValueError:
+            if fallback:
+                raise
+            # a "numeric" column holds junk text: re-open after the rows already
+            # yielded as text, then coerce the planned numeric columns per chunk
+            fallback = True
+            reader = pd.read_csv(_open_source(path, byte_range), dtype="object",
+                                 skiprows=range(1, done + 1), **kwargs)
+            continue
+        if fallback:
+            _coerce_numeric(chunk, dtypes)
+        done += len(chunk)
+        yield chunk
+
+
+def add_counts(counts, labels):
+    """Accumulate per-class counts for a label array into `counts`."""
+    uniq, cnt = np.unique(np.asarray(labels, dtype=str), return_counts=True)
+    for lbl, c in zip(uniq.tolist(), cnt.tolist()):
+        counts[lbl] = counts.get(lbl, 0) + int(c)
+    return counts
+
+
+def iter_scored_csv(path, model_type, bundle, chunk_rows=CHUNK_ROWS, plan=None, byte_range=None, stats=None):
+    """Yield one label array per chunk; `byte_range=(start, end, header)` limits the rows read."""
+    plan = plan or _read_plan(path, model_type)
+    for chunk in _iter_chunks(path, plan.usecols, plan.dtypes, chunk_rows, byte_range):
+        yield score_frame(bundle, plan.apply(chunk), model_type, stats)
+
+
+def stream_score_csv(path, model_type, bundle, out_base, chunk_rows=CHUNK_ROWS, progress=None):
+    """
+    Score a CSV of any size in bounded memory.
+
+    Reads `chunk_rows` rows at a time (only model-relevant columns, fixed
+    dtypes), scores each chunk vectorized, accumulates class counts and
+    appends `index,prediction` rows to the results file at `out_base`
+    (+ .parquet / .csv.gz). `progress(rows_done)` is called after every
+    chunk. Returns a summary dict.
+    """
+    counts = {}
+    preview = []
+    total = 0
+    chunks = 0
+    stats = {}
+    started = time.time()
+
+    writer = ResultWriter(out_base)
+    try:
+        for labels in iter_scored_csv(path, model_type, bundle, chunk_rows, stats=stats):
+            add_counts(counts, labels)
+            writer.write(pd.DataFrame({"prediction": np.asarray(labels, dtype=str)}))
+
+            if len(preview) < RESULTS_PREVIEW:
+                take = RESULTS_PREVIEW - len(preview)
+                preview.extend({"index": total + i, "class": str(l)} for i, l in enumerate(labels[:take]))
+
+            total += len(labels)
+            chunks += 1
+            if progress:
+                progress(total)
+        writer.close()
+    except Exception:
+        writer.abort()
+        raise
+
+    return {
+        "classCounts": counts,
+        "total_processed": total,
+        "results": preview,
+        "results_truncated": total > len(preview),
+        "chunks": chunks,
+        **dedup_summary(stats),
+        "seconds": round(time.time() - started, 3),
+    }
+
+
+# -------------------------
+# Streaming pcap mode
+# -------------------------
+PCAP_BATCH_FLOWS = 4096          # expired flows scored per model call
+
+
+def iter_scored_flows(path, model_type, bundle, batch_flows=PCAP_BATCH_FLOWS, shard=None, stats=None):
+    """
+    Yield (frame, packets) per batch of expired flows, where `frame` holds
+    FLOW_ID_COLUMNS + prediction. `shard=(i, n)` keeps one flow-hash shard.
+    """
+    from utils.pcap_to_csv import iter_pcap_flows, flow_id, FLOW_ID_COLUMNS
+
+    bcc = model_type == "bcc"
+    ids, rows, packets = [], [], 0
+
+    def score():
+        X = np.nan_to_num(np.asarray(rows, dtype=float), nan=0.0, posinf=0.0, neginf=0.0)
+        labels = score_matrix(bundle, X, stats)
+        frame = pd.DataFrame(ids, columns=FLOW_ID_COLUMNS)
+        frame["prediction"] = np.asarray(labels, dtype=str)
+        return frame
+
+    for flow in iter_pcap_flows(path, shard=shard):
+        packets += flow.packets_total
+        ids.append(flow_id(flow))
+        rows.append(flow.build_bcc_features() if bcc else flow.build_cicids_features())
+        if len(rows) >= batch_flows:
+            yield score(), packets
+            ids, rows, packets = [], [], 0
+    if rows:
+        yield score(), packets
+
+
+def flow_preview(frame, start, limit):
+    """First `limit` rows of a scored flow frame as preview records."""
+    out = []
+    for i, rec in enumerate(frame.head(limit).to_dict("records")):
+        out.append({"index": start + i, "class": str(rec["prediction"]),
+                    "src": f"{rec['src_ip']}:{rec['src_port']}",
+                    "dst": f"{rec['dst_ip']}:{rec['dst_port']}"})
+    return out
+
+
+def stream_score_pcap(path, model_type, bundle, out_base, batch_flows=PCAP_BATCH_FLOWS, progress=None):
+    """
+    Score a pcap/pcapng capture of any size in bounded memory.
+
+    Packets are aggregated into flows by utils.pcap_to_csv.iter_pcap_flows;
+    expired flows are buffered up to `batch_flows`, scored vectorized and
+    appended to the results file at `out_base` as `index,<5-tuple>,prediction`
+    rows. Returns the same summary shape as stream_score_csv().
+    """
+    counts = {}
+    preview = []
+    total = 0
+    chunks = 0
+    packets = 0
+    stats = {}
+    started = time.time()
+
+    writer = ResultWriter(out_base)
+    try:
+        for frame, n_packets in iter_scored_flows(path, model_type, bundle, batch_flows, stats=stats):
+            add_counts(counts, frame["prediction"])
+            writer.write(frame)
+            if len(preview) < RESULTS_PREVIEW:
+                preview.extend(flow_preview(frame, total, RESULTS_PREVIEW - len(preview)))
+
+            total += len(frame)
+            packets += n_packets
+            chunks += 1
+            if progress:
+                progress(total)
+        writer.close()
+    except Exception:
+        writer.abort()
+        raise
+
+    return {
+        "classCounts": counts,
+        "total_processed": total,
+        "packets": packets,
+        "results": preview,
+        "results_truncated": total > len(preview),
+        "chunks": chunks,
+        **dedup_summary(stats),
+        "seconds": round(time.time() - started, 3),
+    }
+
+
+# -------------------------
+# Dual-model mode
+# -------------------------
+MODELS = ("bcc", "cicids")
+
+
+def _direct(fn, *args):
+    return fn(*args)
+
+
+def iter_dual_batches(source, kind="csv", chunk_rows=CHUNK_ROWS, batch_flows=PCAP_BATCH_FLOWS):
+    """
+    Yield (ids, {"bcc": X, "cicids": X}, packets) per batch, parsing the
+    source once. `ids` is the flow 5-tuple frame for pcaps, else None.
+    """
+    if kind == "pcap":
+        from utils.pcap_to_csv import iter_pcap_flows, flow_id, FLOW_ID_COLUMNS
+
+        def batch():
+            Xs = {m: np.nan_to_num(np.asarray(r, dtype=float), nan=0.0, posinf=0.0, neginf=0.0)
+                  for m, r in rows.items()}
+            return pd.DataFrame(ids, columns=FLOW_ID_COLUMNS), Xs, packets
+
+        ids, rows, packets = [], {m: [] for m in MODELS}, 0
+        for flow in iter_pcap_flows(source):
+            packets += flow.packets_total
+            ids.append(flow_id(flow))
+            rows["bcc"].append(flow.build_bcc_features())
+            rows["cicids"].append(flow.build_cicids_features())
+            if len(ids) >= batch_flows:
+                yield batch()
+                ids, rows, packets = [], {m: [] for m in MODELS}, 0
+        if ids:
+            yield batch()
+        return
+
+    header = pd.read_csv(_rewind(source), nrows=0).columns
+    plans = {m: column_plan(header, m) for m in MODELS}
+    usecols = [c for c in header if any(c in plans[m].dtypes for m in MODELS)]
+    dtypes = {c: "object" if "object" in (plans[m].dtypes.get(c) for m in MODELS) else "float64"
+              for c in usecols}
+    for chunk in _iter_chunks(source, usecols, dtypes, chunk_rows):
+        yield None, {m: feature_matrix(plans[m].apply(chunk), expected_features(m)) for m in MODELS}, 0
+
+
+def add_agreement(matrix, a, b):
+    """Accumulate {label_a: {label_b: n}} co-occurrence counts."""
+    pairs, cnt = np.unique(np.stack([np.asarray(a, dtype=str), np.asarray(b, dtype=str)], axis=1),
+                           axis=0, return_counts=True)
+    for (la, lb), c in zip(pairs.tolist(), cnt.tolist()):
+        row = matrix.setdefault(la, {})
+        row[lb] = row.get(lb, 0) + int(c)
+    return matrix
+
+
+def stream_score_both(source, bundles, out_base, kind="csv", chunk_rows=CHUNK_ROWS, progress=None, run=None):
+    """
+    Score one CSV or capture with both models from a single parse.
+
+    Each batch yields the BCC and CICIDS matrices; the two models score it
+    concurrently and rows are appended to the results file as
+    `index,[5-tuple,]prediction_bcc,prediction_cicids`. `run(fn, *args)`
+    executes the CPU-bound steps (offline_jobs.run_blocking under eventlet).
+    """
+    run = run or _direct
+    counts = {m: {} for m in MODELS}
+    stats = {m: {} for m in MODELS}
+    agreement = {}
+    preview = []
+    total = chunks = packets = 0
+    started = time.time()
+
+    batches = iter_dual_batches(source, kind, chunk_rows)
+    writer = ResultWriter(out_base)
+    try:
+        with ThreadPoolExecutor(max_workers=len(MODELS), thread_name_prefix="offline-dual") as pool:
+            while True:
+                item = run(next, batches, None)
+                if item is None:
+                    break
+                ids, Xs, n_packets = item
+                futures = {m: pool.submit(run, score_matrix, bundles[m], Xs[m], stats[m]) for m in MODELS}
+                labels = {m: np.asarray(f.result(), dtype=str) for m, f in futures.items()}
+
+                frame = ids if ids is not None else pd.DataFrame(index=range(len(labels["bcc"])))
+                for m in MODELS:
+                    add_counts(counts[m], labels[m])
+                    frame[f"prediction_{m}"] = labels[m]
+                add_agreement(agreement, labels["bcc"], labels["cicids"])
+                writer.write(frame)
+
+                if len(preview) < RESULTS_PREVIEW:
+                    take = RESULTS_PREVIEW - len(preview)
+                    preview.extend({"index": total + i, "bcc": b, "cicids": c} for i, (b, c)
+                                   in enumerate(zip(labels["bcc"][:take].tolist(), labels["cicids"][:take].tolist())))
+
+                total += len(frame)
+                packets += n_packets
+                chunks += 1
+                if progress:
+                    progress(total)
+        writer.close()
+    except Exception:
+        writer.abort()
+        raise
+
+    summary = {
+        "models": {m: {"classCounts": counts[m], **dedup_summary(stats[m])} for m in MODELS},
+        "agreement": agreement,
+        "total_processed": total,
+        "results": preview,
+        "results_truncated": total > len(preview),
+        "chunks": chunks,
+        "seconds": round(time.time() - started, 3),
+    }
+    if kind == "pcap":
+        summary["packets"] = packets
+    return summary
@@ -0,0 +1,225 @@
+# utils/offline_results.py
+# -------------------------------------------------------------
+# Columnar storage for offline job results
+# - Parquet (zstd) when pyarrow is installed, gzip CSV otherwise
+# - ResultWriter appends one row group per scored chunk and numbers
+#   rows with an "index" column; files appear atomically on close()
+# - read_page(): offset/limit pagination, prediction-class filter and
+#   column projection; class_counts() reads only the prediction column
+# -------------------------------------------------------------
+import os
+
+RESULTS_NAME = "results"
+PARQUET_EXT = ".parquet"
+CSV_EXT = ".csv.gz"
+MAX_PAGE = 5000
+
+
+def _arrow():
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+HAS_ARROW = _arrow()
+
+
+def result_file(base):
+    """Existing results file for a base path (either format), or None."""
+    for ext in (PARQUET_EXT, CSV_EXT):
+        if os.path.exists(base + ext):
+            return base + ext
+    return None
+
+
+# -------------------------
+# Writing
+# -------------------------
+class ResultWriter:
+    """Append DataFrames to <base>.parquet (or <base>.csv.gz) chunk by chunk."""
+
+    def __init__(self, base, index=True):
+        self.path = base + (PARQUET_EXT if HAS_ARROW else CSV_EXT)
+        self._tmp = self.path + ".tmp"
+        self._index = index
+        self._rows = 0
+        self._writer = None
+        self._schema = None
+        self._fh = None
+
+    @property
+    def rows(self):
+        return self._rows
+
+    def _prepare(self, frame):
+        frame = frame.reset_index(drop=True)
+        if self._index:
+            frame.insert(0, "index", range(self._rows, self._rows + len(frame)))
+        # mixed-type text columns -> str so every chunk has one stable schema
+        for col in frame.columns:
+            if frame[col].dtype == object:
+                frame[col] = frame[col].astype(str)
+        return frame
+
+    def write(self, frame):
+        if len(frame) == 0:
+            return
+        frame = self._prepare(frame)
+        if HAS_ARROW:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            if self._writer is None:
+                table = pa.Table.from_pandas(frame, preserve_index=False)
+                self._schema = table.schema
+                self._writer = pq.ParquetWriter(self._tmp, self._schema, compression="zstd")
+            else:
+                table = pa.Table.from_pandas(frame, schema=self._schema, preserve_index=False)
+            self._writer.write_table(table)
+        else:
+            import gzip
+            if self._fh is None:
+                self._fh = gzip.open(self._tmp, "wt", encoding="utf-8", newline="")
+                frame.to_csv(self._fh, index=False)
+            else:
+                frame.to_csv(self._fh, index=False, header=False)
+        self._rows += len(frame)
+
+    def close(self):
+        """Finish the file and move it into place. Returns its path."""
+        if HAS_ARROW:
+            if self._writer is None:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                pq.write_table(pa.table({"index": pa.array([], pa.int64())}), self._tmp)
+            else:
+                self._writer.close()
+        else:
+            if self._fh is None:
+                import gzip
+                self._fh = gzip.open(self._tmp, "wt", encoding="utf-8", newline="")
+            self._fh.close()
+        os.replace(self._tmp, self.path)
+        return self.path
+
+    def abort(self):
+        try:
+            if self._writer is not None:
+                self._writer.close()
+            if self._fh is not None:
+                self._fh.close()
+        finally:
+            if os.path.exists(self._tmp):
+                os.remove(self._tmp)
+
+
+# -------------------------
+# Reading
+# -------------------------
+def result_columns(path):
+    if path.endswith(PARQUET_EXT):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).schema_arrow.names
+    import pandas as pd
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def iter_frames(path, columns=None, chunk_rows=50_000):
+    """Yield the stored rows as DataFrames (one per row group / chunk)."""
+    if path.endswith(PARQUET_EXT):
+        import pyarrow.parquet as pq
+        pf = pq.ParquetFile(path)
+        for i in range(pf.num_row_groups):
+            yield pf.read_row_group(i, columns=columns).to_pandas()
+    else:
+        import pandas as pd
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_rows)
+
+
+def class_counts(path, column="prediction"):
+    """Per-class counts, reading only the prediction column."""
+    counts = {}
+    if column not in result_columns(path):  # empty result set
+        return counts
+    if path.endswith(PARQUET_EXT):
+        import pyarrow.parquet as pq
+        import pyarrow.compute as pc
+        col = pq.read_table(path, columns=[column]).column(column)
+        for item in pc.value_counts(col).to_pylist():
+            counts[str(item["values"])] = int(item["counts"])
+        return counts
+    for frame in iter_frames(path, columns=[column]):
+        for lbl, c in frame[column].astype(str).value_counts().items():
+            counts[lbl] = counts.get(lbl, 0) + int(c)
+    return counts
+
+
+def _records(frame):
+    """JSON-safe records (NaN -> None)."""
+    return frame.astype(object).where(frame.notna(), None).to_dict("records")
+
+
+def read_page(path, offset=0, limit=100, classes=None, columns=None, class_column="prediction"):
+    """
+    One page of results as (records, total_matching).
+
+    `classes` filters on `class_column` (prediction_bcc / prediction_cicids
+    for dual-model jobs); `columns` projects the
+    returned fields (index is always included). Only the row groups that
+    overlap the page are decoded for the projected columns.
+    """
+    limit = max(1, min(int(limit), MAX_PAGE))
+    offset = max(0, int(offset))
+    available = result_columns(path)
+    if columns:
+        unknown = [c for c in columns if c not in available]
+        if unknown:
+            raise ValueError(f"unknown columns: {', '.join(unknown)}")
+        wanted = ["index"] + [c for c in columns if c != "index"]
+    else:
+        wanted = available
+    wanted = [c for c in wanted if c in available]
+    classes = set(map(str, classes)) if classes else None
+    if available == ["index"]:  # empty result set
+        return [], 0
+    if classes is not None and class_column not in available:
+        raise ValueError(f"no '{class_column}' column in these results")
+
+    records = []
+    matched = 0
+    if path.endswith(PARQUET_EXT):
+        import pyarrow.parquet as pq
+        pf = pq.ParquetFile(path)
+        for i in range(pf.num_row_groups):
+            if classes is None:
+                n = pf.metadata.row_group(i).num_rows
+                sel = None
+            else:
+                pred = pf.read_row_group(i, columns=[class_column]).column(class_column).to_pandas()
+                mask = pred.astype(str).isin(classes).to_numpy()
+                n = int(mask.sum())
+                sel = mask.nonzero()[0]
+            lo, hi = matched, matched + n
+            matched = hi
+            if len(records) >= limit or hi <= offset or n == 0:
+                continue
+            frame = pf.read_row_group(i, columns=wanted).to_pandas()
+            if sel is not None:
+                frame = frame.iloc[sel]
+            start = max(offset - lo, 0)
+            frame = frame.iloc[start:start + (limit - len(records))]
+            records.extend(_records(frame))
+    else:
+        for frame in iter_frames(path, columns=wanted if classes is None or class_column in wanted
+                                 else wanted + [class_column]):
+            if classes is not None:
+                frame = frame[frame[class_column].astype(str).isin(classes)]
+            lo, hi = matched, matched + len(frame)
+            matched = hi
+            if len(records) >= limit or hi <= offset:
+                continue
+            start = max(offset - lo, 0)
+            frame = frame.iloc[start:start + (limit - len(records))][wanted]
+            records.extend(_records(frame))
+    return records, matched
@@ -0,0 +1,198 @@
+# utils/offline_upload.py
+# -------------------------------------------------------------
+# Streaming upload intake for offline detection
+# - the request body is parsed straight from the WSGI stream; file
+#   parts are written into an UploadSpool instead of werkzeug's temp file
+# - the spool keeps small uploads in memory and only spills to a file
+#   in the job directory once SPOOL_BYTES is exceeded
+# - bytes are sha256-hashed as they arrive (result cache key)
+# - oversize bodies and files whose first line / magic number can't be
+#   scored are rejected before the rest of the body is read
+# -------------------------------------------------------------
+import io
+import os
+import hashlib
+
+MAX_UPLOAD_BYTES = int(os.environ.get("NIDS_OFFLINE_MAX_UPLOAD_BYTES", 4 * 1024 * 1024 * 1024))
+SPOOL_BYTES = int(os.environ.get("NIDS_OFFLINE_SPOOL_BYTES", 16 * 1024 * 1024))
+HEADER_SNIFF_BYTES = 64 * 1024       # a CSV header line must fit in this
+
+CSV_EXT = {"csv"}
+PCAP_EXT = {"pcap", "pcapng"}
+PCAP_MAGICS = {
+    b"\xa1\xb2\xc3\xd4", b"\xd4\xc3\xb2\xa1",   # pcap (usec)
+    b"\xa1\xb2\x3c\x4d", b"\x4d\x3c\xb2\xa1",   # pcap (nsec)
+    b"\x0a\x0d\x0d\x0a",                        # pcapng section header
+}
+
+
+class UploadRejected(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def extension(filename):
+    return filename.rsplit(".", 1)[-1].lower() if filename and "." in filename else ""
+
+
+def _check_csv_header(line):
+    from utils.offline_pipeline import header_is_scorable
+    try:
+        text = line.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise UploadRejected("CSV header is not valid UTF-8 text")
+    cols = [c.strip().strip('"') for c in text.strip().split(",")]
+    if len(cols) < 2:
+        raise UploadRejected("CSV header has fewer than two columns")
+    if not header_is_scorable(cols):
+        raise UploadRejected("CSV header has no columns either model can use")
+
+
+class UploadSpool:
+    """
+    Write-once sink for one uploaded file (the werkzeug stream_factory target).
+
+    Validates the first bytes, enforces MAX_UPLOAD_BYTES, hashes the content
+    and spills from memory to `<spill_dir>/<filename>` past SPOOL_BYTES.
+    """
+
+    def __init__(self, filename, spill_dir, max_bytes=MAX_UPLOAD_BYTES, spool_bytes=SPOOL_BYTES):
+        self.filename = filename
+        self.ext = extension(filename)
+        self.size = 0
+        self.path = None
+        self._spill_path = os.path.join(spill_dir, filename)
+        self._max = max_bytes
+        self._spool = spool_bytes
+        self._buf = io.BytesIO()
+        self._fh = None
+        self._hash = hashlib.sha256()
+        self._head = b""
+        self._validated = False
+
+    # -- stream_factory protocol -----------------------------------------
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self._max:
+            raise UploadRejected(f"Upload exceeds {self._max} bytes", 413)
+        if not self._validated:
+            self._sniff(data)
+        self._hash.update(data)
+        if self._fh is None and self.size > self._spool:
+            self._fh = open(self._spill_path, "wb")
+            self._fh.write(self._buf.getvalue())
+            self._buf = None
+            self.path = self._spill_path
+        elif self._fh is None:
+            self._buf.write(data)
+            return len(data)
+        self._fh.write(data)
+        return len(data)
+
+    def seek(self, pos, whence=0):
+        # werkzeug rewinds the container once the part is complete
+        if self._fh is not None:
+            self._fh.flush()
+            return self._fh.tell()
+        return self._buf.seek(pos, whence)
+
+    def flush(self):
+        if self._fh is not None:
+            self._fh.flush()
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+
+    # -- validation --------------------------------------------------------
+    def _sniff(self, data):
+        self._head += data[:HEADER_SNIFF_BYTES]
+        if self.ext in PCAP_EXT:
+            if len(self._head) < 4:
+                return
+            if self._head[:4] not in PCAP_MAGICS:
+                raise UploadRejected("Not a pcap/pcapng capture (bad magic number)")
+        else:
+            nl = self._head.find(b"\n")
+            if nl < 0:
+                if len(self._head) >= HEADER_SNIFF_BYTES:
+                    raise UploadRejected("CSV header line is missing or too long")
+                return
+            _check_csv_header(self._head[:nl])
+        self._validated = True
+        self._head = b""
+
+    def finish(self):
+        """Complete the upload; returns (source, sha256) where source is a path or BytesIO."""
+        if self.size == 0:
+            raise UploadRejected("Uploaded file is empty")
+        if not self._validated:
+            if self.ext in PCAP_EXT:
+                raise UploadRejected("Not a pcap/pcapng capture (bad magic number)")
+            _check_csv_header(self._head)  # header-only file without trailing newline
+        if self._fh is not None:
+            self._fh.close()
+            return self.path, self._hash.hexdigest()
+        return io.BytesIO(self._buf.getvalue()), self._hash.hexdigest()
+
+    def discard(self):
+        self.close()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _check_length(content_length, max_bytes):
+    if content_length is not None and content_length > max_bytes:
+        raise UploadRejected(f"Upload exceeds {max_bytes} bytes", 413)
+
+
+def receive(request, spill_dir, allowed_ext, max_bytes=MAX_UPLOAD_BYTES):
+    """
+    Parse an upload straight off `request.stream`.
+
+    Accepts multipart/form-data (field "file") or a raw body with
+    ?filename=. Returns (spool, form) where form holds the other fields.
+    """
+    from werkzeug.formparser import FormDataParser
+    from werkzeug.datastructures import MultiDict
+
+    _check_length(request.content_length, max_bytes)
+    spools = []
+
+    def stream_factory(total_content_length, content_type, filename, content_length=None):
+        # called when a file part starts, before any of its bytes are read
+        from werkzeug.utils import secure_filename
+        if extension(filename) not in allowed_ext:
+            raise UploadRejected("Unsupported file type")
+        if spools:
+            raise UploadRejected("Upload exactly one file")
+        spool = UploadSpool(secure_filename(filename) or "upload", spill_dir, max_bytes)
+        spools.append(spool)
+        return spool
+
+    try:
+        if request.mimetype == "multipart/form-data":
+            parser = FormDataParser(stream_factory=stream_factory, max_form_memory_size=1024 * 1024,
+                                    silent=False)
+            _, form, files = parser.parse(request.stream, request.mimetype, request.content_length,
+                                          request.mimetype_params)
+            if "file" not in files or not spools:
+                raise UploadRejected("No file uploaded")
+        else:
+            form = MultiDict(request.args)
+            spool = stream_factory(None, request.mimetype, request.args.get("filename", ""))
+            while True:
+                chunk = request.stream.read(256 * 1024)
+                if not chunk:
+                    break
+                spool.write(chunk)
+    except UploadRejected:
+        for spool in spools:
+            spool.discard()
+        raise
+    except ValueError as e:
+        for spool in spools:
+            spool.discard()
+        raise UploadRejected(f"Malformed upload: {e}")
+    return spools[0], form
@@ -1,23 +1,169 @@
-import pandas as pd
-from scapy.all import rdpcap
-
-def convert_pcap_to_csv(input_pcap):
-    packets = rdpcap(input_pcap)
-    data = []
-
-    for pkt in packets:
-        try:
-            row = {
-                "src_port": pkt.sport if hasattr(pkt, "sport") else 0,
-                "dst_port": pkt.dport if hasattr(pkt, "dport") else 0,
-                "proto": pkt.proto if hasattr(pkt, "proto") else 0,
-                "payload_len": len(pkt.payload)
-            }
-            data.append(row)
-        except:
-            pass
-
-    df = pd.DataFrame(data)
+# utils/pcap_to_csv.py
+# -------------------------------------------------------------
+# Streaming pcap -> flow features
+# - packets are read one at a time (scapy PcapReader), never rdpcap()
+# - aggregation reuses the live capture Flow class (capture.flow)
+# - flows expire on packet-timestamp idle timeout, packet threshold or
+#   the tracked-flow cap, so memory is bounded by active flows only
+# - shard=(i, n) keeps only flows whose canonical 5-tuple hashes to i;
+#   other packets are skipped from their raw bytes without dissection
+# -------------------------------------------------------------
+import socket
+import struct
+import zlib
+from collections import OrderedDict
+
+PCAP_IDLE_TIMEOUT = 120.0      # seconds of capture time without packets -> expire
+PCAP_PACKET_THRESHOLD = 10000  # split very long flows
+PCAP_MAX_TRACKED = 100000      # evict least recently seen flow beyond this
+
+FLOW_ID_COLUMNS = ["src_ip", "dst_ip", "src_port", "dst_port", "protocol_id"]
+
+
+def flow_id(flow):
+    return [flow.client_ip, flow.server_ip, flow.client_port, flow.server_port, int(flow.protocol)]
+
+
+# -------------------------
+# Flow-hash sharding
+# -------------------------
+def shard_of(src, dst, sport, dport, proto, shards):
+    """Stable shard for a flow; both directions of a conversation map to the same shard."""
+    a, b = (src, int(sport)), (dst, int(dport))
+    lo, hi = (a, b) if a <= b else (b, a)
+    return zlib.crc32(f"{lo[0]}|{lo[1]}|{hi[0]}|{hi[1]}|{int(proto)}".encode()) % shards
+
+
+def _raw_ether_key(data):
+    """(src, dst, sport, dport, proto) straight from an Ethernet/IPv4 frame, else None."""
+    if len(data) < 34:
+        return None
+    off = 14
+    ethertype = struct.unpack_from("!H", data, 12)[0]
+    if ethertype == 0x8100:  # 802.1Q
+        ethertype = struct.unpack_from("!H", data, 16)[0]
+        off = 18
+    if ethertype != 0x0800 or len(data) < off + 20:
+        return None
+    ihl = (data[off] & 0x0F) * 4
+    proto = data[off + 9]
+    src = socket.inet_ntoa(data[off + 12:off + 16])
+    dst = socket.inet_ntoa(data[off + 16:off + 20])
+    if proto in (6, 17) and len(data) >= off + ihl + 4:
+        sport, dport = struct.unpack_from("!HH", data, off + ihl)
+    else:
+        sport = dport = 0
+        proto = proto if proto in (6, 17) else 0
+    return src, dst, sport, dport, proto
+
+
+def _iter_packets(path, shard=None):
+    """Dissected packets (with .time) from a pcap/pcapng, optionally only one flow shard."""
+    from scapy.all import PcapReader, RawPcapReader, conf
+    from capture.flow import make_flow_key
+
+    if shard is None:
+        with PcapReader(path) as reader:
+            yield from reader
+        return
+
+    index, shards = shard
+    with RawPcapReader(path) as reader:
+        nano = getattr(reader, "nano", False)
+        for data, meta in reader:
+            if hasattr(meta, "sec"):          # classic pcap
+                linktype = reader.linktype
+                ts = meta.sec + meta.usec * (1e-9 if nano else 1e-6)
+            else:                              # pcapng block metadata
+                linktype, tsresol, tshigh, tslow = meta[:4]
+                ts = ((tshigh << 32) + tslow) / tsresol if tshigh is not None else 0.0
+
+            key = _raw_ether_key(data) if linktype == 1 else None
+            if key is not None and shard_of(*key, shards) != index:
+                continue
+
+            try:
+                pkt = conf.l2types.num2layer[linktype](data)
+            except Exception:
+                continue
+            if key is None:
+                key = make_flow_key(pkt)
+                if key is None or shard_of(*key, shards) != index:
+                    continue
+            pkt.time = ts
+            yield pkt
+
+
+# -------------------------
+# Flow iteration
+# -------------------------
+def iter_pcap_flows(path, idle_timeout=PCAP_IDLE_TIMEOUT,
+                    packet_threshold=PCAP_PACKET_THRESHOLD, max_tracked=PCAP_MAX_TRACKED,
+                    shard=None):
+    """
+    Yield finished Flow objects from a pcap/pcapng file in bounded memory.
+
+    Flows are kept in an OrderedDict ordered by last packet time; every packet
+    expires idle flows from the front, so each flow is yielded as soon as it
+    goes quiet (in capture time) rather than at end of file.
+    """
+    from scapy.all import IP
+    from capture.flow import Flow, make_flow_key
+
+    flows = OrderedDict()
+    for pkt in _iter_packets(path, shard):
+        if not pkt.haslayer(IP):
+            continue
+        key = make_flow_key(pkt)
+        if key is None:
+            continue
+        ts = float(pkt.time)
+
+        # expire flows idle (relative to capture time) before this packet
+        while flows:
+            oldest = next(iter(flows.values()))
+            if not oldest.is_idle(ts, idle_timeout):
+                break
+            yield flows.popitem(last=False)[1]
+
+        # reply packets belong to the flow opened by the other side
+        if key not in flows:
+            rkey = (key[1], key[0], key[3], key[2], key[4])
+            if rkey in flows:
+                key = rkey
+
+        flow = flows.get(key)
+        if flow is None:
+            if len(flows) >= max_tracked:
+                yield flows.popitem(last=False)[1]
+            flow = Flow(pkt, ts)
+            flows[key] = flow
+        else:
+            flows.move_to_end(key)
+        flow.update(pkt, ts)
+
+        if flow.packets_total >= packet_threshold:
+            yield flows.pop(key)
+
+    while flows:
+        yield flows.popitem(last=False)[1]
+
+
+def convert_pcap_to_csv(input_pcap, model_type="bcc"):
+    """Write one row of flow features per flow to <input_pcap>.csv."""
+    import csv
+    from utils.model_selector import BCC_FEATURES
+    from utils.offline_pipeline import CICIDS_FEATURES
+
+    features = BCC_FEATURES if model_type == "bcc" else CICIDS_FEATURES
+    # identity columns the feature vector doesn't already carry
+    id_cols = [i for i, c in enumerate(FLOW_ID_COLUMNS) if c not in features and c != "protocol_id"]
     out_csv = input_pcap + ".csv"
-    df.to_csv(out_csv, index=False)
+    with open(out_csv, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow([FLOW_ID_COLUMNS[i] for i in id_cols] + features)
+        for flow in iter_pcap_flows(input_pcap):
+            vec = flow.build_bcc_features() if model_type == "bcc" else flow.build_cicids_features()
+            ident = flow_id(flow)
+            writer.writerow([ident[i] for i in id_cols] + vec)
     return out_csv
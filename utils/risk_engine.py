@@ -5,7 +5,20 @@
 
 import random
 import time
-from utils.logger import get_recent_events
+
+# base score per predicted class (unknown classes get DEFAULT_BASE)
+BASE_SCORES = {
+    "TOR": 90,
+    "I2P": 85,
+    "ZERONET": 70,
+    "VPN": 55,
+    "FREENET": 60,
+    "HTTP": 30,
+    "DNS": 25,
+    "PORT_SCAN": 80,
+    "HOST_SWEEP": 80,
+}
+DEFAULT_BASE = 35
 
 # small in-memory cache for source counts to avoid repeated scans
 _SRC_CACHE = {
@@ -24,6 +37,15 @@ def _build_source_cache(recent_events):
     return counts
 
 
+def frequency_boost(freq):
+    """Extra score for sources seen repeatedly."""
+    if freq >= 6:
+        return 15
+    if freq >= 3:
+        return 5
+    return 0
+
+
 def compute_risk_score(evt, recent_events=None):
     """Compute adaptive risk score (0–100).
 
@@ -33,19 +55,11 @@ def compute_risk_score(evt, recent_events=None):
     label = (evt.get("prediction") or "").upper()
     src_ip = evt.get("src_ip") or ""
 
-    base_map = {
-        "TOR": 90,
-        "I2P": 85,
-        "ZERONET": 70,
-        "VPN": 55,
-        "FREENET": 60,
-        "HTTP": 30,
-        "DNS": 25,
-    }
-    base = base_map.get(label, 35)
+    base = BASE_SCORES.get(label, DEFAULT_BASE)
 
     # get recent events once if not provided
     if recent_events is None:
+        from utils.logger import get_recent_events
         recent_events = get_recent_events()
 
     # try cached counts for short TTL
@@ -56,11 +70,7 @@ def compute_risk_score(evt, recent_events=None):
 
     freq = _SRC_CACHE["counts"].get(src_ip, 0)
 
-    freq_boost = 0
-    if freq >= 3:
-        freq_boost = 5
-    if freq >= 6:
-        freq_boost = 15
+    freq_boost = frequency_boost(freq)
 
     noise = random.randint(-3, 3)
 
@@ -0,0 +1,248 @@
+# utils/scan_detector.py
+# -------------------------------------------------------------
+# Scan / fan-out detection with per-source distinct counting
+# - for every source IP: distinct dst IPs (horizontal sweep) and
+#   distinct dst ports (port scan) over a sliding WINDOW
+# - the window is a ring of SLICES slices; each slice keeps, per
+#   source, a small exact set that turns into a HyperLogLog sketch
+#   (2^PRECISION registers) once it grows past SPARSE_MAX entries;
+#   queries merge the live slices (register max / set union)
+# - each slice tracks at most MAX_SOURCES sources (least recently seen
+#   are dropped), so memory stays bounded
+# - when a source crosses PORT_THRESHOLD / HOST_THRESHOLD a scan event
+#   is pushed through utils.logger.push_event (once per COOLDOWN)
+# -------------------------------------------------------------
+import os
+import math
+import time
+import hashlib
+import threading
+from collections import OrderedDict, deque
+
+WINDOW = int(os.environ.get("NIDS_SCAN_WINDOW", 60))
+SLICES = int(os.environ.get("NIDS_SCAN_SLICES", 6))
+PRECISION = int(os.environ.get("NIDS_SCAN_HLL_PRECISION", 8))
+SPARSE_MAX = 32
+MAX_SOURCES = int(os.environ.get("NIDS_SCAN_MAX_SOURCES", 2048))
+PORT_THRESHOLD = int(os.environ.get("NIDS_SCAN_PORT_THRESHOLD", 100))
+HOST_THRESHOLD = int(os.environ.get("NIDS_SCAN_HOST_THRESHOLD", 50))
+COOLDOWN = float(os.environ.get("NIDS_SCAN_COOLDOWN", WINDOW))
+CHECK_INTERVAL = 1.0          # min seconds between threshold checks per source
+MAX_DETECTIONS = 200
+
+PORT_SCAN, HOST_SWEEP = "PORT_SCAN", "HOST_SWEEP"
+
+_M = 1 << PRECISION
+_ALPHA = 0.7213 / (1 + 1.079 / _M)
+
+_lock = threading.Lock()
+_detections = deque(maxlen=MAX_DETECTIONS)
+_checked = OrderedDict()     # src -> (checked_at, hosts, ports)
+_alerted = {}                # (src, kind) -> last alert time
+
+
+# -------------------------
+# Distinct counter (exact while small, then HyperLogLog)
+# -------------------------
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "little")
+
+
+class Distinct:
+    __slots__ = ("items", "registers")
+
+    def __init__(self):
+        self.items = set()
+        self.registers = None
+
+    def add(self, h):
+        if self.registers is None:
+            self.items.add(h)
+            if len(self.items) > SPARSE_MAX:
+                self._densify()
+            return
+        idx = h & (_M - 1)
+        rest = h >> PRECISION
+        rank = (64 - PRECISION) - rest.bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def _densify(self):
+        items, self.items = self.items, set()
+        self.registers = bytearray(_M)
+        for h in items:
+            self.add(h)
+
+    def merge_into(self, acc):
+        """Fold this counter into `acc` ({"items": set, "registers": bytearray|None})."""
+        if self.registers is None:
+            acc["items"] |= self.items
+            return
+        if acc["registers"] is None:
+            acc["registers"] = bytearray(self.registers)
+        else:
+            acc["registers"] = bytearray(map(max, acc["registers"], self.registers))
+
+
+def _estimate(acc):
+    regs = acc["registers"]
+    if regs is None:
+        return len(acc["items"])
+    if acc["items"]:
+        # sparse slices merged with dense ones: fold their hashes in
+        tmp = Distinct()
+        tmp.registers = bytearray(regs)
+        for h in acc["items"]:
+            tmp.add(h)
+        regs = tmp.registers
+    est = _ALPHA * _M * _M / sum(2.0 ** -r for r in regs)
+    zeros = regs.count(0)
+    if est <= 2.5 * _M and zeros:
+        est = _M * math.log(_M / zeros)     # linear counting for small cardinalities
+    return int(round(est))
+
+
+class _Slice:
+    __slots__ = ("sid", "sources")
+
+    def __init__(self):
+        self.sid = -1
+        self.sources = OrderedDict()   # src -> (hosts Distinct, ports Distinct)
+
+    def reset(self, sid):
+        self.sid = sid
+        self.sources = OrderedDict()
+
+
+_ring = [_Slice() for _ in range(SLICES)]
+
+
+# -------------------------
+# Update
+# -------------------------
+def observe(evt, ts=None):
+    """Feed one live event; pushes a scan event when a threshold is crossed."""
+    if evt.get("scan_kind"):
+        return          # our own scan events
+    src, dst, dport = evt.get("src_ip"), evt.get("dst_ip"), evt.get("dport")
+    if not src or not dst:
+        return
+    ts = ts or evt.get("ts") or time.time()
+    h_dst = _hash64(dst)
+    h_port = _hash64(dport) if dport not in (None, "") else None
+    span = WINDOW / SLICES
+    sid = int(ts // span)
+    with _lock:
+        sl = _ring[sid % SLICES]
+        if sl.sid != sid:
+            if sid < sl.sid:
+                return
+            sl.reset(sid)
+        pair = sl.sources.get(src)
+        if pair is None:
+            pair = sl.sources[src] = (Distinct(), Distinct())
+            if len(sl.sources) > MAX_SOURCES:
+                sl.sources.popitem(last=False)
+        else:
+            sl.sources.move_to_end(src)
+        pair[0].add(h_dst)
+        if h_port is not None:
+            pair[1].add(h_port)
+
+        last = _checked.get(src)
+        if last is not None and ts - last[0] < CHECK_INTERVAL:
+            return
+        hosts, ports = _distinct_locked(src, ts)
+        _checked[src] = (ts, hosts, ports)
+        _checked.move_to_end(src)
+        if len(_checked) > MAX_SOURCES:
+            _checked.popitem(last=False)
+        alerts = _crossed_locked(src, hosts, ports, ts)
+
+    for kind in alerts:
+        _raise(evt, kind, hosts, ports, ts)
+
+
+def _distinct_locked(src, now):
+    span = WINDOW / SLICES
+    current = int(now // span)
+    hosts = {"items": set(), "registers": None}
+    ports = {"items": set(), "registers": None}
+    for sl in _ring:
+        if current - SLICES < sl.sid <= current:
+            pair = sl.sources.get(src)
+            if pair is not None:
+                pair[0].merge_into(hosts)
+                pair[1].merge_into(ports)
+    return _estimate(hosts), _estimate(ports)
+
+
+def _crossed_locked(src, hosts, ports, now):
+    out = []
+    for kind, count, limit in ((PORT_SCAN, ports, PORT_THRESHOLD), (HOST_SWEEP, hosts, HOST_THRESHOLD)):
+        if count >= limit and now - _alerted.get((src, kind), 0) >= COOLDOWN:
+            _alerted[(src, kind)] = now
+            out.append(kind)
+    if len(_alerted) > MAX_SOURCES * 2:
+        stale = [k for k, t in _alerted.items() if now - t >= COOLDOWN]
+        for k in stale:
+            del _alerted[k]
+    return out
+
+
+def _raise(evt, kind, hosts, ports, ts):
+    from utils.logger import push_event
+    from utils.risk_engine import BASE_SCORES
+    detection = {
+        "time": time.strftime("%H:%M:%S", time.localtime(ts)),
+        "ts": ts,
+        "src_ip": evt.get("src_ip"),
+        "dst_ip": evt.get("dst_ip") if kind == PORT_SCAN else "multiple",
+        "sport": evt.get("sport", 0),
+        "dport": 0 if kind == PORT_SCAN else evt.get("dport", 0),
+        "proto": evt.get("proto", "TCP"),
+        "prediction": kind,
+        "risk_level": "High",
+        "risk_score": BASE_SCORES[kind],
+        "scan_kind": kind,
+        "distinct_hosts": hosts,
+        "distinct_ports": ports,
+        "window": WINDOW,
+    }
+    with _lock:
+        _detections.append(dict(detection))
+    print(f"[scan_detector] {kind} from {detection['src_ip']}: {hosts} hosts / {ports} ports in {WINDOW}s")
+    try:
+        push_event(detection)
+    except Exception as e:
+        print("[scan_detector] push_event failed:", e)
+
+
+# -------------------------
+# Query
+# -------------------------
+def distinct(src, now=None):
+    """Distinct dst hosts/ports of `src` over the window (HLL estimates once large)."""
+    now = now or time.time()
+    with _lock:
+        hosts, ports = _distinct_locked(src, now)
+    return {"src_ip": src, "window": WINDOW, "distinct_hosts": hosts, "distinct_ports": ports,
+            "relative_error": round(1.04 / math.sqrt(_M), 4)}
+
+
+def top_sources(n=10, by="ports"):
+    """Sources with the highest fan-out as of their last threshold check."""
+    key = 2 if by == "ports" else 1
+    with _lock:
+        rows = sorted(_checked.items(), key=lambda kv: kv[1][key], reverse=True)[:n]
+    return [{"src_ip": src, "checked": t, "distinct_hosts": h, "distinct_ports": p} for src, (t, h, p) in rows]
+
+
+def recent_detections(n=50):
+    with _lock:
+        return list(_detections)[-n:][::-1]
+
+
+def config():
+    return {"window": WINDOW, "slices": SLICES, "precision": PRECISION, "max_sources": MAX_SOURCES,
+            "port_threshold": PORT_THRESHOLD, "host_threshold": HOST_THRESHOLD, "cooldown": COOLDOWN}
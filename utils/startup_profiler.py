@@ -0,0 +1,87 @@
+# utils/startup_profiler.py
+# -------------------------------------------------------------
+# Built-in startup profiler for the Flask backend
+# - wall time for every import / init step (always recorded, cheap)
+# - Python heap deltas via tracemalloc when NIDS_PROFILE_STARTUP=1
+# - stdlib only, so it can be imported before eventlet.monkey_patch()
+# -------------------------------------------------------------
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+ENABLED = os.environ.get("NIDS_PROFILE_STARTUP") == "1"
+
+_T0 = time.perf_counter()
+_steps = []      # list of dicts: name, seconds, mem_kb, peak_kb, depth
+_depth = 0
+_finished = None  # total seconds, frozen by finish()
+
+if ENABLED and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+
+def _rss_kb():
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS reports bytes, Linux kilobytes
+        return rss // 1024 if sys.platform == "darwin" else rss
+    except Exception:
+        return None
+
+
+@contextmanager
+def profile_step(name):
+    """Time (and, when enabled, memory-profile) the enclosed block."""
+    global _depth
+    step = {"name": name, "depth": _depth, "seconds": None, "mem_kb": None, "peak_kb": None}
+    _steps.append(step)
+    if ENABLED:
+        mem_before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+    _depth += 1
+    start = time.perf_counter()
+    try:
+        yield step
+    finally:
+        step["seconds"] = round(time.perf_counter() - start, 4)
+        _depth -= 1
+        if ENABLED:
+            current, peak = tracemalloc.get_traced_memory()
+            step["mem_kb"] = round((current - mem_before) / 1024, 1)
+            step["peak_kb"] = round((peak - mem_before) / 1024, 1)
+
+
+def get_report():
+    return {
+        "enabled": ENABLED,
+        "total_seconds": _finished if _finished is not None else round(time.perf_counter() - _T0, 4),
+        "max_rss_kb": _rss_kb(),
+        "steps": [dict(s) for s in _steps],
+    }
+
+
+def finish():
+    """Freeze total startup time and print the report when profiling is on."""
+    global _finished
+    if _finished is None:
+        _finished = round(time.perf_counter() - _T0, 4)
+    if ENABLED:
+        print_report()
+        tracemalloc.stop()
+    return _finished
+
+
+def print_report():
+    rep = get_report()
+    print("⏱️  Startup profile")
+    print(f"{'step':<52}{'sec':>9}{'mem KB':>11}{'peak KB':>11}")
+    for s in rep["steps"]:
+        name = ("  " * s["depth"] + s["name"])[:51]
+        sec = f"{s['seconds']:.4f}" if s["seconds"] is not None else "-"
+        mem = f"{s['mem_kb']:.1f}" if s["mem_kb"] is not None else "-"
+        peak = f"{s['peak_kb']:.1f}" if s["peak_kb"] is not None else "-"
+        print(f"{name:<52}{sec:>9}{mem:>11}{peak:>11}")
+    print(f"total: {rep['total_seconds']}s  max_rss: {rep['max_rss_kb']} KB")